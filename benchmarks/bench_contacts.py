@@ -0,0 +1,128 @@
+# benchmarks/bench_contacts.py - Lookup speed and accuracy of the contact index
+"""
+Builds maximus_contacts.ContactIndex over a synthetic contacts.json (first
+names x generated surnames, --size contacts) and measures:
+
+  build       time to index the whole file from scratch
+  refresh     time to pick up a file where --changed contacts were added,
+              removed or renumbered (incremental re-index)
+  lookup      mean/p95 time per lookup, and how often the intended contact
+              came first (top-1) or among the first three (top-3), for each
+              kind of query:
+                exact     the full name as stored
+                typo      one character of the surname replaced
+                phonetic  the first name spelled the way it sounds
+                          ("raul" for "rahul")
+                prefix    the surname cut short ("rahul sha"); often
+                          ambiguous, so top-3 is the number to watch
+
+Usage:
+    python -m benchmarks.bench_contacts
+    python -m benchmarks.bench_contacts --size 10000 --queries 500
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from maximus_store import JsonStore
+from maximus_contacts import ContactIndex
+
+# First name -> how it might come back from speech recognition
+SOUNDS_LIKE = {
+    "rahul": "raul", "sean": "shawn", "stephen": "steven", "catherine": "kathryn", "philip": "filip",
+    "jeffrey": "geoffrey", "mohammed": "muhammad", "aisha": "ayesha", "priya": "preeya", "john": "jon",
+    "sara": "sarah", "vikram": "vickram", "neha": "nehha", "christopher": "kristopher", "ananya": "ananyah",
+    "zoe": "zoey", "nicholas": "nikolas", "deepak": "dipak", "marc": "mark", "lakshmi": "laxmi",
+}
+SYLLABLES = ("ka ra ma sha va ti lo ne ri da po gu han son ber ley mann ton vic ez ard sky "
+             "bel dor fin gar hol jun kel mor nash pel quin rot sel tam ur wen yor zim").split()
+
+
+def make_contacts(size, seed):
+    rng = random.Random(seed)
+    firsts = list(SOUNDS_LIKE)
+    contacts = {}
+    while len(contacts) < size:
+        surname = "".join(rng.choice(SYLLABLES) for _ in range(3))
+        name = f"{rng.choice(firsts).title()} {surname.title()}"
+        contacts[name] = f"+91{rng.randint(10 ** 9, 10 ** 10 - 1)}"
+    return contacts
+
+
+def queries(contacts, count, seed):
+    rng = random.Random(seed)
+    names = rng.sample(sorted(contacts), count)
+    kinds = {"exact": [], "typo": [], "phonetic": [], "prefix": []}
+    for name in names:
+        first, surname = name.lower().split(" ", 1)
+        i = rng.randrange(1, len(surname))
+        typo = surname[:i] + rng.choice("aeiourstln".replace(surname[i], "")) + surname[i + 1:]
+        kinds["exact"].append((name, name))
+        kinds["typo"].append((f"{first} {typo}", name))
+        kinds["phonetic"].append((f"{SOUNDS_LIKE[first]} {surname}", name))
+        kinds["prefix"].append((f"{first} {surname[:4]}", name))
+    return kinds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lookup speed and accuracy of the contact index.")
+    parser.add_argument("--size", type=int, default=100000, help="Contacts in the synthetic file.")
+    parser.add_argument("--queries", type=int, default=1000, help="Queries of each kind.")
+    parser.add_argument("--changed", type=int, default=100, help="Contacts changed for the refresh test.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="maximus-contacts-")
+    path = os.path.join(directory, "contacts.json")
+    try:
+        contacts = make_contacts(args.size, args.seed)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(contacts, f)
+        index = ContactIndex(JsonStore(path, dict))
+        t0 = time.perf_counter()
+        index.refresh()
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        print(f"{args.size} contacts indexed in {build_ms:.0f} ms\n")
+        print(f"{'query':<10} {'top-1':>7} {'top-3':>7} {'mean ms':>8} {'p95 ms':>8}")
+        for kind, pairs in queries(contacts, args.queries, args.seed).items():
+            timings, top1, top3 = [], 0, 0
+            for query, expected in pairs:
+                start = time.perf_counter()
+                matches = index.lookup(query, limit=3)
+                timings.append(time.perf_counter() - start)
+                names = [m.name for m in matches]
+                top1 += names[:1] == [expected]
+                top3 += expected in names
+            timings.sort()
+            print(f"{kind:<10} {top1 / len(pairs):>7.1%} {top3 / len(pairs):>7.1%} "
+                  f"{sum(timings) / len(timings) * 1000:>8.3f} "
+                  f"{timings[int(0.95 * (len(timings) - 1))] * 1000:>8.3f}")
+
+        rng = random.Random(args.seed)
+        for name in rng.sample(sorted(contacts), args.changed):
+            del contacts[name]
+        contacts.update(make_contacts(args.changed, args.seed + 1))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(contacts, f)
+        t0 = time.perf_counter()
+        index.refresh()
+        print(f"\nrefresh after {args.changed} removed + {args.changed} added: "
+              f"{(time.perf_counter() - t0) * 1000:.0f} ms (file parse included)")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
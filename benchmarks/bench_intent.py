@@ -0,0 +1,114 @@
+# benchmarks/bench_intent.py - Accuracy and latency of the local intent classifier
+"""
+Runs maximus_intent on phrasings that are not in intent_phrases.jsonl:
+
+  routed      commands a local handler should answer that classify() sends to
+              the right intent with usable slots
+  misrouted   commands sent to the wrong local handler
+  false       commands meant for the AI that classify() routes locally anyway
+              (should be 0)
+  latency     mean/p95 time per classify() call, and the one-off training time
+
+Usage:
+    python -m benchmarks.bench_intent
+    python -m benchmarks.bench_intent --threshold 0.7 -v
+"""
+
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from maximus_intent import IntentClassifier
+
+HELD_OUT = [
+    ("is it gonna be rainy in bhopal", "weather"),
+    ("do i need a raincoat in seattle", "weather"),
+    ("how chilly is it outside in shimla", "weather"),
+    ("what's the weather gonna be like in rome tomorrow", "weather"),
+    ("add call grandma to my todo list", "add_task"),
+    ("put dish soap on the shopping list", "add_task"),
+    ("i need to buy batteries, add it to my list", "add_task"),
+    ("jot down renew car insurance", "add_task"),
+    ("show me what's on my todo", "list_tasks"),
+    ("what do i still have to do", "list_tasks"),
+    ("read me my tasks please", "list_tasks"),
+    ("tell me a joke about cats", "joke"),
+    ("make me smile with a joke", "joke"),
+    ("what's 45 times 3", "math"),
+    ("how much is 300 divided by 4", "math"),
+    ("what's 7 percent of 300", "math"),
+    ("add 19 and 23", "math"),
+    ("find info about alan turing", "wikipedia"),
+    ("look up the history of rome", "wikipedia"),
+    ("give me information on the moon landing", "wikipedia"),
+    ("play some arijit singh", "youtube"),
+    ("put on some rain sounds", "youtube"),
+    ("i want to watch a documentary about sharks", "youtube"),
+    ("what things can you do", "help"),
+    ("what can you help me with", "help"),
+]
+
+FOR_THE_AI = [
+    "write a poem about love", "who painted the mona lisa", "explain black holes",
+    "what is the meaning of love", "how are you", "good night", "whats the best way to learn guitar",
+    "how's the weather on mars", "add some salt to the soup recipe", "can you recommend a movie",
+    "tell me about your day", "why do we dream", "how do i play chess", "what should i name my dog",
+    "give me a recipe for pancakes", "is coffee bad for you", "write a story about a robot",
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Accuracy and latency of the local intent classifier.")
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--iterations", type=int, default=200, help="classify() calls per phrase for latency.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every prediction.")
+    args = parser.parse_args(argv)
+
+    classifier = IntentClassifier(threshold=args.threshold)
+    if not classifier.enabled:
+        print("NumPy is not installed; the intent classifier is disabled.")
+        return 1
+    t0 = time.perf_counter()
+    classifier.warm()
+    train_ms = (time.perf_counter() - t0) * 1000
+
+    routed = misrouted = 0
+    for text, expected in HELD_OUT:
+        prediction = classifier.classify(text)
+        if prediction is not None and prediction.intent == expected:
+            routed += 1
+        elif prediction is not None:
+            misrouted += 1
+        if args.verbose:
+            print(f"  {expected:<10} {text!r:50} -> {prediction}")
+    false = 0
+    for text in FOR_THE_AI:
+        prediction = classifier.classify(text)
+        false += prediction is not None
+        if args.verbose and prediction is not None:
+            print(f"  {'none':<10} {text!r:50} -> {prediction}")
+
+    timings = []
+    for text, _ in HELD_OUT:
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            classifier.classify(text)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    print(f"threshold {args.threshold}, trained in {train_ms:.0f} ms")
+    print(f"routed     {routed}/{len(HELD_OUT)}")
+    print(f"misrouted  {misrouted}/{len(HELD_OUT)}")
+    print(f"false      {false}/{len(FOR_THE_AI)} AI prompts handled locally")
+    print(f"latency    mean {sum(timings) / len(timings) * 1000:.3f} ms, "
+          f"p95 {timings[int(0.95 * (len(timings) - 1))] * 1000:.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+# benchmarks/bench_pipeline.py - Command pipeline benchmark with stubbed upstreams
+"""
+Drives the three entry points of the assistant through every intent family
+with all network dependencies replaced by in-process fakes (benchmarks/fakes.py):
+
+  logic    MaximusAssistant.process_command   (maximus_logic.py)
+  desktop  maximus.process_command            (speak/microphone stubbed)
+  web      POST /chat/ through the Django test client
+
+Usage:
+    python -m benchmarks.bench_pipeline                      # run and compare against baseline
+    python -m benchmarks.bench_pipeline --save-baseline      # record a new baseline
+    python -m benchmarks.bench_pipeline --target web --latency 50 --iterations 200
+    python -m benchmarks.bench_pipeline --cassette cassettes/bench.json --cassette-latency recorded
+
+With --cassette, upstream calls are replayed from a recorded cassette
+(see maximus_cassette.py) instead of the synthetic fakes.
+
+Reports ops/sec and p50/p95/p99 latency per target/family. Exits with status 1
+when a result regresses past --tolerance relative to the saved baseline.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import contextlib
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import FakeUpstreams
+from maximus_cassette import use_cassette
+from maximus_semantic_cache import gemini_cache
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+# Commands per intent family. Each family cycles through its list.
+LOGIC_COMMANDS = {
+    "math": ["calculate 12*7+3", "solve 2**10 - 24"],
+    "tasks": ["add task buy milk", "list tasks"],
+    "weather": ["weather in pune"],
+    "wiki": ["wikipedia python programming"],
+    "question": ["who is alan turing"],
+    "ai": ["who made python"],
+}
+
+DESKTOP_COMMANDS = {
+    "math": ["calculate 12 times 7 plus 3", "derivative of x**2 + 3*x"],
+    "tasks": ["add todo buy milk", "show todo"],
+    "memory": ["remember locker code is 4512", "what is locker code"],
+    "weather": ["weather in pune"],
+    "wiki": ["search for python programming"],
+    "question": ["who is alan turing", "tell me about black holes"],
+    "ai": ["who made python"],
+}
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def measure(fn, commands, iterations, warmup):
+    for i in range(warmup):
+        fn(commands[i % len(commands)])
+    samples = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(commands[i % len(commands)])
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    samples.sort()
+    return {
+        "ops_per_sec": iterations / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(samples, 0.5) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+    }
+
+
+# ---------------- Targets ----------------
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "maximus_web.settings")
+    import django
+    django.setup()
+
+
+def logic_target(upstreams, workdir):
+    setup_django()
+    import maximus_logic
+    upstreams._patch(maximus_logic, "MEMORY_FILE", os.path.join(workdir, "memory.json"))
+    upstreams._patch(maximus_logic, "TASKS_FILE", os.path.join(workdir, "tasks.json"))
+    upstreams._patch(maximus_logic, "CONTACTS_FILE", os.path.join(workdir, "contacts.json"))
+    upstreams.patch_module(maximus_logic)
+    assistant = maximus_logic.MaximusAssistant()
+    return assistant.process_command, LOGIC_COMMANDS
+
+
+def web_target(upstreams, workdir):
+    logic_target(upstreams, workdir)
+    import maximus_logic
+    import views
+    from django.test import Client
+    upstreams._patch(views, "assistant", maximus_logic.MaximusAssistant())
+    client = Client()
+
+    def call(message):
+        resp = client.post("/chat/", data=json.dumps({"message": message}), content_type="application/json")
+        if resp.status_code != 200:
+            raise RuntimeError(f"/chat/ returned {resp.status_code}")
+        return resp
+
+    return call, LOGIC_COMMANDS
+
+
+def desktop_target(upstreams, workdir):
+    os.chdir(workdir)  # maximus.py keeps its JSON files relative to the working directory
+    import maximus
+    upstreams._patch(maximus, "speak", lambda text: None)
+    upstreams._patch(maximus, "listen_once", lambda *args, **kwargs: "")
+    upstreams.patch_module(maximus)
+
+    def call(message):
+        return maximus.process_command(message, {}, None)
+
+    return call, DESKTOP_COMMANDS
+
+
+TARGETS = {"logic": logic_target, "desktop": desktop_target, "web": web_target}
+
+
+# ---------------- Baseline ----------------
+def compare(results, baseline, tolerance):
+    """Returns a list of human-readable regressions."""
+    regressions = []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if cur["p95_ms"] > base["p95_ms"] * (1 + tolerance) and cur["p95_ms"] - base["p95_ms"] > 0.05:
+            regressions.append(f"{key}: p95 {cur['p95_ms']:.2f} ms vs baseline {base['p95_ms']:.2f} ms")
+        if cur["ops_per_sec"] < base["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{key}: {cur['ops_per_sec']:.1f} ops/s vs baseline {base['ops_per_sec']:.1f} ops/s")
+    return regressions
+
+
+def print_table(results, baseline):
+    print(f"{'benchmark':<20} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'vs base p95':>12}")
+    for key, r in results.items():
+        delta = ""
+        base = baseline.get(key)
+        if base and base["p95_ms"]:
+            delta = f"{(r['p95_ms'] / base['p95_ms'] - 1) * 100:+.1f}%"
+        print(f"{key:<20} {r['ops_per_sec']:>10.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {delta:>12}")
+
+
+def _cassette(args):
+    if not args.cassette:
+        return contextlib.nullcontext()
+    return use_cassette(os.path.abspath(args.cassette), "replay", args.cassette_latency)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Maximus command pipeline with fake upstreams.")
+    parser.add_argument("--target", choices=["all"] + list(TARGETS), default="all")
+    parser.add_argument("--family", action="append", help="Only run these intent families (repeatable).")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake upstream latency in milliseconds.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random upstream latency in milliseconds.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (0.25 = 25%%).")
+    parser.add_argument("--json", help="Also write results to this file.")
+    parser.add_argument("--cassette", help="Replay upstream calls from this cassette instead of the fakes.")
+    parser.add_argument("--cassette-latency", default="none",
+                        help="Replay latency: none, recorded, or a scale factor for the recorded latency.")
+    args = parser.parse_args(argv)
+
+    targets = list(TARGETS) if args.target == "all" else [args.target]
+    results = {}
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="maximus-bench-")
+    try:
+        for name in targets:
+            fakes = FakeUpstreams(latency=args.latency / 1000.0, jitter=args.jitter / 1000.0,
+                                  transports=not args.cassette)
+            with fakes as upstreams, _cassette(args):
+                # Measure the Gemini path itself, not repeated semantic cache hits
+                upstreams._patch(gemini_cache, "enabled", False)
+                try:
+                    call, families = TARGETS[name](upstreams, workdir)
+                except (ImportError, SystemExit, RuntimeError) as e:
+                    print(f"Skipping {name}: {e}")
+                    continue
+                for family, commands in families.items():
+                    if args.family and family not in args.family:
+                        continue
+                    results[f"{name}/{family}"] = measure(call, commands, args.iterations, args.warmup)
+                os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print_table(results, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nREGRESSIONS:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# benchmarks/bench_semantic_cache.py - Hit rate and lookup cost of the semantic cache
+"""
+Measures maximus_semantic_cache on a small paraphrase set:
+
+  hit rate     each group's first prompt is stored, the other phrasings are
+               looked up; they should all hit
+  false hits   unrelated prompts that share most words ("who made java" after
+               "who made python") should all miss
+  lookup cost  mean/p95 time per lookup with the cache filled to each --sizes
+
+Usage:
+    python -m benchmarks.bench_semantic_cache
+    python -m benchmarks.bench_semantic_cache --threshold 0.85 --sizes 100,1000,4000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from maximus_semantic_cache import SemanticCache
+
+PARAPHRASES = [
+    ["who made python", "who created python?", "who invented python", "Who developed Python"],
+    ["what is the capital of france", "what's the capital of france", "capital of france?"],
+    ["tell me a story about dragons", "tell me a story about dragons please", "a story about dragons"],
+    ["explain quantum computing", "explain quantum computing simply", "describe quantum computing"],
+    ["how big is the sun", "how large is the sun?", "how huge is the sun"],
+    ["who wrote hamlet", "who is the author of hamlet", "who created hamlet"],
+]
+
+DISTINCT = [
+    ("who made python", "who made java"),
+    ("what is the capital of france", "what is the capital of germany"),
+    ("how old is the universe", "how old is the earth"),
+    ("who is the president of usa", "who is the president of france"),
+    ("what is love", "what is life"),
+    ("how big is the sun", "how big is the moon"),
+]
+
+WORDS = ("alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike november "
+         "oscar papa quebec romeo sierra tango uniform victor whiskey xray yankee zulu").split()
+
+
+def quality(threshold):
+    cache = SemanticCache("bench", threshold=threshold)
+    for group in PARAPHRASES:
+        cache.store(group[0], group[0])
+    hits = total = 0
+    misses = []
+    for group in PARAPHRASES:
+        for prompt in group[1:]:
+            total += 1
+            if cache.lookup(prompt) == group[0]:
+                hits += 1
+            else:
+                misses.append(prompt)
+
+    cache = SemanticCache("bench", threshold=threshold)
+    false_hits = []
+    for stored, probe in DISTINCT:
+        cache.clear()
+        cache.store(stored, stored)
+        if cache.lookup(probe) is not None:
+            false_hits.append(f"{probe!r} -> {stored!r}")
+    return hits, total, misses, false_hits
+
+
+def lookup_cost(size, threshold, queries, seed=1):
+    rng = random.Random(seed)
+    cache = SemanticCache("bench", capacity=size, threshold=threshold)
+    for i in range(size):
+        cache.store(" ".join(rng.choice(WORDS) for _ in range(6)) + f" {i}", "answer")
+    prompts = [" ".join(rng.choice(WORDS) for _ in range(6)) for _ in range(queries)]
+    samples = []
+    for prompt in prompts:
+        t0 = time.perf_counter()
+        cache.lookup(prompt)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return sum(samples) / len(samples), samples[int(0.95 * (len(samples) - 1))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Semantic cache hit rate and lookup cost.")
+    parser.add_argument("--threshold", type=float, default=0.88)
+    parser.add_argument("--sizes", default="100,1000,2048", help="Comma-separated cache sizes for the cost test.")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    hits, total, misses, false_hits = quality(args.threshold)
+    print(f"threshold {args.threshold}: paraphrase hit rate {hits}/{total} ({hits / total:.0%}), "
+          f"false hits {len(false_hits)}/{len(DISTINCT)}")
+    for prompt in misses:
+        print(f"  missed: {prompt!r}")
+    for line in false_hits:
+        print(f"  false hit: {line}")
+
+    print(f"\n{'entries':>8} {'mean us':>9} {'p95 us':>9}")
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        mean, p95 = lookup_cost(size, args.threshold, args.queries)
+        print(f"{size:>8} {mean * 1e6:>9.1f} {p95 * 1e6:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+# benchmarks/bench_startup.py - Cold vs preloaded startup of the web server
+"""
+Starts maximus_serve.py twice, once with --no-preload (every worker imports
+the app after fork, like a stock server, with warm-up off) and once
+preloaded (the app is imported and warmed in the parent, then forked).
+Reports for each:
+
+  ready     seconds from launch until every worker answered /ready/ with 200
+  first     latency of the first /chat/ request each worker handles (mean)
+  steady    median /chat/ latency once every worker has served requests
+  uss/pss   per-worker memory from /proc/<pid>/smaps_rollup (Linux only):
+            USS is memory private to the worker, PSS its fair share of pages
+            shared with the parent and the other workers
+
+Usage:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --workers 8 --json startup.json
+
+Storage goes to a temporary directory (MAXIMUS_STORAGE_DIR), and the chat
+messages are local intents, so no network is needed.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MESSAGES = ["calculate 12 * 7 + 3", "list tasks", "help", "tell me a joke"]
+MODES = {"cold": ["--no-preload"], "preloaded": []}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def memory_kb(pid):
+    """(USS, PSS) in kB from /proc/<pid>/smaps_rollup, or (None, None) where unavailable."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if value.strip().endswith(" kB"):
+                    fields[name] = int(value.split()[0])
+    except OSError:
+        return None, None
+    return fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0), fields.get("Pss", 0)
+
+
+def wait_ready(base, workers, timeout):
+    """Polls /ready/ concurrently until `workers` distinct pids report ready. Returns their pids."""
+    ready = set()
+    deadline = time.monotonic() + timeout
+
+    def probe(_):
+        try:
+            r = requests.get(base + "/ready/", timeout=2)
+            return r.json().get("pid") if r.status_code == 200 else None
+        except (requests.RequestException, ValueError):
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers * 2) as pool:
+        while len(ready) < workers:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"only {len(ready)}/{workers} workers ready after {timeout} s")
+            ready.update(pid for pid in pool.map(probe, range(workers * 2)) if pid)
+            time.sleep(0.02)
+    return ready
+
+
+def chat(base, message):
+    t0 = time.perf_counter()
+    r = requests.post(base + "/chat/", json={"message": message}, timeout=30)
+    r.raise_for_status()
+    return time.perf_counter() - t0
+
+
+def run_mode(name, workers, requests_after, timeout):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    storage = tempfile.mkdtemp(prefix=f"maximus-startup-{name}-")
+    env = dict(os.environ, MAXIMUS_STORAGE_DIR=storage, MAXIMUS_WARMUP="0", PYTHONWARNINGS="ignore")
+    cmd = [sys.executable, os.path.join(ROOT, "maximus_serve.py"), "--bind", f"127.0.0.1:{port}",
+           "--workers", str(workers)] + MODES[name]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        pids = wait_ready(base, workers, timeout)
+        ready = time.perf_counter() - t0
+        # One request per worker, all at once, so each worker's first request is measured
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            first = list(pool.map(lambda i: chat(base, MESSAGES[i % len(MESSAGES)]), range(workers)))
+        steady = [chat(base, MESSAGES[i % len(MESSAGES)]) for i in range(requests_after)]
+        memory = [memory_kb(pid) for pid in pids]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        shutil.rmtree(storage, ignore_errors=True)
+    result = {
+        "ready_s": ready,
+        "first_ms": statistics.mean(first) * 1000,
+        "steady_ms": statistics.median(steady) * 1000,
+    }
+    if all(uss is not None for uss, _ in memory):
+        result["uss_mb"] = statistics.mean(uss for uss, _ in memory) / 1024
+        result["pss_mb"] = statistics.mean(pss for _, pss in memory) / 1024
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare cold and preloaded startup of maximus_serve.py.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=40, help="Requests measured for steady-state latency.")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for the workers to be ready.")
+    parser.add_argument("--json", help="Also write results to this file.")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        print("maximus_serve.py needs fork(); nothing to compare on this platform.")
+        return 1
+
+    results = {}
+    for name in MODES:
+        print(f"Starting {name} server with {args.workers} workers...")
+        results[name] = run_mode(name, args.workers, args.requests, args.timeout)
+
+    print(f"\n{'mode':<10} {'ready s':>8} {'first ms':>9} {'steady ms':>10} {'USS MB':>8} {'PSS MB':>8}")
+    for name, r in results.items():
+        uss = f"{r['uss_mb']:.1f}" if "uss_mb" in r else "n/a"
+        pss = f"{r['pss_mb']:.1f}" if "pss_mb" in r else "n/a"
+        print(f"{name:<10} {r['ready_s']:>8.2f} {r['first_ms']:>9.1f} {r['steady_ms']:>10.1f} {uss:>8} {pss:>8}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# benchmarks/bench_wiki_offline.py - Build size and lookup speed of the offline Wikipedia store
+"""
+Builds a maximus_wiki_offline store in a temporary directory and measures:
+
+  build       time to ingest the dump, entries kept, size on disk against
+              the size of the abstracts
+  lookup      mean/p95 time per lookup and the hit rate, for each kind of
+              query:
+                exact     the title as stored
+                typo      one character after the first four replaced
+                          (a bounded fuzzy match)
+                miss      a title that is not in the store
+
+The dump is the bundled fixture (benchmarks/wiki_abstracts_fixture.xml) unless
+--dump names a real one. --synthetic N adds N generated titles to show that
+lookups stay flat as the store grows.
+
+Usage:
+    python -m benchmarks.bench_wiki_offline
+    python -m benchmarks.bench_wiki_offline --synthetic 500000
+    python -m benchmarks.bench_wiki_offline --dump enwiki-latest-abstract.xml.gz
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from maximus_wiki_offline import WikiStore, build, read_dump, normalize
+
+FIXTURE = os.path.join(ROOT, "benchmarks", "wiki_abstracts_fixture.xml")
+SYLLABLES = ("ka ra ma sha va ti lo ne ri da po gu han son ber ley mann ton vic ez ard sky "
+             "bel dor fin gar hol jun kel mor nash pel quin rot sel tam ur wen yor zim").split()
+
+
+def write_synthetic(path, fixture, count, seed):
+    """A TSV dump with the fixture's entries plus `count` generated ones."""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for title, abstract in read_dump(fixture):
+            f.write(f"{title}\t{abstract}\n")
+        for _ in range(count):
+            words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).title()
+                     for _ in range(rng.randint(1, 3))]
+            title = " ".join(words)
+            f.write(f"{title}\t{title} is a synthetic entry. It exists to make the store larger.\n")
+
+
+def queries(titles, count, seed):
+    rng = random.Random(seed)
+    picked = [rng.choice(titles) for _ in range(count)]
+    kinds = {"exact": [], "typo": [], "miss": []}
+    for title in picked:
+        kinds["exact"].append((title, title))
+        key = normalize(title)
+        if len(key) > 8:
+            i = rng.randrange(4, len(key))
+            typo = key[:i] + rng.choice("aeiourstln".replace(key[i], "")) + key[i + 1:]
+            kinds["typo"].append((typo, title))
+        kinds["miss"].append((f"zzq {key} xqv", None))
+    return kinds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build size and lookup speed of the offline Wikipedia store.")
+    parser.add_argument("--dump", default=FIXTURE, help="Abstracts dump to build from (default: the bundled fixture).")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generated titles added to the fixture.")
+    parser.add_argument("--queries", type=int, default=2000, help="Queries of each kind.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="maximus-wiki-")
+    try:
+        dump = args.dump
+        if args.synthetic:
+            dump = os.path.join(directory, "synthetic.tsv")
+            write_synthetic(dump, args.dump, args.synthetic, args.seed)
+        out = os.path.join(directory, "store")
+        t0 = time.perf_counter()
+        count = build(dump, out)
+        build_s = time.perf_counter() - t0
+        store_bytes = sum(os.path.getsize(os.path.join(out, name)) for name in os.listdir(out))
+        text_bytes = titles = 0
+        sample = []
+        for title, abstract in read_dump(dump):
+            text_bytes += len(title.encode("utf-8")) + len(abstract.encode("utf-8"))
+            titles += 1
+            if len(sample) < 50000:
+                sample.append(title)
+
+        store = WikiStore(out)
+        print(f"{count} entries ({titles} in the dump) built in {build_s:.2f} s; "
+              f"{store_bytes / 1024:.0f} KiB on disk for {text_bytes / 1024:.0f} KiB of text\n")
+        print(f"{'query':<8} {'hits':>7} {'mean ms':>8} {'p95 ms':>8}")
+        for kind, pairs in queries(sample, args.queries, args.seed).items():
+            if not pairs:
+                continue
+            timings, hits = [], 0
+            for query, expected in pairs:
+                start = time.perf_counter()
+                match = store.lookup(query)
+                timings.append(time.perf_counter() - start)
+                hits += (match is None) if expected is None else (match is not None and match.title == expected)
+            timings.sort()
+            print(f"{kind:<8} {hits / len(pairs):>7.1%} {sum(timings) / len(timings) * 1000:>8.3f} "
+                  f"{timings[int(0.95 * (len(timings) - 1))] * 1000:>8.3f}")
+        store.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# benchmarks/fake_gemini.py - Local stand-in for the Gemini generateContent API
+"""
+A small HTTP server that speaks enough of the Gemini REST API
+(POST /v1beta/models/<model>:generateContent) for google-generativeai to talk
+to it, with tunable latency and error injection.
+
+    python -m benchmarks.fake_gemini --port 8765 --latency 800 --jitter 400 --error-rate 0.02
+
+Point the assistant at it with:
+
+    GEMINI_API_KEY=fake GEMINI_API_ENDPOINT=http://127.0.0.1:8765 python manage.py runserver --noreload
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+REPLIES = [
+    "Sure! Here's a quick answer: it depends, but usually yes.",
+    "Python was created by Guido van Rossum and first released in 1991.",
+    "The mitochondria is the powerhouse of the cell.",
+    "I'd suggest breaking the problem into smaller steps and tackling them one by one.",
+]
+
+
+class FakeGeminiConfig:
+    def __init__(self, latency=0.5, jitter=0.0, error_rate=0.0, error_status=500, max_concurrency=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        # Simulates an upstream rate limit: requests beyond this many in flight get 429
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.served = 0
+        self.failed = 0
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    config = None  # set by make_server()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        names = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE"}
+        self._send_json(status, {"error": {"code": status, "message": message, "status": names.get(status, "UNKNOWN")}})
+
+    def do_POST(self):
+        cfg = self.config
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b""
+
+        if ":generateContent" not in self.path:
+            self._error(404, f"Unknown method {self.path}")
+            return
+
+        with cfg.lock:
+            if cfg.max_concurrency and cfg.in_flight >= cfg.max_concurrency:
+                cfg.failed += 1
+                overloaded = True
+            else:
+                cfg.in_flight += 1
+                overloaded = False
+            delay = cfg.latency + (cfg.rng.uniform(0, cfg.jitter) if cfg.jitter else 0.0)
+            fail = cfg.rng.random() < cfg.error_rate
+            reply = cfg.rng.choice(REPLIES)
+
+        if overloaded:
+            self._error(429, "Resource has been exhausted (fake rate limit).")
+            return
+
+        try:
+            time.sleep(delay)
+            if fail:
+                with cfg.lock:
+                    cfg.failed += 1
+                self._error(cfg.error_status, "Injected failure from fake Gemini server.")
+                return
+            try:
+                prompt = json.loads(raw)["contents"][-1]["parts"][-1]["text"]
+            except Exception:
+                prompt = ""
+            text = f"{reply} (You asked: {prompt.rsplit('User:', 1)[-1].split('Model:', 1)[0].strip()[:80]})"
+            with cfg.lock:
+                cfg.served += 1
+            self._send_json(200, {
+                "candidates": [{
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": 1,
+                    "index": 0,
+                }],
+                "usageMetadata": {"promptTokenCount": len(prompt.split()), "candidatesTokenCount": len(text.split())},
+            })
+        finally:
+            with cfg.lock:
+                cfg.in_flight -= 1
+
+
+def make_server(host="127.0.0.1", port=8765, config=None):
+    """Returns a ready-to-serve ThreadingHTTPServer (port 0 picks a free port)."""
+    handler = type("BoundFakeGeminiHandler", (FakeGeminiHandler,), {"config": config or FakeGeminiConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_background(**kwargs):
+    """Starts a server on a free port in a daemon thread. Returns (server, base_url)."""
+    server = make_server(port=0, config=FakeGeminiConfig(**kwargs))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=500, help="Base response latency in milliseconds.")
+    parser.add_argument("--jitter", type=float, default=0, help="Extra uniform random latency in milliseconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail (0..1).")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status used for injected failures.")
+    parser.add_argument("--max-concurrency", type=int, default=0,
+                        help="Answer 429 beyond this many requests in flight (0 = unlimited).")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    config = FakeGeminiConfig(
+        latency=args.latency / 1000.0,
+        jitter=args.jitter / 1000.0,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        max_concurrency=args.max_concurrency,
+        seed=args.seed,
+    )
+    server = make_server(args.host, args.port, config)
+    print(f"Fake Gemini listening on http://{args.host}:{args.port} "
+          f"(latency {args.latency:.0f}+{args.jitter:.0f} ms, error rate {args.error_rate:.1%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {config.served} responses, {config.failed} failures.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
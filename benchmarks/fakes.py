@@ -0,0 +1,168 @@
+# benchmarks/fakes.py - In-process stand-ins for every network dependency
+"""
+FakeUpstreams patches requests, wikipedia, Gemini and googletrans with fakes
+that answer instantly (or after a configurable latency), so the command
+pipeline can be benchmarked without a network connection and without noise
+from real services.
+
+    with FakeUpstreams(latency=0.05, jitter=0.01):
+        assistant.process_command("weather in pune")
+"""
+
+import json
+import random
+import threading
+import time
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+        self.content = text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeGeminiResult:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    def __init__(self, upstreams, model_name, **kwargs):
+        self.upstreams = upstreams
+        self.model_name = model_name
+
+    def generate_content(self, prompt, **kwargs):
+        self.upstreams.wait("gemini")
+        return FakeGeminiResult("Python was created by Guido van Rossum and first released in 1991.")
+
+
+class FakeTranslation:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeTranslator:
+    def __init__(self, upstreams):
+        self.upstreams = upstreams
+
+    def translate(self, text, dest="en", **kwargs):
+        self.upstreams.wait("translate")
+        return FakeTranslation(text)
+
+
+class FakeUpstreams:
+    """Context manager that swaps all upstream calls for in-process fakes.
+
+    latency: seconds to sleep per upstream call (float, or dict keyed by
+             service name: weather, mathjs, facts, wikipedia, gemini, translate)
+    jitter:  uniform random extra delay in seconds, added on top of latency
+    transports: set to False to leave requests/wikipedia/Gemini/googletrans
+             untouched, e.g. when a replay cassette serves them instead
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=1234, transports=True):
+        self.transports = transports
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._patches = []
+
+    def wait(self, service):
+        with self._lock:
+            self.calls[service] = self.calls.get(service, 0) + 1
+            extra = self.rng.uniform(0, self.jitter) if self.jitter else 0.0
+        base = self.latency.get(service, 0.0) if isinstance(self.latency, dict) else self.latency
+        if base + extra > 0:
+            time.sleep(base + extra)
+
+    # --- Fake transports ---
+    def _get(self, url, *args, **kwargs):
+        if "wttr.in" in url:
+            self.wait("weather")
+            return FakeResponse("pune: ☀️   +31°C")
+        if "uselessfacts" in url:
+            self.wait("facts")
+            return FakeResponse(json.dumps({"text": "Honey never spoils."}))
+        self.wait("http")
+        return FakeResponse("", status_code=404)
+
+    def _post(self, url, *args, **kwargs):
+        if "mathjs" in url:
+            self.wait("mathjs")
+            return FakeResponse("42")
+        self.wait("http")
+        return FakeResponse("", status_code=404)
+
+    def _wiki_summary(self, topic, *args, **kwargs):
+        self.wait("wikipedia")
+        return f"{topic.title()} is a topic with a long and interesting history. It is widely studied."
+
+    def _model(self, model_name, **kwargs):
+        return FakeGenerativeModel(self, model_name, **kwargs)
+
+    # --- Patching ---
+    def _patch(self, obj, attr, value):
+        self._patches.append((obj, attr, getattr(obj, attr, None)))
+        setattr(obj, attr, value)
+
+    def install(self):
+        if not self.transports:
+            return self
+
+        import requests
+        self._patch(requests, "get", self._get)
+        self._patch(requests, "post", self._post)
+
+        try:
+            import wikipedia
+            self._patch(wikipedia, "summary", self._wiki_summary)
+        except ImportError:
+            pass
+
+        try:
+            import google.generativeai as genai
+            self._patch(genai, "GenerativeModel", self._model)
+        except ImportError:
+            pass
+
+        import maximus_upstream
+        self._patch(maximus_upstream, "translator", FakeTranslator(self))
+        if maximus_upstream.wikipedia is None:
+            self._patch(maximus_upstream, "wikipedia", _WikipediaShim(self))
+        return self
+
+    def patch_module(self, module):
+        """Points an already-imported assistant module at the fakes (API keys, missing wikipedia)."""
+        if hasattr(module, "API_KEY"):
+            self._patch(module, "API_KEY", "fake-key")
+        if hasattr(module, "api_key"):
+            self._patch(module, "api_key", "fake-key")
+        if self.transports and getattr(module, "wikipedia", False) is None:
+            self._patch(module, "wikipedia", _WikipediaShim(self))
+
+    def uninstall(self):
+        while self._patches:
+            obj, attr, old = self._patches.pop()
+            setattr(obj, attr, old)
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.uninstall()
+        return False
+
+
+class _WikipediaShim:
+    """Used when the wikipedia package itself is not installed."""
+    def __init__(self, upstreams):
+        self.upstreams = upstreams
+
+    def summary(self, topic, *args, **kwargs):
+        return self.upstreams._wiki_summary(topic)
@@ -0,0 +1,215 @@
+# benchmarks/loadgen.py - Capacity test for the /chat/ endpoint
+"""
+Replays a JSONL corpus of chat messages ({"message": ...} per line) against
+/chat/ and reports throughput and latency at each load level, so you can see
+where latency collapses.
+
+Closed loop (N users sending back-to-back):
+    python -m benchmarks.loadgen --concurrency 1,2,4,8,16,32 --duration 20
+
+Open loop (Poisson arrivals at a fixed rate, latency includes queueing):
+    python -m benchmarks.loadgen --rate 5,10,20,40 --duration 20 --max-inflight 256
+
+Typical setup, with the local Gemini stand-in:
+    python -m benchmarks.fake_gemini --port 8765 --latency 800 --jitter 400
+    GEMINI_API_KEY=fake GEMINI_API_ENDPOINT=http://127.0.0.1:8765 python manage.py runserver --noreload
+    python -m benchmarks.loadgen --concurrency 1,2,4,8,16 --json load_report.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat_corpus.jsonl")
+
+
+def load_corpus(path):
+    messages = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                messages.append(json.loads(line)["message"])
+    if not messages:
+        raise ValueError(f"Corpus {path} is empty.")
+    return messages
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+
+    def add(self, latency, status, ok):
+        with self.lock:
+            self.latencies.append(latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if not ok:
+                self.errors += 1
+
+    def summary(self, label, elapsed):
+        ordered = sorted(self.latencies)
+        ok = len(ordered) - self.errors
+        return {
+            "level": label,
+            "requests": len(ordered),
+            "ok": ok,
+            "errors": self.errors,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items(), key=lambda kv: str(kv[0]))},
+            "throughput_rps": ok / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(ordered, 0.5) * 1000,
+            "p95_ms": percentile(ordered, 0.95) * 1000,
+            "p99_ms": percentile(ordered, 0.99) * 1000,
+            "max_ms": (ordered[-1] * 1000) if ordered else 0.0,
+        }
+
+
+_local = threading.local()
+
+
+def send(url, message, timeout):
+    """Posts one message. Returns (status, ok). Each worker thread keeps its own keep-alive session."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    try:
+        resp = session.post(url, json={"message": message}, timeout=timeout)
+        ok = resp.status_code == 200 and resp.json().get("status") == "success"
+        return resp.status_code, ok
+    except requests.Timeout:
+        return "timeout", False
+    except Exception:
+        return "conn_error", False
+
+
+def run_closed(url, corpus, concurrency, duration, timeout, rng):
+    rec = Recorder()
+    stop_at = time.perf_counter() + duration
+
+    def user(seed):
+        local_rng = random.Random(seed)
+        while time.perf_counter() < stop_at:
+            msg = local_rng.choice(corpus)
+            t0 = time.perf_counter()
+            status, ok = send(url, msg, timeout)
+            rec.add(time.perf_counter() - t0, status, ok)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(rng.random(),), daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return rec.summary(f"{concurrency} users", time.perf_counter() - start)
+
+
+def run_open(url, corpus, rate, duration, timeout, max_inflight, rng):
+    """Poisson arrivals. Latency is measured from the scheduled send time, so
+    time spent waiting for a free client slot counts (no coordinated omission)."""
+    rec = Recorder()
+
+    def fire(scheduled, msg):
+        status, ok = send(url, msg, timeout)
+        rec.add(time.perf_counter() - scheduled, status, ok)
+
+    start = time.perf_counter()
+    next_at = start
+    with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+        while next_at < start + duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, next_at, rng.choice(corpus))
+            next_at += rng.expovariate(rate)
+    return rec.summary(f"{rate:g} req/s", time.perf_counter() - start)
+
+
+def find_knee(results):
+    """First level whose p95 is more than 3x the lightest level's p95, or whose
+    throughput drops below the previous level's."""
+    if len(results) < 2:
+        return None
+    base = results[0]["p95_ms"] or 1e-9
+    for prev, cur in zip(results, results[1:]):
+        if cur["p95_ms"] > 3 * base or cur["throughput_rps"] < prev["throughput_rps"] * 0.95:
+            return cur["level"]
+    return None
+
+
+def print_report(results):
+    print(f"\n{'load':<14} {'reqs':>7} {'errors':>7} {'ok rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  curve")
+    peak = max((r["throughput_rps"] for r in results), default=0) or 1
+    for r in results:
+        bar = "#" * int(30 * r["throughput_rps"] / peak)
+        print(f"{r['level']:<14} {r['requests']:>7} {r['errors']:>7} {r['throughput_rps']:>8.1f} "
+              f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}  {bar}")
+    knee = find_knee(results)
+    if knee:
+        print(f"\nLatency collapses at: {knee}")
+    else:
+        print("\nNo saturation point detected in the tested range.")
+
+
+def parse_levels(text, cast):
+    return [cast(x) for x in text.split(",") if x.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the Maximus /chat/ endpoint.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/chat/")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", default="1,2,4,8,16", help="Comma-separated closed-loop user counts.")
+    mode.add_argument("--rate", help="Comma-separated open-loop arrival rates (requests/second).")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per load level.")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request client timeout in seconds.")
+    parser.add_argument("--max-inflight", type=int, default=256, help="Client slots for open-loop mode.")
+    parser.add_argument("--cooldown", type=float, default=2, help="Pause between levels in seconds.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write the full report to this file.")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    rng = random.Random(args.seed)
+    results = []
+
+    if args.rate:
+        levels = parse_levels(args.rate, float)
+        runner = lambda level: run_open(args.url, corpus, level, args.duration, args.timeout, args.max_inflight, rng)
+    else:
+        levels = parse_levels(args.concurrency, int)
+        runner = lambda level: run_closed(args.url, corpus, level, args.duration, args.timeout, rng)
+
+    for i, level in enumerate(levels):
+        if i:
+            time.sleep(args.cooldown)
+        print(f"Running load level {level:g} for {args.duration:g}s...")
+        results.append(runner(level))
+
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "mode": "open" if args.rate else "closed",
+                       "duration": args.duration, "results": results, "knee": find_knee(results)}, f, indent=2)
+        print(f"Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# benchmarks/stt_bench.py - Latency and word error rate of the speech-to-text backends
+"""
+Runs every backend in maximus_stt over a directory of WAV fixtures and reports
+latency (mean/p50/p95) and word error rate per backend. Each fixture is a WAV
+file with a transcript next to it:
+
+    benchmarks/stt_fixtures/weather_pune.wav
+    benchmarks/stt_fixtures/weather_pune.txt     "what is the weather in pune"
+
+Usage:
+    python -m benchmarks.stt_bench                                  # all available backends
+    python -m benchmarks.stt_bench --backends vosk,sphinx --fixtures my_clips/
+    python -m benchmarks.stt_bench --stage wake                     # keyword-restricted mode
+    python -m benchmarks.stt_bench --record "what is the weather in pune" --name weather_pune
+
+--record captures one fixture from the microphone (reading the given sentence
+aloud) and writes the WAV and transcript into the fixtures directory.
+WER = (substitutions + deletions + insertions) / reference words, over all fixtures.
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import speech_recognition as sr
+
+import maximus_stt
+
+DEFAULT_FIXTURES = os.path.join(ROOT, "benchmarks", "stt_fixtures")
+WAKE_WORD = "maximus"
+
+
+def normalize_words(text):
+    return "".join(c if c.isalnum() or c.isspace() else " " for c in text.lower()).split()
+
+
+def word_edits(reference, hypothesis):
+    """Levenshtein distance between two word lists."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for wav in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        transcript = os.path.splitext(wav)[0] + ".txt"
+        if not os.path.exists(transcript):
+            print(f"Skipping {os.path.basename(wav)}: no transcript")
+            continue
+        with open(transcript, "r", encoding="utf-8") as f:
+            reference = f.read().strip()
+        with sr.AudioFile(wav) as source:
+            audio = sr.Recognizer().record(source)
+        fixtures.append((os.path.basename(wav), audio, reference))
+    return fixtures
+
+
+def bench_backend(backend, fixtures, verbose):
+    latencies = []
+    edits = words = failures = 0
+    for name, audio, reference in fixtures:
+        t0 = time.perf_counter()
+        try:
+            hypothesis = backend.transcribe(audio)
+        except maximus_stt.STTError as e:
+            failures += 1
+            hypothesis = ""
+            if verbose:
+                print(f"  {backend.name} {name}: error: {e}")
+        latencies.append(time.perf_counter() - t0)
+        ref_words = normalize_words(reference)
+        errors = word_edits(ref_words, normalize_words(hypothesis))
+        edits += errors
+        words += len(ref_words)
+        if verbose:
+            print(f"  {backend.name} {name}: {latencies[-1] * 1000:.0f} ms, {errors} errors: {hypothesis!r}")
+    latencies.sort()
+    return {
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000,
+        "wer": edits / words if words else 0.0,
+        "failures": failures,
+    }
+
+
+def record_fixture(directory, sentence, name):
+    os.makedirs(directory, exist_ok=True)
+    recognizer = sr.Recognizer()
+    with sr.Microphone() as source:
+        recognizer.adjust_for_ambient_noise(source, duration=0.5)
+        print(f"Say: {sentence}")
+        audio = recognizer.listen(source, phrase_time_limit=10)
+    base = os.path.join(directory, name)
+    with open(base + ".wav", "wb") as f:
+        f.write(audio.get_wav_data())
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(sentence + "\n")
+    print(f"Saved {base}.wav")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Speech-to-text backend latency and WER.")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Directory of .wav + .txt fixtures.")
+    parser.add_argument("--backends", default=",".join(maximus_stt.BACKENDS), help="Comma-separated backend names.")
+    parser.add_argument("--stage", choices=maximus_stt.STAGES, default="command",
+                        help="'wake' restricts local backends to the wake word, as in standby.")
+    parser.add_argument("--record", metavar="SENTENCE", help="Record a new fixture of SENTENCE from the microphone.")
+    parser.add_argument("--name", help="File name (without extension) for --record.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every transcription.")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record_fixture(args.fixtures, args.record, args.name or "_".join(normalize_words(args.record))[:40])
+        return 0
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No fixtures in {args.fixtures}. Record some with --record.")
+        return 1
+
+    keywords = [WAKE_WORD] if args.stage == "wake" else None
+    print(f"{len(fixtures)} fixtures, stage '{args.stage}'\n")
+    print(f"{'backend':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'WER':>7} {'failed':>7}")
+    for name in [n.strip() for n in args.backends.split(",") if n.strip()]:
+        backend = maximus_stt.BACKENDS[name](keywords=keywords)
+        if not backend.available():
+            print(f"{name:<10} not available")
+            continue
+        r = bench_backend(backend, fixtures, args.verbose)
+        print(f"{name:<10} {r['mean_ms']:>9.0f} {r['p50_ms']:>9.0f} {r['p95_ms']:>9.0f} {r['wer']:>7.1%} {r['failures']:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
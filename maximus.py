@@ -21,6 +21,7 @@ Features:
 - Gemini-powered witty responses
 - Wake word listener
 - ALL OUTPUTS ARE NOW SPOKEN.
+- Headless batch mode: python maximus.py --batch in.jsonl --out out.jsonl [--workers N]
 """
 
 import os
@@ -31,10 +32,28 @@ import webbrowser
 import json
 import datetime
 import urllib.parse
-import traceback
 import requests
 import subprocess
 import re # Added for robust time/number extraction
+from maximus_metrics import metrics
+import maximus_upstream as upstream
+from maximus_semantic_cache import gemini_cache
+from maximus_speculative import Candidate, resolve
+from maximus_store import JsonStore
+from maximus_stt import STT, STTError
+import maximus_tts_cache
+from maximus_profile import profiler, PROFILE_NEXT_COMMANDS
+from maximus_deadline import budget, COMMAND_BUDGET
+from maximus_intent import intent_classifier
+from maximus_history import ConversationHistory, history_query, parse_time_phrase, describe_results
+from maximus_tasks import TaskStore
+from maximus_contacts import ContactIndex
+from maximus_files import FileIndex
+from maximus_compound import CompoundPlanner, execute, merge
+import maximus_log
+from maximus_log import get_logger, command_context
+
+log = get_logger("desktop")
 
 # --- Try required and optional imports ---
 try:
@@ -92,10 +111,6 @@ try:
     from langdetect import detect
 except ImportError:
     detect = None
-try:
-    from googletrans import Translator
-except ImportError:
-    Translator = None
 
 # optional niceties
 try:
@@ -116,7 +131,11 @@ except:
 DEVICE_NAME = "Maximus"
 CONTACTS_FILE = "contacts.json"
 TASKS_FILE = "tasks.json"
+TASKS_ARCHIVE_FILE = "tasks_archive.json"
 MEMORY_FILE = "memory.json"
+HISTORY_FILE = "conversation_history.jsonl"
+FILE_INDEX_FILE = "file_index.json"
+FILE_INDEX_WAIT = 3  # seconds a file command waits for the very first index build
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 GMAIL_TOKEN = "token.pickle"
 WAKE_WORD = DEVICE_NAME.lower()
@@ -132,55 +151,123 @@ load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
 
 if api_key:
-    genai.configure(api_key=api_key)
+    upstream.configure_gemini(api_key)
     print("[SUCCESS] Gemini API key loaded successfully.")
 else:
     print("[WARNING] GEMINI_API_KEY not found in .env file. Smart responses will be disabled.")
 
 # ---------------- TTS ----------------
-engine = pyttsx3.init()
-engine.setProperty('rate', 165)
-voices = engine.getProperty('voices')
-try:
-    # Try setting to a male or female voice, or default to the first one
-    # Note: Voice index may vary per system.
-    engine.setProperty('voice', voices[0].id) 
-except:
-    pass
-
+# Headless (--batch) runs never touch the speech engine or the microphone
+HEADLESS = False
+# False while commands are typed; follow-up questions are then answered on the keyboard too
+VOICE_INPUT = True
+# Text that speak() would have said, collected per thread while a batch command runs
+_spoken_capture = threading.local()
+# Conversation turns of a batch command running on a pool thread; the main thread writes them in input order
+_turn_capture = threading.local()
+
+# speak() runs on the main thread and on alarm/reminder timer threads; the cache renders in the background
+engine_lock = threading.RLock()
+engine = None
+tts_cache = maximus_tts_cache.TTSCache(None, engine_lock, enabled=False)  # replaced by init_tts()
+
+def init_tts():
+    """Starts the speech engine on first use (it is slow to start and needs audio hardware)."""
+    global engine, tts_cache
+    with engine_lock:
+        if engine is not None:
+            return
+        engine = pyttsx3.init()
+        engine.setProperty('rate', 165)
+        voices = engine.getProperty('voices')
+        try:
+            # Try setting to a male or female voice, or default to the first one
+            # Note: Voice index may vary per system.
+            engine.setProperty('voice', voices[0].id) 
+        except:
+            pass
+        tts_cache = maximus_tts_cache.from_env(engine, engine_lock)
+
+# Said often enough to be worth rendering ahead of time (see maximus_tts_cache.py)
+FIXED_PHRASES = [
+    "Yes? I'm listening.",
+    "Acknowledged. Initiating stand-by mode. Say my name to reactivate.",
+    f"Systems check complete. I am {DEVICE_NAME}, online and ready.",
+    "Goodbye. Shutting down all systems.",
+    "Program exit confirmed. Goodbye.",
+    "Text mode finished. Returning to menu.",
+    "You have no outstanding tasks.",
+    "I didn't catch that. Say 'help' to hear what I can do.",
+]
+
+@metrics.timed("tts.speak")
 def speak(text):
     """Speak and print (centralized so we can change voice engine later)"""
     # Ensure text is converted to string for pyttsx3
     text = str(text) 
     print(f"[{DEVICE_NAME}] {text}")
+    if HEADLESS:
+        spoken = getattr(_spoken_capture, "lines", None)
+        if spoken is not None:
+            spoken.append(text)
+        return
+    init_tts()
+    if tts_cache.play(text):
+        return
     try:
-        engine.say(text)
-        engine.runAndWait()
+        with engine_lock:
+            engine.say(text)
+            engine.runAndWait()
+        tts_cache.note_spoken(text)
     except Exception as e:
-        print("TTS error:", e)
+        log.warning("TTS error: %s", e)
 
 # ---------------- Speech Recognition ----------------
 recognizer = sr.Recognizer()
+# Backends per stage come from MAXIMUS_STT_WAKE / MAXIMUS_STT_COMMAND (see maximus_stt.py)
+stt = STT(recognizer, wake_words=[WAKE_WORD])
 
 def listen_once(timeout=None, phrase_time_limit=None):
     """Record once from microphone and return recognized text (lowercased)."""
+    if HEADLESS:
+        return ""  # no microphone in batch mode; interactive prompts are cancelled
     with sr.Microphone() as source:
         recognizer.adjust_for_ambient_noise(source, duration=0.5)
         print("Listening...")
         try:
-            audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+            with metrics.timer("stt.capture"):
+                audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
         except Exception as ex:
-            print("Recording error:", ex)
+            log.warning("Recording error: %s", ex)
             return ""
     try:
-        text = recognizer.recognize_google(audio).lower()
-        print("Heard:", text)
+        text, backend = stt.recognize("command", audio)
+        if text:
+            print(f"Heard ({backend}):", text)
         return text
-    except sr.UnknownValueError:
-        return ""
     except Exception as e:
-        print("Speech recognition error:", e)
+        log.warning("Speech recognition error: %s", e)
+        return ""
+
+def listen_reply(timeout=None, phrase_time_limit=None):
+    """The answer to a follow-up question, through the current input path: the microphone
+    in voice mode, the keyboard in text mode, nothing in headless mode."""
+    if HEADLESS:
         return ""
+    if not VOICE_INPUT:
+        try:
+            return input(f"[{DEVICE_NAME} Text Mode] Reply: ").strip()
+        except EOFError:
+            return ""
+    return listen_once(timeout=timeout, phrase_time_limit=phrase_time_limit)
+
+YES_WORDS = {"yes", "yeah", "yep", "sure", "confirm", "confirmed"}
+NO_WORDS = {"no", "nope", "not", "dont", "don't", "wait", "cancel", "stop"}
+
+def is_yes(reply):
+    """True for a clear yes: a whole-word yes and no word of refusal ("yes no wait" is not)."""
+    words = set(re.findall(r"[a-z']+", reply.lower()))
+    return bool(words & YES_WORDS) and not words & NO_WORDS
 
 def get_command_input():
     """Provides a menu to choose between voice and text input."""
@@ -204,6 +291,7 @@ def get_command_input():
         return get_command_input() # Loop until valid input
 
 # ---------------- Storage Helpers ----------------
+@metrics.timed("storage.load")
 def safe_load_json(path, default):
     try:
         if not os.path.exists(path):
@@ -211,48 +299,77 @@ def safe_load_json(path, default):
         with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except Exception as e:
-        print(f"Failed to load {path}:", e)
+        log.warning("Failed to load %s: %s", path, e)
         return default
 
+@metrics.timed("storage.save")
 def safe_save_json(path, data):
     try:
         with open(path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
     except Exception as e:
-        print(f"Failed to save {path}:", e)
+        log.error("Failed to save %s: %s", path, e)
 
 # ---------------- Contacts / Memory ----------------
+# Parsed once and kept in RAM; reloaded only if another process changes the file.
+# Changes are written back once per command by flush_stores().
+contacts_store = JsonStore(CONTACTS_FILE, dict)
+memory_store = JsonStore(MEMORY_FILE, lambda: {"facts": {}, "conversations": []})
+task_store = TaskStore(TASKS_FILE, TASKS_ARCHIVE_FILE)
+# Every conversation line, never truncated; searchable with "search my history for ..."
+history = ConversationHistory(HISTORY_FILE)
+history.warm()
+# Spoken names -> numbers for "send whatsapp to <name>"; follows contacts.json as it changes
+contact_index = ContactIndex(contacts_store)
+contact_index.warm()
+# File names under MAXIMUS_FILE_ROOTS for "find file" / open / delete by name; started with the listener
+file_index = FileIndex(FILE_INDEX_FILE)
+
+def flush_stores():
+    for store in (memory_store, task_store, contacts_store):
+        store.flush()
+
 def load_contacts():
-    return safe_load_json(CONTACTS_FILE, {})
+    return contacts_store.get()
 
 def load_memory():
-    return safe_load_json(MEMORY_FILE, {"facts": {}, "conversations": []})
+    return memory_store.get()
 
 def remember_fact(key, value):
     mem = load_memory()
     mem["facts"][key] = value
-    safe_save_json(MEMORY_FILE, mem)
+    memory_store.mark_dirty()
     speak(f"Saved: {key} equals {value}")
 
 def recall_fact(key):
     mem = load_memory()
     return mem["facts"].get(key)
 
-def append_conversation(role, text):
+def append_conversation(role, text, searchable=True):
+    turns = getattr(_turn_capture, "turns", None)
+    if turns is not None:
+        if text != "SLEEP_MODE":
+            turns.append((role, text, searchable))
+        return
     mem = load_memory()
     # Ensure text is clean and not the "SLEEP_MODE" signal
     if text != "SLEEP_MODE":
         mem["conversations"].append({"time": datetime.datetime.now().isoformat(), "role": role, "text": text})
         # cap conversation history to last 20 lines
         mem["conversations"] = mem["conversations"][-20:]
-        safe_save_json(MEMORY_FILE, mem)
+        memory_store.mark_dirty()
+        history.append(role, text, searchable)
 
-# ---------------- AI/Gemini ----------------
-def get_gemini_response(prompt, memory):
-    """Gets an intelligent, context-aware response from the Gemini API."""
-    if not api_key:
-        return "The AI core is offline. Please install and configure the Gemini API key."
+@metrics.timed("handler.history")
+def search_history(query, limit=3):
+    query, since = parse_time_phrase(query)
+    if not query:
+        return "What should I search your history for?"
+    return describe_results(query, history.search(query, limit=limit, since=since))
 
+# ---------------- AI/Gemini ----------------
+def build_gemini_prompt(prompt, memory):
+    """Wraps the user prompt with the system persona and recent conversation history."""
     # Build the message history for context
     history_text = ""
     # Add recent conversation history from memory
@@ -261,20 +378,29 @@ def get_gemini_response(prompt, memory):
         history_text += f"{role}: {conv['text']}\n"
     
     # Add the current user prompt
-    full_prompt = f"System: You are a witty, helpful, and powerful desktop AI assistant named {DEVICE_NAME}. Keep responses concise and engaging. Only answer if the command cannot be handled by a specific tool.\n{history_text}User: {prompt}\nModel:"
+    return f"System: You are a witty, helpful, and powerful desktop AI assistant named {DEVICE_NAME}. Keep responses concise and engaging. Only answer if the command cannot be handled by a specific tool.\n{history_text}User: {prompt}\nModel:"
 
+@metrics.timed("handler.gemini")
+def get_gemini_response(prompt, memory):
+    """Gets an intelligent, context-aware response from the Gemini API."""
+    if not api_key:
+        return "The AI core is offline. Please install and configure the Gemini API key."
+
+    cached = gemini_cache.lookup(prompt)
+    if cached is not None:
+        return cached
+
+    full_prompt = build_gemini_prompt(prompt, memory)
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(full_prompt)
-        text = response.text.strip()
+        text = upstream.gemini_generate(full_prompt).strip()
+        gemini_cache.store(prompt, text)
         return text
     except Exception as e:
-        print(f"Gemini API Error: {e}")
+        log.error("Gemini API error: %s", e)
         return "I apologize, but my connection to the AI matrix is experiencing turbulence."
 
 # ---------------- Translation ----------------
-translator = Translator() if Translator else None
-
+@metrics.timed("lang.detect")
 def detect_language(text):
     if not detect:
         return None
@@ -283,23 +409,26 @@ def detect_language(text):
     except:
         return None
 
+@metrics.timed("lang.translate")
 def translate_to_english(text):
-    if not translator:
+    if not upstream.translator:
         return text
     try:
-        res = translator.translate(text, dest='en')
-        return res.text
+        return upstream.translate(text, dest='en')
     except Exception as e:
-        print("Translate error:", e)
+        log.warning("Translate error: %s", e)
         return text
 
 # ---------------- Math (SymPy + mathjs fallback) ----------------
+MATH_OPERATORS = ['+', '-', '*', '/', 'mod', 'plus', 'minus', 'times']
+
 def safe_sympy_expr(expr_str):
     """Try to parse the expression into sympy-friendly string, handling common voice errors."""
     expr_str = expr_str.replace('^', '').replace('×', '*').replace('÷', '/')
     expr_str = expr_str.replace('power of', '').replace('to the power', '')
     return expr_str
 
+@metrics.timed("handler.math.derivative")
 def compute_derivative(expr_str):
     if not sp: return "SymPy not available. Cannot compute derivatives."
     try:
@@ -314,9 +443,10 @@ def compute_derivative(expr_str):
         d = sp.diff(expr, x)
         return f"The derivative of {expr_str} with respect to x is {d}."
     except Exception as e:
-        print("Derivative error:", e)
+        log.warning("Derivative error: %s", e)
         return "I had trouble computing that derivative. Ensure your expression is valid."
 
+@metrics.timed("handler.math.integral")
 def compute_integral(expr_str):
     if not sp: return "SymPy not available. Cannot compute integrals."
     try:
@@ -329,9 +459,10 @@ def compute_integral(expr_str):
         I = sp.integrate(expr, x)
         return f"The indefinite integral is {I} plus C."
     except Exception as e:
-        print("Integral error:", e)
+        log.warning("Integral error: %s", e)
         return "I couldn't compute that integral."
 
+@metrics.timed("handler.math.solve")
 def solve_equation(eq_str):
     if not sp: return "SymPy not available. Cannot solve equations."
     try:
@@ -359,9 +490,10 @@ def solve_equation(eq_str):
         else:
             return "The equation has no simple solutions, or I could not find them."
     except Exception as e:
-        print("Solve error:", e)
+        log.warning("Solve error: %s", e)
         return "I couldn't solve that equation. Please check the format."
 
+@metrics.timed("handler.math.arithmetic")
 def evaluate_arithmetic(expr_str):
     if sp:
         try:
@@ -377,7 +509,7 @@ def evaluate_arithmetic(expr_str):
             return f"The result is approximately: {val}"
         except Exception as e:
             # Fallback for complex arithmetic or if SymPy fails
-            print("SymPy arithmetic failed, attempting mathjs/AI fallback:", e)
+            log.warning("SymPy arithmetic failed, attempting mathjs/AI fallback: %s", e)
             pass
             
     # fallback to mathjs public API for robust arithmetic
@@ -385,7 +517,7 @@ def evaluate_arithmetic(expr_str):
         url = "https://api.mathjs.org/v4/"
         # Re-parse for mathjs API compatibility (uses ** for power, which is fine)
         expr_str = expr_str.replace('^', '').replace('×', '*').replace('÷', '/')
-        resp = requests.post(url, json={"expr": expr_str}, timeout=8)
+        resp = upstream.http_post(url, json={"expr": expr_str}, timeout=8, service="mathjs", hedge=True)
         if resp.status_code == 200:
             result = resp.text.strip()
             # Mathjs returns "invalid expression" on failure
@@ -393,35 +525,59 @@ def evaluate_arithmetic(expr_str):
                 return "Could not evaluate expression. Please check the math syntax."
             return f"The result is: {result}"
     except Exception as e:
-        print("mathjs fallback error:", e)
+        log.warning("mathjs fallback error: %s", e)
     return "I could not evaluate that mathematical expression."
 
 # ---------------- Weather (wttr.in) ----------------
+@metrics.timed("handler.weather")
 def get_weather_simple(location_text=""):
     try:
+        # Normalised so identical concurrent lookups coalesce into one request
+        location_text = " ".join(location_text.lower().split())
         if location_text:
             url = f"https://wttr.in/{urllib.parse.quote(location_text)}?format=3"
         else:
             url = "https://wttr.in/?format=3"
-        r = requests.get(url, timeout=6)
+        r = upstream.http_get(url, timeout=6, service="weather")
         if r.status_code == 200:
             return r.text.strip()
     except Exception as e:
-        print("Weather error:", e)
+        log.warning("Weather error: %s", e)
     return "I could not retrieve weather data at this time."
 
 # ---------------- Wikipedia ----------------
+@metrics.timed("handler.wikipedia")
 def wiki_summary(topic):
-    if not wikipedia:
+    if not upstream.wiki_available():
         return "Wikipedia module not installed."
     try:
         # Auto-correct the topic name (like voice does)
         topic = topic.replace("what is", "").replace("who is", "").strip()
-        return wikipedia.summary(topic, sentences=2)
+        return upstream.wiki_summary(topic, sentences=2)
     except Exception as e:
-        print("Wikipedia error:", e)
+        log.warning("Wikipedia error: %s", e)
         return f"Couldn't find Wikipedia info for {topic}."
 
+# ---------------- Questions (memory / Wikipedia / Gemini in parallel) ----------------
+# Per-source deadlines in seconds, measured from when the question is asked
+QUESTION_DEADLINES = {"memory": 0.05, "wikipedia": 2.5, "gemini": 8.0}
+
+@metrics.timed("handler.question")
+def answer_question(topic, original, memory):
+    """Answers 'what is / who is / tell me about' by racing a remembered fact, Wikipedia
+    and Gemini; the most preferred source that answers in time wins. Returns None if none did."""
+    candidates = [Candidate("memory", lambda cancel: recall_fact(topic), QUESTION_DEADLINES["memory"])]
+    if upstream.wiki_available() and topic:
+        candidates.append(Candidate("wikipedia", lambda cancel: upstream.wiki_summary(topic, sentences=2),
+                                    QUESTION_DEADLINES["wikipedia"]))
+    if api_key:
+        candidates.append(Candidate("gemini", lambda cancel: upstream.gemini_generate(build_gemini_prompt(original, memory)).strip(),
+                                    QUESTION_DEADLINES["gemini"]))
+    source, answer = resolve(candidates)
+    if source == "memory":
+        return f"{topic} is {answer}."
+    return answer
+
 # ---------------- YouTube / Spotify / Maps ----------------
 def play_youtube(query):
     if pywhatkit:
@@ -429,7 +585,7 @@ def play_youtube(query):
             pywhatkit.playonyt(query)
             return f"Playing {query} on YouTube. Check your browser now."
         except Exception as e:
-            print("YouTube play error:", e)
+            log.warning("YouTube play error: %s", e)
     # fallback
     url = f"https://www.youtube.com/results?search_query={urllib.parse.quote(query)}"
     webbrowser.open_new_tab(url)
@@ -442,6 +598,24 @@ def open_maps(destination):
     return f"Opened Google Maps for directions to {destination}."
 
 # ---------------- WhatsApp ----------------
+def resolve_recipient(spoken):
+    """Number and display name for a spoken contact name or phone number; (None, reason) if unresolved."""
+    if re.search(r'\d{5,}', spoken.replace(" ", "")):
+        return spoken, spoken
+    matches = contact_index.lookup(spoken)
+    if not matches:
+        return None, f"I couldn't find {spoken} in your contacts."
+    choice = contact_index.resolve(spoken)
+    if choice is None:
+        names = [m.name for m in matches]
+        speak(f"Did you mean {', '.join(names[:-1])} or {names[-1]}?")
+        choice = contact_index.pick(listen_reply(timeout=8, phrase_time_limit=5), matches)
+        if choice is None:
+            return None, "Cancelled. I wasn't sure who you meant."
+    if not choice.number:
+        return None, f"{choice.name} has no phone number saved."
+    return choice.number, choice.name
+
 def send_whatsapp_by_number(number, message):
     if not pywhatkit:
         return "pywhatkit not installed."
@@ -458,7 +632,7 @@ def send_whatsapp_by_number(number, message):
         pywhatkit.sendwhatmsg(number, message, target_hour, target_min, wait_time=15, tab_close=True)
         return f"WhatsApp message scheduled for {target_hour:02}:{target_min:02}. Your browser will open shortly."
     except Exception as e:
-        print("WhatsApp error:", e)
+        log.warning("WhatsApp error: %s", e)
         return "Failed to schedule WhatsApp message."
 
 # ---------------- Gmail ----------------
@@ -480,6 +654,7 @@ def get_gmail_service():
     service = build('gmail', 'v1', credentials=creds)
     return service
 
+@metrics.timed("handler.gmail")
 def read_unread_emails(service, max_count=3):
     try:
         res = service.users().messages().list(userId='me', labelIds=['INBOX'], q="is:unread").execute()
@@ -496,45 +671,37 @@ def read_unread_emails(service, max_count=3):
         # Convert list of strings to a single string for speaking
         return ". ".join(out)
     except Exception as e:
-        print("Gmail read error:", e)
+        log.warning("Gmail read error: %s", e)
         return "Failed to read Gmail. Check your credentials and token file."
 
 
 # ---------------- To-dos ----------------
-# [To-do functions remain unchanged]
-def load_tasks(): return safe_load_json(TASKS_FILE, [])
-def save_tasks(tasks): safe_save_json(TASKS_FILE, tasks)
+# Completed tasks are moved to TASKS_ARCHIVE_FILE, so these only scan pending work.
+SPOKEN_TASK_LIMIT = 10
+
+def load_tasks(): return task_store.pending()
 
 def add_task(text):
-    tasks = load_tasks()
-    tasks.append({"id": int(time.time()*1000), "text": text, "done": False})
-    save_tasks(tasks)
+    task_store.add(text)
     return f"Added task: {text}"
 
 def list_tasks():
-    tasks = load_tasks()
-    undone = [t for t in tasks if not t.get("done")]
+    undone = task_store.pending()
     if not undone:
         return "You have no outstanding tasks."
     out = [f"You have {len(undone)} tasks remaining:"]
-    for t in undone:
+    for t in undone[:SPOKEN_TASK_LIMIT]:
         # Use a shorter ID for speaking/reading
         short_id = str(t['id'])[-4:]
         out.append(f"ID {short_id}: {t['text']}")
+    if len(undone) > SPOKEN_TASK_LIMIT:
+        out.append(f"And {len(undone) - SPOKEN_TASK_LIMIT} more")
     # Convert list of strings to a single string for speaking
     return ". ".join(out)
 
 def mark_task_done(task_id_part):
-    tasks = load_tasks()
-    found = False
-    for t in tasks:
-        # Match against the full ID or the last 4 digits (easier for voice)
-        if str(t['id']).endswith(str(task_id_part)):
-            t['done'] = True
-            found = True
-            break
-    if found:
-        save_tasks(tasks)
+    # Match against the full ID or the last 4 digits (easier for voice)
+    if task_store.mark_done(task_id_part):
         return f"Marked task ending in {task_id_part} as done."
     return f"Task ID ending in {task_id_part} not found."
 
@@ -563,12 +730,14 @@ def set_alarm(hm, label="Alarm"):
         if delay <= 0:
              return "Alarm time is in the immediate past. Try a few minutes later."
              
-        t = threading.Timer(delay, lambda: speak(f"Time's up! {label}! It's {target_time.strftime('%I:%M %p')} now."))
+        announcement = f"Time's up! {label}! It's {target_time.strftime('%I:%M %p')} now."
+        tts_cache.prefetch([announcement])
+        t = threading.Timer(delay, lambda: speak(announcement))
         t.daemon = True
         t.start()
         return f"Alarm set successfully for {target_time.strftime('%I:%M %p')}."
     except Exception as e:
-        print("Alarm parse error:", e)
+        log.warning("Alarm parse error: %s", e)
         return "I had trouble setting that alarm. Make sure the time is correct."
 
 def set_reminder(text):
@@ -597,7 +766,9 @@ def set_reminder(text):
         # try to strip the time from the message for a cleaner reminder.
         reminder_text = "Check your schedule"
     
-    t = threading.Timer(delay, lambda: speak(f"Reminder! The time is {dt.strftime('%I:%M %p')}. You asked me to remind you to: {reminder_text}"))
+    announcement = f"Reminder! The time is {dt.strftime('%I:%M %p')}. You asked me to remind you to: {reminder_text}"
+    tts_cache.prefetch([announcement])
+    t = threading.Timer(delay, lambda: speak(announcement))
     t.daemon = True
     t.start()
     return f"Reminder set for {dt.strftime('%Y-%m-%d at %I:%M %p')} for: {reminder_text}"
@@ -610,27 +781,66 @@ def create_file(filename, content=""):
             f.write(content)
         return f"Created file {filename}."
     except Exception as e:
-        print("Create file error:", e)
+        log.warning("Create file error: %s", e)
         return "Failed to create file."
 
+def _file_index_ready():
+    file_index.start()
+    return file_index.ready.wait(FILE_INDEX_WAIT)
+
+def describe_files(found):
+    return "; ".join(f"{os.path.basename(f.path)} in {os.path.dirname(f.path)}" for f in found)
+
+def find_files(query):
+    if not file_index.roots:
+        return "No folders are set up for file search. Set MAXIMUS_FILE_ROOTS."
+    if not _file_index_ready():
+        return "I'm still indexing your files. Try again in a moment."
+    found = file_index.search(query, limit=3)
+    if not found:
+        return f"I couldn't find a file matching {query}."
+    return f"I found {len(found)} file{'s' if len(found) > 1 else ''}: {describe_files(found)}."
+
+def locate_file(filename):
+    """Path for a relative path or a file name from the index; (None, reason) if there is no single match."""
+    if os.path.exists(filename):
+        return filename, None
+    if not file_index.roots or not _file_index_ready():
+        return None, "File not found."
+    path = file_index.resolve(filename)
+    if path is None:
+        found = file_index.search(filename, limit=3)
+        if not found:
+            return None, "File not found."
+        return None, f"I'm not sure which file you mean. Closest matches: {describe_files(found)}."
+    return path, None
+
 def open_file(filename):
     try:
-        if os.path.exists(filename):
-            webbrowser.open_new_tab(f"file://{os.path.abspath(filename)}")
-            return f"Opened {filename}."
-        return "File not found."
+        path, problem = locate_file(filename)
+        if path is None:
+            return problem
+        webbrowser.open_new_tab(f"file://{os.path.abspath(path)}")
+        return f"Opened {path}."
     except Exception as e:
-        print("Open file error:", e)
+        log.warning("Open file error: %s", e)
         return "Failed to open file."
 
 def delete_file(filename):
     try:
-        if os.path.exists(filename):
-            os.remove(filename)
-            return f"Deleted {filename}."
-        return "File not found."
+        path, problem = locate_file(filename)
+        if path is None:
+            return problem
+        if path != filename:
+            # Found by name rather than given as a path: confirm before deleting
+            speak(f"Delete {path}? Say yes to confirm.")
+            if not is_yes(listen_reply(timeout=8, phrase_time_limit=3)):
+                return "Okay, I won't delete it."
+        os.remove(path)
+        file_index.forget(path)
+        return f"Deleted {path}."
     except Exception as e:
-        print("Delete file error:", e)
+        log.warning("Delete file error: %s", e)
         return "Failed to delete file."
 
 def run_system_command(cmd):
@@ -639,7 +849,7 @@ def run_system_command(cmd):
         subprocess.Popen(cmd, shell=True)
         return f"Executing {cmd}."
     except Exception as e:
-        print("Run system command error:", e)
+        log.warning("Run system command error: %s", e)
         return "Failed to execute command."
 
 def take_screenshot(save_to="screenshot.png"):
@@ -657,11 +867,12 @@ def take_screenshot(save_to="screenshot.png"):
             return "Screenshot not supported on this platform."
         return f"Screenshot saved to {save_to} in the current directory."
     except Exception as e:
-        print("Screenshot error:", e)
+        log.warning("Screenshot error: %s", e)
         return "Failed to take screenshot."
 
 # ---------------- OCR ----------------
 # [OCR functions remain unchanged]
+@metrics.timed("handler.ocr")
 def ocr_image(path):
     if not OCR_AVAILABLE:
         return "OCR not available (pytesseract or pillow missing)."
@@ -671,10 +882,11 @@ def ocr_image(path):
         text = pytesseract.image_to_string(Image.open(path))
         return "Text detected: " + (text.strip() or "No text detected.")
     except Exception as e:
-        print("OCR error:", e)
+        log.warning("OCR error: %s", e)
         return "OCR failed."
 
 # ---------------- Fun stuff ----------------
+@metrics.timed("handler.joke")
 def random_joke():
     """FIXED: Now returns the text for speaking."""
     if pyjokes:
@@ -684,7 +896,7 @@ def random_joke():
             pass
     # fallback to online useless facts
     try:
-        r = requests.get("https://uselessfacts.jsph.pl/random.json?language=en", timeout=6).json()
+        r = upstream.http_get("https://uselessfacts.jsph.pl/random.json?language=en", timeout=6, service="facts", coalesce=False).json()
         return r.get("text", "Here's a fun fact for you.")
     except:
         return "I tried to be funny but failed. Sorry."
@@ -707,19 +919,107 @@ def help_text():
         "- 'derivative of x squared', "
         "- 'add todo <task>' / 'show todo' / 'mark task <id> done', "
         "- 'set alarm for 07:30' / 'remind me <time phrase>', "
-        "- 'send whatsapp' (will prompt for number/message), "
-        "- 'create file <name>' / 'delete file <name>', "
+        "- 'send whatsapp to <contact name>' (will prompt for the message), "
+        "- several commands at once, joined with 'and' or 'then': 'weather in pune and mumbai and add task buy milk', "
+        "- 'find file <name>', 'create file <name>' / 'open file <name>' / 'delete file <name>', "
         "- 'remember <key> is <value>' and 'what is <key>', "
+        "- 'search my history for <words>' or 'what did I say about <topic> last week', "
+        "- 'profile next command' to save a CPU profile of the next command, "
         "- 'check email' (Gmail must be configured), "
         "- 'tell me a joke', "
+        "- 'show stats' for timing of each processing stage, "
         "- 'sleep' to return to wake word mode, or 'quit' to exit the program."
     )
 
 # ---------------- Command Dispatcher ----------------
-def process_command(cmd, contacts, gmail_service):
-    """Parses and executes a single command string."""
-    mem = load_memory() 
+def run_predicted_intent(cmd):
+    """Runs the local handler the intent classifier picks for `cmd`; None if it isn't confident."""
+    prediction = intent_classifier.classify(cmd)
+    if prediction is None:
+        return None
+    slots = prediction.slots
+    if prediction.intent == "weather":
+        return get_weather_simple(slots["location"])
+    if prediction.intent == "add_task":
+        return add_task(slots["task"])
+    if prediction.intent == "list_tasks":
+        return list_tasks()
+    if prediction.intent == "joke":
+        return random_joke()
+    if prediction.intent == "math":
+        return evaluate_arithmetic(slots["expression"])
+    if prediction.intent == "wikipedia":
+        return wiki_summary(slots["topic"])
+    if prediction.intent == "youtube":
+        return play_youtube(slots["query"])
+    if prediction.intent == "help":
+        return help_text()
+    return None
+
+# ---------------- Compound Commands ----------------
+# Phrases that begin a sub-command of a compound command ("weather in pune and add task buy milk")
+COMMAND_TRIGGERS = (
+    "weather", "what's the weather", "search for", "wikipedia", "tell me about", "what is ", "who is ",
+    "calculate", "evaluate", "solve", "derivative of", "integrate", "integral of", "play ", "open maps",
+    "navigate to", "check email", "add todo", "add task", "show todo", "list tasks", "mark task", "set alarm",
+    "remind me", "remember ", "send whatsapp", "create file", "find file", "open file", "delete file",
+    "take screenshot", "tell me a joke",
+)
+# Sub-commands that only wait on the network; these run concurrently
+IO_BOUND_TRIGGERS = ("weather", "what's the weather", "search for", "wikipedia", "tell me about", "what is ", "who is ")
+IO_BOUND_INTENTS = {"weather", "wikipedia"}
+
+def is_command_part(cmd):
+    return cmd.lower().strip().startswith(COMMAND_TRIGGERS)
+
+def is_io_bound(cmd):
+    cmd = cmd.lower().strip()
+    if is_stateful(cmd):
+        return False
+    if cmd.startswith(IO_BOUND_TRIGGERS):
+        return True
+    prediction = intent_classifier.classify(cmd)
+    return prediction is not None and prediction.intent in IO_BOUND_INTENTS
+
+compound_planner = CompoundPlanner(is_command_part, is_io_bound)
+
+def handle_command(cmd, contacts, gmail_service):
+    """Runs `cmd`; a compound command runs part by part and gets one merged answer."""
+    parts = compound_planner.plan(cmd)
+    if len(parts) == 1:
+        return dispatch_command(cmd, contacts, gmail_service)
     append_conversation("user", cmd)
+    response = merge(execute(parts, lambda text: dispatch_command(text, contacts, gmail_service, part=True)))
+    response = response or fallback_response(cmd.lower())
+    append_conversation("assistant", response)
+    return response
+
+@metrics.timed("command.total")
+def process_command(cmd, contacts, gmail_service):
+    """Parses and executes a command string (or each part of a compound one), then persists
+    any changed state once. All upstream calls share one COMMAND_BUDGET (see maximus_deadline),
+    and everything logged meanwhile carries one command_id (see maximus_log)."""
+    try:
+        with command_context(), budget(COMMAND_BUDGET):
+            if profiler.wanted():
+                return profiler.run(cmd, handle_command, cmd, contacts, gmail_service)[0]
+            return handle_command(cmd, contacts, gmail_service)
+    finally:
+        # A batch pool thread leaves writing to the main thread (see run_batch)
+        if getattr(_turn_capture, "turns", None) is None:
+            flush_stores()
+
+def dispatch_command(cmd, contacts, gmail_service, part=False):
+    """Parses and executes a single command string. part=True is for one part of a compound
+    command: it is not recorded as a turn of its own (the whole utterance is) and is not
+    language-detected again."""
+    metrics.incr("commands.total")
+    mem = load_memory()
+    # Snapshot the history before this turn is appended (the cached memory object is live)
+    mem = dict(mem, conversations=list(mem["conversations"]))
+    searchable = history_query(cmd.lower().strip()) is None
+    if not part:
+        append_conversation("user", cmd, searchable)
     original = cmd
     cmd = cmd.lower().strip()
     response = None
@@ -735,16 +1035,28 @@ def process_command(cmd, contacts, gmail_service):
 
     if cmd in ("help", "what can you do", "commands"):
         response = help_text()
+    elif cmd in PROFILE_NEXT_COMMANDS:
+        profiler.arm()
+        response = f"Okay, I'll profile the next command and save the results in {profiler.directory}."
+    elif cmd in ("show stats", "show statistics", "stats"):
+        response = metrics.summary_text()
+        cache = gemini_cache.stats()
+        if cache["hits"] + cache["misses"]:
+            response += (f". AI answer cache: {cache['hit_rate']:.0%} hit rate over {cache['hits'] + cache['misses']} "
+                         f"lookups, {cache['avg_lookup_ms']:.2f} ms per lookup")
+    elif cmd in ("logging off", "turn logging off", "logging on", "turn logging on"):
+        maximus_log.set_enabled(cmd.endswith("on"))
+        response = f"Logging is {'on' if maximus_log.is_enabled() else 'off'}."
     
     # --- TRANSLATION: Auto-detect and translate if not English ---
     try:
-        lang = detect_language(original) if detect else None
+        lang = detect_language(original) if detect and not part else None
         if lang and lang != 'en':
             translated = translate_to_english(original)
             cmd = translated.lower()
             speak(f"Detected language {lang}. Translated: {translated}")
     except Exception as e:
-        print("Auto-translate error:", e)
+        log.warning("Auto-translate error: %s", e)
 
 
     # --- MEMORY/FACTS ---
@@ -764,12 +1076,14 @@ def process_command(cmd, contacts, gmail_service):
         except Exception:
             response = "Couldn't remember that."
 
-    elif response is None and (cmd.startswith("what is ") or cmd.startswith("who is ")):
-        key = cmd.split(" ", 2)[-1].strip()
-        val = recall_fact(key)
-        if val:
-            response = f"{key} is {val}."
-        # fall-through to wiki/AI search if not in memory
+    # --- CONVERSATION HISTORY SEARCH ---
+    elif response is None and history_query(cmd) is not None:
+        response = search_history(history_query(cmd))
+
+    elif response is None and (cmd.startswith("what is ") or cmd.startswith("who is ") or cmd.startswith("tell me about ")) \
+            and not any(op in cmd for op in MATH_OPERATORS):
+        key = cmd.split("tell me about", 1)[-1].strip() if cmd.startswith("tell me about ") else cmd.split(" ", 2)[-1].strip()
+        response = answer_question(key, original, mem) or fallback_response(cmd)
         
     # --- MATH & SYMBOLIC ---
     elif response is None and "derivative of" in cmd:
@@ -782,7 +1096,7 @@ def process_command(cmd, contacts, gmail_service):
         # Extract the equation/expression after 'solve'
         eq = cmd.split("solve", 1)[-1].strip()
         response = solve_equation(eq)
-    elif response is None and ("evaluate" in cmd or "calculate" in cmd or ("what is" in cmd or "what's" in cmd) and any(op in cmd for op in ['+', '-', '*', '/', 'mod', 'plus', 'minus', 'times'])):
+    elif response is None and ("evaluate" in cmd or "calculate" in cmd or ("what is" in cmd or "what's" in cmd) and any(op in cmd for op in MATH_OPERATORS)):
         # Strip the trigger words to get the expression
         expr = cmd.split("evaluate", 1)[-1].split("calculate", 1)[-1].split("what is", 1)[-1].split("what's", 1)[-1].strip()
         response = evaluate_arithmetic(expr)
@@ -820,12 +1134,17 @@ def process_command(cmd, contacts, gmail_service):
     # --- WHATSAPP (Interactive) ---
     elif response is None and "send whatsapp" in cmd:
         # Interactive sequence for WhatsApp (only works well in voice/command line mode)
-        speak("Who would you like to message? Please say or type the phone number, including the plus sign and country code.")
-        number = listen_once(timeout=10, phrase_time_limit=5).strip()
-        if not number: 
-            return "Cancelled. No number provided."
-        speak("What is the message you want to send?")
-        message = listen_once(timeout=15, phrase_time_limit=10).strip()
+        recipient = re.sub(r'^(?:message\s+)?to\s+', '', cmd.split("send whatsapp", 1)[-1].strip())
+        if not recipient:
+            speak("Who would you like to message? Say a contact name, or a phone number with the country code.")
+            recipient = listen_reply(timeout=10, phrase_time_limit=5).strip()
+        if not recipient:
+            return "Cancelled. No recipient provided."
+        number, name = resolve_recipient(recipient)
+        if number is None:
+            return name
+        speak(f"What is the message for {name}?")
+        message = listen_reply(timeout=15, phrase_time_limit=10).strip()
         if not message: 
             return "Cancelled. No message provided."
         response = send_whatsapp_by_number(number, message)
@@ -860,6 +1179,9 @@ def process_command(cmd, contacts, gmail_service):
     elif response is None and "create file" in cmd:
         filename = cmd.split("create file", 1)[-1].strip()
         response = create_file(filename)
+    elif response is None and "find file" in cmd:
+        query = cmd.split("find file", 1)[-1].strip()
+        response = find_files(query) if query else "Which file should I look for?"
     elif response is None and "open file" in cmd:
         filename = cmd.split("open file", 1)[-1].strip()
         response = open_file(filename)
@@ -878,8 +1200,13 @@ def process_command(cmd, contacts, gmail_service):
     elif response is None and ("joke" in cmd or "fun fact" in cmd):
         response = random_joke() # This now returns the text to be spoken
 
+    # --- LOCAL INTENT CLASSIFIER (phrasings that miss every trigger above) ---
+    if response is None:
+        response = run_predicted_intent(cmd)
+
     # --- FALLBACK / GPT RESPONSE ---
     if response is None:
+        metrics.incr("commands.ai_fallback")
         # Pass the original command (which might have been auto-translated) to GPT
         response = get_gemini_response(original, mem)
         # If GPT fails, use local fallback
@@ -888,7 +1215,8 @@ def process_command(cmd, contacts, gmail_service):
 
     # Final check and conversation append
     if response:
-        append_conversation("assistant", response)
+        if not part:
+            append_conversation("assistant", response, searchable)
         return response
     else:
         # Should be unreachable if fallback is working, but safety check
@@ -898,7 +1226,8 @@ def process_command(cmd, contacts, gmail_service):
 
 def main_loop(contacts, gmail_service, voice_mode=True):
     """The main loop for the desktop assistant, active when a command is expected."""
-    
+    global VOICE_INPUT
+    VOICE_INPUT = voice_mode
     while True:
         try:
             if voice_mode:
@@ -928,23 +1257,28 @@ def main_loop(contacts, gmail_service, voice_mode=True):
             sys.exit(0)
         except Exception as e:
             speak("An unexpected system error occurred.")
-            print(f"CRITICAL ERROR: {e}\n{traceback.format_exc()}")
+            log.exception("Unhandled error in main loop: %s", e)
             time.sleep(1) 
 
 # ---------------- Wake Word Listener / Startup ----------------
 
 def wake_word_listener():
     """Initializes the assistant and manages the Voice/Text selection."""
+    global VOICE_INPUT
     print(f"\n{DEVICE_NAME} is loading resources...")
     
     # Pre-load resources once
+    init_tts()
+    tts_cache.prefetch(FIXED_PHRASES)  # only renders phrases missing from the disk cache
+    threading.Thread(target=intent_classifier.warm, daemon=True, name="maximus-intent-train").start()
+    file_index.start()
     contacts = load_contacts()
     gmail_service = None
     try:
         # Attempt to initialize Gmail service on startup
         gmail_service = get_gmail_service()
     except Exception as e:
-        print(f"Warning: Gmail service failed to initialize. Feature disabled. ({e})")
+        log.warning("Gmail service failed to initialize, feature disabled: %s", e)
 
     speak(f"Systems check complete. I am {DEVICE_NAME}, online and ready.")
     
@@ -966,9 +1300,10 @@ def wake_word_listener():
                 while True:
                     try:
                         print(f"[{DEVICE_NAME} Standby]")
-                        audio = recognizer.listen(source, phrase_time_limit=3)
-                        text = recognizer.recognize_google(audio).lower()
-                        
+                        with metrics.timer("stt.wake_capture"):
+                            audio = recognizer.listen(source, phrase_time_limit=3)
+                        text, _ = stt.recognize("wake", audio)
+
                         if WAKE_WORD in text:
                             print(f"*** Wake word detected: {text} ***")
                             speak("Yes? I'm listening.")
@@ -976,15 +1311,16 @@ def wake_word_listener():
                             # Returns here when 'sleep' command is given, re-enters wake word loop
                             break # Exit the wake word inner loop to return to the main selection menu
 
-                    except sr.UnknownValueError:
-                        pass  # Keep listening
+                    except STTError:
+                        time.sleep(1)  # every backend failed (already logged); keep listening
                     except Exception as e:
-                        print(f"Wake word listening error: {e}")
+                        log.warning("Wake word listening error: %s", e)
                         time.sleep(1)
 
         else:
             # Text command was provided directly from the menu
             speak(f"Initiating Text Command: {input_mode_choice}")
+            VOICE_INPUT = False
             result = process_command(input_mode_choice, contacts, gmail_service)
             if result == "SLEEP_MODE":
                  speak("Text mode finished. Returning to menu.")
@@ -995,12 +1331,130 @@ def wake_word_listener():
 
 # End of while True ---
 
+# ---------------- Batch Mode (headless) ----------------
+# Commands that change shared state (or the order of it) run alone, in input order
+STATEFUL_MARKERS = (
+    "remember ", "add todo", "add task", "mark task", "set alarm", "remind me", "create file",
+    "delete file", "send whatsapp", "profile next command", "exit", "quit", "shutdown", "sleep",
+)
+
+def is_stateful(cmd):
+    cmd = cmd.lower().strip()
+    if any(marker in cmd for marker in STATEFUL_MARKERS):
+        return True
+    # Phrasings the intent classifier routes to add_task ("put milk on my list") change state too
+    prediction = intent_classifier.classify(cmd)
+    return prediction is not None and prediction.intent == "add_task"
+
+def run_batch_command(line_no, message, contacts, defer_turns=False):
+    """Runs one batch command and returns (its JSONL result record, its conversation turns).
+    With defer_turns (on a pool thread) the turns are collected instead of written, and
+    it is up to the caller to write them; otherwise they are already written and the
+    list is empty."""
+    _spoken_capture.lines = []
+    _turn_capture.turns = [] if defer_turns else None
+    start = time.perf_counter()
+    record = {"line": line_no, "message": message}
+    try:
+        response = process_command(message, contacts, None)
+        record.update(status="success", response=response)
+    except SystemExit:
+        record.update(status="success", response="EXIT_IGNORED")
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record["spoken"] = _spoken_capture.lines
+    record["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    _spoken_capture.lines = None
+    turns, _turn_capture.turns = _turn_capture.turns or [], None
+    return record, turns
+
+def run_batch(in_path, out_path, workers=1):
+    """Processes a JSONL file of {"message": ...} lines, streaming one result line per command
+    (in input order). Stateless commands run on `workers` threads; stateful ones run alone.
+    Conversation turns are written by this thread, in input order, never by the pool."""
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    contacts = load_contacts()
+    src = sys.stdin if in_path == "-" else open(in_path, "r", encoding="utf-8")
+    if out_path == "-":
+        out = sys.stdout
+        sys.stdout = sys.stderr  # keep handler print() output out of the results stream
+    else:
+        out = open(out_path, "w", encoding="utf-8")
+
+    def write(record, turns=()):
+        # Conversation turns of parallel commands are written here, on one thread, in input order
+        for role, text, searchable in turns:
+            append_conversation(role, text, searchable)
+        if turns:
+            flush_stores()
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+    pending = deque()
+    def drain(keep):
+        while len(pending) > keep:
+            write(*pending.popleft().result())
+
+    count = 0
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="maximus-batch") as pool:
+            for line_no, line in enumerate(src, 1):
+                if not line.strip():
+                    continue
+                count += 1
+                try:
+                    message = str(json.loads(line)["message"])
+                except (ValueError, KeyError, TypeError) as e:
+                    drain(0)
+                    write({"line": line_no, "status": "error", "error": f"Invalid input line: {e}"})
+                    continue
+                if workers > 1 and not is_stateful(message):
+                    pending.append(pool.submit(run_batch_command, line_no, message, contacts, True))
+                    drain(workers * 4)  # bounded read-ahead
+                else:
+                    drain(0)
+                    write(*run_batch_command(line_no, message, contacts))
+            drain(0)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if out_path == "-":
+            sys.stdout = out
+        else:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"Processed {count} commands in {elapsed:.2f} s ({count / elapsed if elapsed else 0:.1f}/s).", file=sys.stderr)
+
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description=f"{DEVICE_NAME} desktop assistant")
+    parser.add_argument("--profile", nargs="?", const=profiler.directory, metavar="DIR",
+                        help="Profile every command; write .pstats/.collapsed files to DIR (default: profiles).")
+    parser.add_argument("--batch", metavar="IN_JSONL",
+                        help='Headless mode: process {"message": ...} lines from IN_JSONL ("-" for stdin) and exit.')
+    parser.add_argument("--out", metavar="OUT_JSONL", help='Where --batch writes results ("-" for stdout).')
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Threads for stateless --batch commands (stateful ones always run alone, in order).")
+    args = parser.parse_args()
+    if args.profile:
+        profiler.enable(args.profile)
+        print(f"Profiling every command into {args.profile}/")
+    if args.batch:
+        if not args.out:
+            parser.error("--batch needs --out")
+        HEADLESS = True
+        run_batch(args.batch, args.out, args.workers)
+        flush_stores()
+        sys.exit(0)
+
     print("Starting wake word listener...")
     try:
         wake_word_listener()  # This is the line that runs right before the exit
     except Exception as e:
-        print(f"FATAL ERROR in wake_word_listener: {e}")
+        log.critical("Fatal error in wake_word_listener: %s", e, exc_info=True)
         # The line below is a temporary fix for one of your old errors. 
         # If you are still using Python 3.13, you might need it.
         # import traceback; traceback.print_exc() 
@@ -0,0 +1,144 @@
+# maximus_admission.py - Admission control for expensive upstream calls
+"""
+Bounds how many Gemini calls the web assistant makes at once, so that during
+a traffic spike a few requests wait briefly or are turned away instead of all
+of them piling onto Gemini's rate limits and slowing down together.
+
+    with gemini_admission.slot():
+        text = upstream.gemini_generate(prompt)
+
+At most `limit` callers hold a slot. Later callers wait in a FIFO queue. A
+caller is turned away immediately with Overloaded, rather than after a
+pointless wait, when either:
+
+  - the queue already holds `max_queue` callers, or
+  - its expected wait exceeds its deadline (`max_wait` seconds). The expected
+    wait counts how many rounds of `limit` calls are ahead of it, each lasting
+    the recent average call duration.
+
+A queued caller that is still waiting at its deadline also gets Overloaded.
+The deadline is never later than the end of the command's budget
+(maximus_deadline).
+Overloaded.retry_after is the expected wait in seconds, which chat_api
+returns as a 429 Retry-After. would_shed() answers the same question without
+queueing, so a request can be turned away before it becomes a background job.
+
+Only the AI fallback goes through the controller. Local intents (tasks, math,
+memory, ...) and semantic-cache hits never queue.
+
+Metrics: admission.<name>.admitted/.queued/.shed/.timed_out counters, the
+admission.<name>.wait timer and the admission.<name>.in_flight gauge.
+Environment: MAXIMUS_GEMINI_CONCURRENCY (default 8), MAXIMUS_GEMINI_QUEUE
+(default 32), MAXIMUS_GEMINI_MAX_WAIT (seconds, default 5).
+"""
+
+import os
+import math
+import time
+import threading
+import contextlib
+from collections import deque
+
+from maximus_metrics import metrics
+import maximus_deadline as deadline
+
+
+class Overloaded(RuntimeError):
+    """No slot could be granted within the caller's deadline."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, name, limit=8, max_queue=32, max_wait=5.0, initial_call_seconds=2.0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters = deque()
+        self._call_seconds = initial_call_seconds  # moving average of how long a slot is held
+
+    def expected_wait(self, position):
+        """Seconds until a caller `position` places from the head of the queue gets a slot."""
+        # Slots free up `limit` at a time, one average call duration apart
+        return math.ceil((position + 1) / self.limit) * self._call_seconds
+
+    def _shed(self, reason, retry_after):
+        metrics.incr(f"admission.{self.name}.{reason}")
+        return Overloaded(f"{self.name} is busy, try again in {retry_after:.0f} s", max(1.0, retry_after))
+
+    def would_shed(self, max_wait=None):
+        """Retry-After seconds if a caller arriving now would be turned away, else None."""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        with self._lock:
+            if self._in_flight < self.limit and not self._waiters:
+                return None
+            position = len(self._waiters)
+            expected = self.expected_wait(position)
+            if position >= self.max_queue or expected > max_wait:
+                return max(1.0, expected)
+            return None
+
+    def acquire(self, max_wait=None):
+        """Takes a slot, waiting at most `max_wait` seconds. Raises Overloaded."""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        budget_left = deadline.remaining()
+        if budget_left is not None:
+            max_wait = min(max_wait, max(0.0, budget_left))
+        with self._lock:
+            if self._in_flight < self.limit and not self._waiters:
+                self._in_flight += 1
+                metrics.set_gauge(f"admission.{self.name}.in_flight", self._in_flight)
+                metrics.incr(f"admission.{self.name}.admitted")
+                return
+            position = len(self._waiters)
+            expected = self.expected_wait(position)
+            if position >= self.max_queue or expected > max_wait:
+                raise self._shed("shed", expected)
+            granted = threading.Event()
+            self._waiters.append(granted)
+        metrics.incr(f"admission.{self.name}.queued")
+
+        with metrics.timer(f"admission.{self.name}.wait"):
+            granted.wait(max_wait)
+        with self._lock:
+            if not granted.is_set():
+                self._waiters.remove(granted)
+                raise self._shed("timed_out", self.expected_wait(len(self._waiters)))
+        metrics.incr(f"admission.{self.name}.admitted")
+
+    def release(self, held_seconds):
+        with self._lock:
+            self._call_seconds = 0.8 * self._call_seconds + 0.2 * held_seconds
+            if self._waiters:
+                # Hand the slot straight to the next waiter; in-flight count is unchanged
+                self._waiters.popleft().set()
+            else:
+                self._in_flight -= 1
+                metrics.set_gauge(f"admission.{self.name}.in_flight", self._in_flight)
+
+    @contextlib.contextmanager
+    def slot(self, max_wait=None):
+        self.acquire(max_wait)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": self._in_flight, "queued": len(self._waiters),
+                    "limit": self.limit, "avg_call_seconds": round(self._call_seconds, 3)}
+
+
+gemini_admission = AdmissionController(
+    "gemini",
+    limit=int(os.getenv("MAXIMUS_GEMINI_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("MAXIMUS_GEMINI_QUEUE", "32")),
+    max_wait=float(os.getenv("MAXIMUS_GEMINI_MAX_WAIT", "5")),
+)
@@ -0,0 +1,194 @@
+# maximus_cassette.py - Record/replay of upstream HTTP and SDK calls
+"""
+A cassette is a JSON file of recorded upstream interactions (wttr.in, mathjs,
+useless facts, Wikipedia, googletrans, Gemini) together with the latency that
+was observed when they were recorded.
+
+Modes (MAXIMUS_CASSETTE_MODE):
+    off      calls go to the real services (default)
+    record   calls go to the real services and every response is appended
+             to the cassette file
+    replay   calls are served from the cassette; nothing touches the network.
+             A request that was never recorded raises CassetteMiss.
+
+Replay latency (MAXIMUS_CASSETTE_LATENCY):
+    none      answer immediately (default)
+    recorded  sleep for the latency observed while recording
+    <number>  sleep for the recorded latency multiplied by this factor
+
+The cassette path comes from MAXIMUS_CASSETTE (default cassettes/default.json).
+Code can also switch cassettes explicitly with use_cassette(...).
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import contextlib
+
+from maximus_log import get_logger
+
+log = get_logger("cassette")
+
+DEFAULT_PATH = os.path.join("cassettes", "default.json")
+MODES = ("off", "record", "replay")
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when a request has no recorded interaction."""
+
+
+class RecordedError(RuntimeError):
+    """Replays an exception that the upstream raised while recording."""
+
+
+def request_key(service, method, target, body=None):
+    """Stable identifier for an upstream request."""
+    payload = json.dumps(body, sort_keys=True, ensure_ascii=False) if body is not None else ""
+    digest = hashlib.sha1(f"{method} {target}\n{payload}".encode("utf-8")).hexdigest()
+    return f"{service}:{digest}"
+
+
+def parse_latency(value):
+    if value in (None, "", "none", "0"):
+        return None
+    if value == "recorded":
+        return 1.0
+    try:
+        return float(value)
+    except ValueError:
+        log.warning("Invalid cassette latency %r; replaying without delay.", value)
+        return None
+
+
+class Cassette:
+    def __init__(self, path, mode="replay", latency_scale=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; use one of {', '.join(MODES)}.")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._interactions = {}
+        self._cursor = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            log.error("Failed to load cassette %s: %s", self.path, e)
+            return
+        for entry in data.get("interactions", []):
+            self._interactions.setdefault(entry["key"], []).append(entry)
+
+    def _save(self):
+        entries = [e for group in self._interactions.values() for e in group]
+        entries.sort(key=lambda e: e.get("recorded_at", 0))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "interactions": entries}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def __len__(self):
+        return sum(len(group) for group in self._interactions.values())
+
+    def play(self, key):
+        """Returns the next recorded entry for `key`, sleeping for its latency if configured.
+
+        Repeated requests walk through the recorded entries in order and then
+        keep returning the last one.
+        """
+        with self._lock:
+            group = self._interactions.get(key)
+            if not group:
+                raise CassetteMiss(f"No recorded interaction for {key} in {self.path}")
+            idx = self._cursor.get(key, 0)
+            self._cursor[key] = idx + 1
+            entry = group[min(idx, len(group) - 1)]
+        if self.latency_scale:
+            time.sleep(entry.get("latency", 0.0) * self.latency_scale)
+        if "error" in entry:
+            raise RecordedError(entry["error"])
+        return entry["response"]
+
+    def record(self, key, service, request, response=None, error=None, latency=0.0):
+        entry = {
+            "key": key,
+            "service": service,
+            "request": request,
+            "latency": round(latency, 6),
+            "recorded_at": time.time(),
+        }
+        if error is not None:
+            entry["error"] = f"{type(error).__name__}: {error}"
+        else:
+            entry["response"] = response
+        with self._lock:
+            self._interactions.setdefault(key, []).append(entry)
+            try:
+                self._save()
+            except Exception as e:
+                log.error("Failed to save cassette %s: %s", self.path, e)
+
+
+def _from_env():
+    mode = os.getenv("MAXIMUS_CASSETTE_MODE", "off").lower()
+    if mode == "off":
+        return None
+    path = os.getenv("MAXIMUS_CASSETTE", DEFAULT_PATH)
+    return Cassette(path, mode, parse_latency(os.getenv("MAXIMUS_CASSETTE_LATENCY")))
+
+
+_active = _from_env()
+
+
+def active():
+    """The cassette in use, or None when record/replay is off."""
+    return _active
+
+
+@contextlib.contextmanager
+def use_cassette(path, mode="replay", latency="none"):
+    """Temporarily routes upstream calls through the cassette at `path`."""
+    global _active
+    previous = _active
+    _active = Cassette(path, mode, parse_latency(latency) if isinstance(latency, str) else latency)
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+
+def through_cassette(service, request, call, encode=None, decode=None):
+    """Runs `call()` through the active cassette.
+
+    request: JSON-serialisable description of the request ({"method", "target", "body"})
+    encode:  turns the live result into something JSON-serialisable for recording
+    decode:  rebuilds a result object from a recorded response
+    """
+    cassette = _active
+    if cassette is None:
+        return call()
+
+    key = request_key(service, request.get("method", "CALL"), request.get("target", ""), request.get("body"))
+    if cassette.mode == "replay":
+        recorded = cassette.play(key)
+        return decode(recorded) if decode else recorded
+
+    start = time.perf_counter()
+    try:
+        result = call()
+    except Exception as e:
+        cassette.record(key, service, request, error=e, latency=time.perf_counter() - start)
+        raise
+    cassette.record(key, service, request, response=encode(result) if encode else result,
+                    latency=time.perf_counter() - start)
+    return result
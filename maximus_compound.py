@@ -0,0 +1,155 @@
+# maximus_compound.py - Compound commands: split on conjunctions, run the parts, merge the answers
+"""
+process_command used to handle one intent per utterance, so "weather in pune
+and mumbai and add task buy milk" only got the first matching branch. Now such
+an utterance is split into independent sub-commands, the parts are run, and
+their answers are merged into one response:
+
+    planner = CompoundPlanner(is_command, is_concurrent)
+    planner.split("weather in pune and mumbai and add task buy milk")
+    # -> ['weather in pune', 'weather in mumbai', 'add task buy milk']
+    responses = execute(planner.plan(cmd), run_one)
+    merge(responses)
+    # -> 'Pune: +25°C. Mumbai: +31°C. Task added: buy milk.'
+
+Splitting happens on "and", "and then", "and also", "then", ", " and ";".
+A piece only becomes a sub-command of its own if is_command(piece) recognises
+it, so "add task buy bread and butter" stays one command. is_command should
+only match trigger phrases at the start of the piece. A part that starts with
+a FREE_TEXT_COMMANDS prefix ("add task", "remember", "remind me", "send
+whatsapp") takes everything after it as its argument and is never split, so
+"add task call mom and ask about the joke" stays one task. A piece that is not
+a command can be a second argument for the part before it: after "and" or a
+comma, the DISTRIBUTIVE prefix ("weather in ") is repeated for a piece of up
+to MAX_DISTRIBUTED_WORDS words ("... and mumbai" -> "weather in mumbai"),
+unless the two together are a place named with "and" (JOINED_PLACES: "weather
+in trinidad and tobago" stays one lookup). A place named with "and" that is
+not in that list is still split into two lookups; this is a known limitation.
+Anything else is joined back onto the part before it. If the first piece is
+not a command, the utterance is left whole.
+
+execute() runs the parts in the order they were said. A part that
+is_concurrent() (I/O-bound: weather, Wikipedia, questions) is submitted to a
+thread pool, and the walk moves on right away. Any other part (task and memory
+edits, anything interactive) runs on the calling thread, in order. A
+concurrent part is submitted only after every earlier sequential part has
+finished, so a question asked after a task or memory edit sees the edit. The
+pool threads keep the command's budget and command_id (maximus_deadline.submit).
+
+Metrics: the compound.parts counter, the compound.execute timer, and
+compound.part_failed for parts that raised or missed the budget.
+"""
+
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from maximus_metrics import metrics
+import maximus_deadline as deadline
+from maximus_log import get_logger
+
+log = get_logger("compound")
+
+# Commands whose argument is free text; nothing after them is split off
+FREE_TEXT_COMMANDS = ("add task", "add todo", "remember ", "remind me", "send whatsapp")
+# Places whose names contain "and"; never distributed into two lookups
+JOINED_PLACES = frozenset((
+    "trinidad and tobago", "antigua and barbuda", "bosnia and herzegovina", "saint kitts and nevis",
+    "st kitts and nevis", "sao tome and principe", "saint vincent and the grenadines",
+    "st vincent and the grenadines", "turks and caicos", "turks and caicos islands", "wallis and futuna",
+    "heard and mcdonald islands", "svalbard and jan mayen", "saint pierre and miquelon",
+))
+DISTRIBUTIVE = re.compile(r"^(.*?\bweather (?:in|for|at) )", re.IGNORECASE)
+MAX_DISTRIBUTED_WORDS = 2
+RESULT_GRACE = 0.5  # seconds past the budget to wait for a part's local fallback answer
+
+_CONJUNCTION_RE = re.compile(r"(\s*;\s*|,?\s+(?:and then|and also|and|then)\s+|,\s+)", re.IGNORECASE)
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="maximus-compound")
+
+Part = namedtuple("Part", "text concurrent")
+
+
+class CompoundPlanner:
+    def __init__(self, is_command, is_concurrent):
+        """is_command(text) -> bool: `text` stands on its own as a command.
+        is_concurrent(text) -> bool: `text` only waits on I/O and touches no shared state."""
+        self.is_command = is_command
+        self.is_concurrent = is_concurrent
+
+    def split(self, cmd):
+        """The sub-commands of `cmd`, in order; [cmd] when it is not a compound command."""
+        pieces = _CONJUNCTION_RE.split(cmd.strip())
+        if len(pieces) == 1 or not self.is_command(pieces[0]):
+            return [cmd]
+        parts = [pieces[0]]
+        for separator, piece in zip(pieces[1::2], pieces[2::2]):
+            if parts[-1].lower().startswith(FREE_TEXT_COMMANDS):
+                parts[-1] += separator + piece
+                continue
+            if piece and self.is_command(piece):
+                parts.append(piece)
+                continue
+            distributed = DISTRIBUTIVE.match(parts[-1])
+            if piece and distributed and separator.strip(" ,").lower() in ("", "and") \
+                    and len(piece.split()) <= MAX_DISTRIBUTED_WORDS \
+                    and f"{parts[-1][distributed.end():]} and {piece}".lower() not in JOINED_PLACES:
+                parts.append(distributed.group(1) + piece)
+            else:
+                parts[-1] += separator + piece
+        return parts if len(parts) > 1 else [cmd]
+
+    def plan(self, cmd):
+        """split(), with each part marked as concurrent or sequential."""
+        return [Part(text, self.is_concurrent(text)) for text in self.split(cmd)]
+
+
+def _wait(future, text):
+    left = deadline.remaining()
+    try:
+        return future.result(timeout=None if left is None else max(0.0, left) + RESULT_GRACE)
+    except FutureTimeout:
+        metrics.incr("compound.part_failed")
+        log.warning("Compound part timed out", extra={"part": text})
+    except Exception as e:
+        metrics.incr("compound.part_failed")
+        log.warning("Compound part failed: %s", e, extra={"part": text})
+    return None
+
+
+def execute(parts, run):
+    """Runs run(part.text) for every part and returns the responses in order (None for a
+    part that failed). Concurrent parts overlap; sequential ones run here, in order."""
+    metrics.incr("compound.parts", len(parts))
+    results = []
+    with metrics.timer("compound.execute"):
+        for part in parts:
+            if part.concurrent:
+                results.append(deadline.submit(_pool, run, part.text))
+                continue
+            try:
+                results.append(run(part.text))
+            except Exception as e:
+                metrics.incr("compound.part_failed")
+                log.warning("Compound part failed: %s", e, extra={"part": part.text})
+                results.append(None)
+        return [_wait(r, part.text) if part.concurrent else r for part, r in zip(parts, results)]
+
+
+def merge(responses):
+    """One response from the parts' answers, each ending as a sentence."""
+    sentences = []
+    for response in responses:
+        text = (response or "").strip()
+        if text:
+            sentences.append(text if text.endswith((".", "!", "?")) else text + ".")
+    return " ".join(sentences)
+
+
+def _after_fork():
+    """Pool threads do not survive fork(); a forked worker gets a fresh pool."""
+    global _pool
+    _pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="maximus-compound")
+
+
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,450 @@
+# maximus_contacts.py - Contact index for resolving spoken names to phone numbers
+"""
+contacts.json maps names to numbers:
+
+    {"Rahul Sharma": "+919812345678", "Mom": "+14155550100"}
+
+"send whatsapp" used to make the user dictate a full international number.
+Now it takes a name, and this index resolves it:
+
+    index = ContactIndex(contacts_store)        # a JsonStore over contacts.json
+    index.lookup("raul sharma")
+    # -> [Match(name='Rahul Sharma', number='+919812345678', cost=1.0)]
+
+Names are lowercased, stripped of accents and split into tokens. Each token
+is indexed four ways, so both speech recognition mistakes and partial names
+still find a match:
+
+  exact      token -> contacts ("rahul")
+  phonetic   Soundex and Metaphone-style keys -> contacts, so "raul" finds
+             "rahul" and "shawn" finds "sean"
+  prefix     a sorted array of distinct tokens, searched with bisect (a
+             flattened prefix trie), so the last word may be incomplete:
+             "rahul sh"
+  fuzzy      bounded Levenshtein distance over the candidates the keys above
+             return, for ranking and for typed near-misses
+
+A candidate must match every query token. Candidates are ranked by cost,
+where lower is better: 0 for an exact token, 0.5 for a prefix, the edit
+distance for a close spelling, and 1.5 for a phonetic match. Each contact
+token the query did not mention adds 0.1. lookup() returns the best matches.
+resolve() returns the single best one, or None when the name is unknown or
+ambiguous.
+
+The index is built on first use (or in the background after warm()). When
+the file changes, it is updated incrementally: only added, removed or
+renamed contacts are re-indexed. A lookup takes well under a millisecond with
+100k contacts; see benchmarks/bench_contacts.py.
+"""
+
+import re
+import bisect
+import threading
+import unicodedata
+import functools
+from collections import namedtuple
+
+from maximus_metrics import metrics
+from maximus_log import get_logger
+
+log = get_logger("contacts")
+
+MAX_CANDIDATES = 64      # ranked per lookup; more means the name is too vague to resolve anyway
+MAX_SEED = 2000          # candidates taken from the most selective query token before filtering
+PREFIX_LIMIT = 256       # distinct tokens a prefix ("rahul sh") may expand to
+AMBIGUITY_MARGIN = 0.5   # resolve() needs the best match to beat the runner-up by this much
+PHONETIC_COST = 1.5   # above a one-letter slip, below two
+PREFIX_COST = 0.5
+EXTRA_TOKEN_COST = 0.1
+
+Match = namedtuple("Match", "name number cost")
+
+_EMPTY = frozenset()
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(name):
+    """'José  O'Brien' -> 'jose o brien'."""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(_NON_ALNUM_RE.split(text.lower())).strip()
+
+
+# ---------------- Phonetic keys ----------------
+_SOUNDEX_CODES = {c: str(d) for d, letters in enumerate(("bfpv", "cgjkqsxz", "dt", "l", "mn", "r"), 1) for c in letters}
+
+
+def soundex(word):
+    """American Soundex: first letter plus three digits ('robert' -> 'r163')."""
+    word = "".join(c for c in word if c.isalpha())
+    if not word:
+        return ""
+    code, last = word[0], _SOUNDEX_CODES.get(word[0])
+    for c in word[1:]:
+        digit = _SOUNDEX_CODES.get(c)
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        if c not in "hw":  # h and w do not separate letters with the same code; vowels do
+            last = digit
+    return code.ljust(4, "0")
+
+
+_VOWELS = frozenset("aeiou")
+
+
+def metaphone(word, max_length=6):
+    """Simplified Metaphone: a consonant skeleton that spells alike what sounds alike
+    ('stephen' -> 'stfn', 'knight' -> 'nt', 'catherine' -> 'k0rn')."""
+    w = "".join(c for c in word.lower() if c.isalpha())
+    if not w:
+        return ""
+    if w[:2] in ("ae", "gn", "kn", "pn", "wr"):
+        w = w[1:]
+    elif w[0] == "x":
+        w = "s" + w[1:]
+    elif w[:2] == "wh":
+        w = "w" + w[2:]
+    elif w[:3] in ("chr", "chl"):
+        w = "k" + w[2:]  # "christopher", "chloe"
+    key = []
+    n = len(w)
+    i = 0
+    while i < n and len(key) < max_length:
+        c = w[i]
+        prev = w[i - 1] if i else ""
+        nxt = w[i + 1] if i + 1 < n else ""
+        after = w[i + 2] if i + 2 < n else ""
+        if c == prev and c != "c":
+            i += 1
+            continue
+        if c in _VOWELS:
+            if i == 0:
+                key.append(c)
+        elif c == "b":
+            if not (prev == "m" and i == n - 1):
+                key.append("p")
+        elif c == "c":
+            if nxt == "i" and after == "a" or nxt == "h":
+                key.append("k" if prev == "s" else "x")
+                i += nxt == "h"
+            elif nxt in ("i", "e", "y"):
+                key.append("s")
+            else:
+                key.append("k")
+        elif c == "d":
+            if nxt == "g" and after in ("e", "i", "y"):
+                key.append("j")
+                i += 1
+            else:
+                key.append("t")
+        elif c == "g":
+            if nxt == "h" and after and after not in _VOWELS:
+                pass  # silent: "night"
+            elif nxt == "n" and w[i + 1:] in ("n", "ned"):
+                pass  # silent: "sign"
+            elif nxt in ("i", "e", "y"):
+                key.append("j")
+            else:
+                key.append("k")
+        elif c == "h":
+            if nxt in _VOWELS and prev not in ("c", "s", "p", "t", "g"):
+                key.append("h")
+        elif c == "k":
+            if prev != "c":
+                key.append("k")
+        elif c == "p":
+            key.append("f" if nxt == "h" else "p")
+            i += nxt == "h"
+        elif c == "q":
+            key.append("k")
+        elif c == "s":
+            if nxt == "h" or nxt == "i" and after in ("o", "a"):
+                key.append("x")
+                i += nxt == "h"
+            else:
+                key.append("s")
+        elif c == "t":
+            if nxt == "i" and after in ("o", "a"):
+                key.append("x")
+            elif nxt == "h":
+                key.append("0")
+                i += 1
+            elif not (nxt == "c" and after == "h"):
+                key.append("t")
+        elif c == "v":
+            key.append("f")
+        elif c in ("w", "y"):
+            if nxt in _VOWELS:
+                key.append(c)
+        elif c == "x":
+            key.append("ks")
+        elif c == "z":
+            key.append("s")
+        else:
+            key.append(c)
+        i += 1
+    return "".join(key)[:max_length]
+
+
+@functools.lru_cache(maxsize=65536)
+def phonetic_keys(token):
+    """Index keys for how `token` sounds; prefixed so the two schemes never collide."""
+    keys = {"s:" + soundex(token)} if not token.isdigit() else set()
+    meta = metaphone(token)
+    if meta:
+        keys.add("m:" + meta)
+    return frozenset(keys)
+
+
+def bounded_levenshtein(a, b, bound):
+    """Edit distance between a and b, or bound + 1 as soon as it must exceed `bound`.
+    Only the diagonal band of width 2 * bound + 1 is computed."""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    if a == b:
+        return 0
+    over = bound + 1
+    previous = [j if j <= bound else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        low, high = max(1, i - bound), min(len(b), i + bound)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= bound else over
+        best = current[0]
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost if cost < over else over
+            if cost < best:
+                best = cost
+        if best > bound:
+            return over
+        previous = current
+    return previous[-1]
+
+
+def _edit_bound(token):
+    return 0 if len(token) <= 2 else 1 if len(token) <= 5 else 2
+
+
+def _deletions(token):
+    """Every string one deletion away from `token` (the SymSpell neighbourhood)."""
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+class ContactIndex:
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.RLock()
+        self._signature = False  # never matches a real signature, so the first use builds
+        self._numbers = {}       # contact name -> number
+        self._tokens = {}        # contact name -> tuple of normalized tokens
+        self._by_token = {}      # token -> set of contact names
+        self._by_key = {}        # phonetic key -> set of contact names
+        self._by_deletion = {}   # token with one character deleted -> set of tokens
+        self._sorted_tokens = [] # distinct tokens, sorted, for prefix search
+
+    # --- Building ---
+    @staticmethod
+    def _number_of(value):
+        if isinstance(value, dict):
+            value = value.get("number") or value.get("phone") or ""
+        return str(value).strip()
+
+    def _add(self, name, number):
+        tokens = tuple(normalize(name).split())
+        self._numbers[name] = number
+        self._tokens[name] = tokens
+        for token in set(tokens):
+            names = self._by_token.get(token)
+            if names is None:
+                names = self._by_token[token] = set()
+                bisect.insort(self._sorted_tokens, token)
+                for variant in _deletions(token):
+                    self._by_deletion.setdefault(variant, set()).add(token)
+            names.add(name)
+            for key in phonetic_keys(token):
+                self._by_key.setdefault(key, set()).add(name)
+
+    def _remove(self, name):
+        del self._numbers[name]
+        for token in set(self._tokens.pop(name)):
+            names = self._by_token[token]
+            names.discard(name)
+            if not names:
+                del self._by_token[token]
+                del self._sorted_tokens[bisect.bisect_left(self._sorted_tokens, token)]
+                for variant in _deletions(token):
+                    tokens = self._by_deletion[variant]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._by_deletion[variant]
+            for key in phonetic_keys(token):
+                names = self._by_key[key]
+                names.discard(name)
+                if not names:
+                    del self._by_key[key]
+
+    def refresh(self):
+        """Brings the index in line with contacts.json, re-indexing only what changed."""
+        with self._lock:
+            signature = self.store.file_signature()
+            if signature == self._signature and not self.store.dirty:
+                return
+            contacts = self.store.get()
+            if not isinstance(contacts, dict):
+                log.warning("Contacts file does not hold a name -> number object; ignoring it")
+                contacts = {}
+            with metrics.timer("contacts.index"):
+                for name in [n for n in self._numbers if n not in contacts]:
+                    self._remove(name)
+                for name, value in contacts.items():
+                    number = self._number_of(value)
+                    if name not in self._numbers:
+                        self._add(name, number)
+                    else:
+                        self._numbers[name] = number
+            self._signature = signature
+
+    def warm(self):
+        """Builds the index in a background thread so the first lookup does not pay for it."""
+        threading.Thread(target=self.refresh, daemon=True, name="maximus-contacts-index").start()
+
+    def __len__(self):
+        self.refresh()
+        return len(self._numbers)
+
+    # --- Lookup ---
+    def _near(self, token):
+        """Indexed tokens within the edit bound of `token`, found through the deletion index."""
+        bound = _edit_bound(token)
+        if not bound:
+            return set()
+        found = set(self._by_deletion.get(token, _EMPTY))
+        for variant in _deletions(token):
+            found |= self._by_deletion.get(variant, _EMPTY)
+            if variant in self._by_token:
+                found.add(variant)
+        found.discard(token)
+        if bound >= 2:
+            return found  # one deletion on each side is at most two edits
+        return {t for t in found if bounded_levenshtein(token, t, bound) <= bound}
+
+    def _prefixed(self, prefix):
+        """Indexed tokens starting with `prefix` (at most PREFIX_LIMIT)."""
+        i = bisect.bisect_left(self._sorted_tokens, prefix)
+        j = bisect.bisect_left(self._sorted_tokens, prefix + "\x7f", i, min(i + PREFIX_LIMIT, len(self._sorted_tokens)))
+        return self._sorted_tokens[i:j]
+
+    def _token_sets(self, token, last):
+        """Sets of contact names that match `token`: exactly, by sound, by spelling or (last token) by prefix."""
+        sets = [self._by_token.get(token, _EMPTY)]
+        sets += [self._by_key.get(key, _EMPTY) for key in phonetic_keys(token)]
+        sets += [self._by_token[t] for t in self._near(token)]
+        if last and len(token) >= 2:
+            sets += [self._by_token[t] for t in self._prefixed(token) if t != token]
+        return [names for names in sets if names]
+
+    def _candidates(self, tokens):
+        """Contacts that match every query token. The most selective token supplies the
+        candidates; the others only filter them, by set membership."""
+        per_token = [self._token_sets(t, i == len(tokens) - 1) for i, t in enumerate(tokens)]
+        order = sorted(range(len(tokens)), key=lambda i: sum(len(names) for names in per_token[i]))
+        seed = per_token[order[0]]
+        if sum(len(names) for names in seed) > MAX_SEED:
+            # Too vague to rank everything ("rahul" among thousands); offer exact token matches
+            seed = seed[:1]
+        candidates = set().union(*seed)
+        for i in order[1:]:
+            kept = set()
+            for names in per_token[i]:
+                kept |= candidates & names
+            candidates = kept
+            if not candidates:
+                break
+        return candidates
+
+    @staticmethod
+    def _pair_cost(query_token, token):
+        """Cost of matching query_token to one contact token, or None if they do not match."""
+        if token == query_token:
+            return 0.0
+        if token.startswith(query_token):
+            return PREFIX_COST
+        bound = _edit_bound(query_token)
+        distance = bounded_levenshtein(query_token, token, bound)
+        if distance <= bound:
+            return float(distance)
+        if phonetic_keys(query_token) & phonetic_keys(token):
+            return PHONETIC_COST
+        return None
+
+    def _cost(self, tokens, name, memo):
+        """Total cost of `name` for the query tokens, or None if one of them matches nothing.
+        `memo` caches pair costs across the candidates of one lookup, which share tokens."""
+        contact_tokens = self._tokens[name]
+        total, used = 0.0, set()
+        for query_token in tokens:
+            best, best_index = None, None
+            for index, token in enumerate(contact_tokens):
+                key = (query_token, token)
+                cost = memo[key] if key in memo else memo.setdefault(key, self._pair_cost(query_token, token))
+                if cost is not None and (best is None or cost < best):
+                    best, best_index = cost, index
+            if best is None:
+                return None
+            total += best
+            used.add(best_index)
+        return total + EXTRA_TOKEN_COST * (len(contact_tokens) - len(used))
+
+    def lookup(self, spoken, limit=3):
+        """Best matching contacts for a spoken or typed name, best first."""
+        tokens = normalize(spoken).split()
+        if not tokens:
+            return []
+        self.refresh()
+        with self._lock, metrics.timer("contacts.lookup"):
+            candidates = self._candidates(tokens)
+            if len(candidates) > MAX_CANDIDATES:
+                # Keep those with the most exact token hits
+                exact = [self._by_token.get(t, _EMPTY) for t in tokens]
+                candidates = sorted(candidates, key=lambda n: (-sum(n in e for e in exact), n))[:MAX_CANDIDATES]
+            matches, memo = [], {}
+            for name in candidates:
+                cost = self._cost(tokens, name, memo)
+                if cost is not None:
+                    matches.append(Match(name, self._numbers[name], cost))
+        matches.sort(key=lambda m: (m.cost, m.name))
+        metrics.incr("contacts.found" if matches else "contacts.not_found")
+        return matches[:limit]
+
+    def resolve(self, spoken):
+        """The one contact `spoken` refers to, or None if there is no match or several equally good ones."""
+        matches = self.lookup(spoken, limit=2)
+        if not matches:
+            return None
+        if len(matches) > 1 and matches[1].cost - matches[0].cost < AMBIGUITY_MARGIN:
+            metrics.incr("contacts.ambiguous")
+            return None
+        return matches[0]
+
+    def pick(self, reply, matches):
+        """Which of `matches` (offered to the user as choices) the reply names, or None."""
+        tokens = normalize(reply).split()
+        best = None
+        with self._lock:
+            for match in matches:
+                costs = []
+                for query_token in tokens:
+                    pair = [c for c in (self._pair_cost(query_token, t) for t in self._tokens.get(match.name, ())) if c is not None]
+                    if pair:  # filler words ("the sharma one") match nothing and are ignored
+                        costs.append(min(pair))
+                if costs:
+                    score = (-len(costs), sum(costs), match.name)
+                    if best is None or score < best[0]:
+                        best = (score, match)
+        return best[1] if best else None
@@ -0,0 +1,148 @@
+# maximus_deadline.py - Per-command time budget shared by every stage and upstream call
+"""
+A command can pass through several slow stages in a row: translation, then a
+handler, then the Gemini fallback; or SymPy, then the mathjs API. Each stage
+used to have its own fixed timeout, so together they could take far longer
+than anyone will wait. process_command now opens one budget for the whole
+command:
+
+    with budget(COMMAND_BUDGET):              # process_command
+        ...
+        requests.get(url, timeout=timeout(6)) # min(6, time left); DeadlineExceeded if none is left
+        bounded(wikipedia.summary, topic)     # for calls that take no timeout argument
+
+The budget lives in a context variable, so it follows the command through
+nested calls without being passed around. submit() and bounded() carry it
+into thread pools, which is how the speculative race and hedged requests
+see it. A nested budget() can only shorten the deadline, never extend it.
+
+When the budget runs out, upstream helpers raise DeadlineExceeded (a
+TimeoutError) instead of starting or waiting on a call. Handlers already catch
+upstream failures and answer locally ("Could not retrieve weather.",
+fallback_response), so the command still returns something, and within
+budget. Local CPU work, such as a long SymPy integral, is not interrupted.
+
+Code outside any budget (startup, the reminder thread) keeps its own fixed
+timeouts. Environment: MAXIMUS_COMMAND_BUDGET (seconds, default 10).
+Metrics: deadline.exceeded.<stage> counts calls refused because no time was left,
+deadline.saturated.<stage> calls refused because abandoned calls fill the bounded()
+pool, and deadline.queue_wait.<stage> times how long a bounded() call was queued.
+"""
+
+import os
+import time
+import threading
+import contextlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from maximus_metrics import metrics
+
+COMMAND_BUDGET = float(os.getenv("MAXIMUS_COMMAND_BUDGET", "10"))
+MIN_TIMEOUT = 0.05  # below this, a network call cannot succeed; treat the budget as spent
+BOUNDED_WORKERS = 16
+
+_deadline = contextvars.ContextVar("maximus_deadline", default=None)
+_pool = ThreadPoolExecutor(max_workers=BOUNDED_WORKERS, thread_name_prefix="maximus-bounded")
+_bounded_lock = threading.Lock()
+_in_flight = 0   # bounded() calls submitted and not finished yet, abandoned ones included
+_abandoned = 0   # of those, calls whose caller stopped waiting
+
+
+class DeadlineExceeded(TimeoutError):
+    """The command's time budget ran out before this stage could run."""
+
+
+class PoolSaturated(DeadlineExceeded):
+    """Every bounded() worker is busy, mostly with calls their callers gave up on; a new
+    call would spend its budget waiting in the queue, so it is refused at once."""
+
+
+@contextlib.contextmanager
+def budget(seconds):
+    """Gives the enclosed code at most `seconds` (or less, if an outer budget ends sooner)."""
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left in the current budget, or None outside any budget."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def timeout(cap, stage="call"):
+    """Timeout for the next call: `cap`, cut down to the time left. Raises DeadlineExceeded if none is."""
+    left = remaining()
+    if left is None:
+        return cap
+    if left < MIN_TIMEOUT:
+        metrics.incr(f"deadline.exceeded.{stage}")
+        raise DeadlineExceeded(f"no time left for {stage}")
+    return left if cap is None else min(cap, left)
+
+
+def submit(pool, fn, *args):
+    """pool.submit() that runs fn in the caller's context, so the budget follows it."""
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _run_bounded(fn, queued_at, stage, args, kwargs):
+    metrics.observe(f"deadline.queue_wait.{stage}", time.monotonic() - queued_at)
+    return fn(*args, **kwargs)
+
+
+def _bounded_done(future):
+    global _in_flight, _abandoned
+    with _bounded_lock:
+        _in_flight -= 1
+        if getattr(future, "abandoned", False):
+            _abandoned -= 1
+        metrics.set_gauge("deadline.bounded.in_flight", _in_flight)
+        metrics.set_gauge("deadline.bounded.abandoned", _abandoned)
+
+
+def bounded(fn, *args, cap=None, stage="call", **kwargs):
+    """Calls fn(*args, **kwargs) but stops waiting after timeout(cap) seconds, raising
+    DeadlineExceeded. For blocking calls with no timeout parameter; an abandoned call
+    finishes in the background and its result is dropped. While abandoned calls keep
+    every worker busy, new calls fail fast with PoolSaturated instead of queueing.
+    The wait includes time spent in the queue (metric deadline.queue_wait.<stage>)."""
+    global _in_flight, _abandoned
+    wait = timeout(cap, stage)
+    if wait is None:
+        return fn(*args, **kwargs)
+    with _bounded_lock:
+        if _in_flight >= BOUNDED_WORKERS:
+            metrics.incr(f"deadline.saturated.{stage}")
+            raise PoolSaturated(f"no free worker for {stage}: {_abandoned} abandoned calls still running")
+        _in_flight += 1
+        metrics.set_gauge("deadline.bounded.in_flight", _in_flight)
+    future = _pool.submit(contextvars.copy_context().run, _run_bounded, fn, time.monotonic(), stage, args, kwargs)
+    future.add_done_callback(_bounded_done)
+    try:
+        return future.result(timeout=wait)
+    except FutureTimeout:
+        metrics.incr(f"deadline.exceeded.{stage}")
+        with _bounded_lock:
+            if not future.done():  # still holds a worker; counted until it finishes
+                future.abandoned = True
+                _abandoned += 1
+                metrics.set_gauge("deadline.bounded.abandoned", _abandoned)
+        raise DeadlineExceeded(f"{stage} did not finish within {wait:.1f} s") from None
+
+
+def _after_fork():
+    """Pool threads do not survive fork(); a forked worker gets a fresh pool."""
+    global _pool, _bounded_lock, _in_flight, _abandoned
+    _pool = ThreadPoolExecutor(max_workers=BOUNDED_WORKERS, thread_name_prefix="maximus-bounded")
+    _bounded_lock = threading.Lock()
+    _in_flight = _abandoned = 0
+
+
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,330 @@
+# maximus_files.py - Persistent file name index for "find file" and open/delete by name
+"""
+"open file" and "delete file" used to need an exact relative path. Now the
+assistant keeps an index of the file names under a few folders, so a spoken
+name is enough:
+
+    index = FileIndex("file_index.json", roots=["~/Documents", "~/Downloads"])
+    index.start()                       # first build and periodic refresh, in the background
+    index.search("budget")
+    # -> [Found(path='/home/me/Documents/Budget 2024.xlsx', cost=0.0), ...]
+    index.resolve("budget 2024")        # a single confident match, else None
+
+The index is persisted in file_index.json (a JsonStore) as one entry per
+directory: its mtime and the names of its files and subdirectories. A refresh
+stat()s every directory and re-lists only those whose mtime changed, since
+creating, deleting or renaming an entry changes its directory's mtime. Files
+that were only edited do not need re-listing. After a restart, the saved
+entries let the first refresh skip every directory that is unchanged.
+
+File names are split into lowercase tokens, breaking on punctuation,
+camelCase and digits ("Budget2024Final.xlsx" -> budget, 2024, final, xlsx).
+The tokens are kept in an inverted index plus a sorted token array for prefix
+search. A query matches a file when every query token matches one of the
+file's tokens exactly, as a prefix, or within a small edit distance. The
+fuzzy step only runs when the exact and prefix matches are too few. Results
+are ranked by match cost, then by folder depth, then by name length.
+
+Environment:
+    MAXIMUS_FILE_ROOTS           folders to index, separated by os.pathsep
+                                 (default: ~/Documents, ~/Desktop, ~/Downloads)
+    MAXIMUS_FILE_INDEX_INTERVAL  seconds between background refreshes (default 300)
+Metrics: the files.refresh and files.search timers, files.dirs_listed /
+files.dirs_unchanged counters and the files.indexed gauge.
+"""
+
+import os
+import re
+import time
+import heapq
+import bisect
+import threading
+from collections import namedtuple
+
+from maximus_metrics import metrics
+from maximus_store import JsonStore
+from maximus_contacts import bounded_levenshtein
+from maximus_log import get_logger
+
+log = get_logger("files")
+
+DEFAULT_ROOTS = ["~/Documents", "~/Desktop", "~/Downloads"]
+SKIP_DIRS = frozenset({"node_modules", "__pycache__", "venv", "site-packages", "AppData", "Library"})
+REFRESH_INTERVAL = float(os.getenv("MAXIMUS_FILE_INDEX_INTERVAL", "300"))
+MAX_RANKED = 300       # candidates fully ranked per search; a vaguer query pre-selects the shortest paths
+PREFIX_LIMIT = 256     # distinct tokens a query token may expand to by prefix
+EXACT_NAME_COST = 0.0
+TOKEN_COST = {"exact": 1.0, "prefix": 1.5, "fuzzy": 2.0}
+EXTRA_TOKEN_COST = 0.1
+
+Found = namedtuple("Found", "path cost")
+
+_TOKEN_RE = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+_EMPTY = frozenset()
+
+
+def tokenize(name):
+    """'Budget2024Final.xlsx' -> ['budget', '2024', 'final', 'xlsx']."""
+    return [t.lower() for t in _TOKEN_RE.findall(name)]
+
+
+def configured_roots():
+    value = os.getenv("MAXIMUS_FILE_ROOTS")
+    roots = value.split(os.pathsep) if value else DEFAULT_ROOTS
+    return [os.path.abspath(os.path.expanduser(r)) for r in roots if r.strip()]
+
+
+def _fuzzy_bound(token):
+    if token.isdigit():
+        return 0  # "2024" and "2029" are different files, not a typo
+    return 0 if len(token) <= 3 else 1 if len(token) <= 5 else 2
+
+
+def _stem_key(name):
+    """'Budget 2024.xlsx' -> 'budget 2024', the key for exact name matches."""
+    return " ".join(tokenize(os.path.splitext(name)[0]))
+
+
+class FileIndex:
+    def __init__(self, path, roots=None):
+        self.store = JsonStore(path, dict)  # directory -> [mtime_ns, [files], [subdirectories]]
+        self.roots = roots if roots is not None else configured_roots()
+        self._lock = threading.RLock()
+        self._by_token = {}        # token -> set of file paths
+        self._by_name = {}         # _stem_key(name) -> set of file paths
+        self._sorted_tokens = []   # distinct tokens, sorted; rebuilt after a refresh changes them
+        self._tokens_changed = False
+        self._files = 0
+        self._loaded = False
+        self.ready = threading.Event()
+        self._thread = None
+
+    # --- In-memory token index ---
+    def _index_dir(self, directory, files, add):
+        for name in files:
+            path = os.path.join(directory, name)
+            key = _stem_key(name)
+            if add:
+                self._by_name.setdefault(key, set()).add(path)
+            elif key in self._by_name:
+                self._by_name[key].discard(path)
+                if not self._by_name[key]:
+                    del self._by_name[key]
+            for token in set(tokenize(name)):
+                paths = self._by_token.get(token)
+                if add:
+                    if paths is None:
+                        paths = self._by_token[token] = set()
+                        self._tokens_changed = True
+                    paths.add(path)
+                elif paths is not None:
+                    paths.discard(path)
+                    if not paths:
+                        del self._by_token[token]
+                        self._tokens_changed = True
+        self._files += len(files) if add else -len(files)
+
+    def _load(self):
+        """Builds the token index from the persisted directory entries (no disk walk)."""
+        with self._lock:
+            if self._loaded:
+                return
+            dirs = self.store.get()
+            for directory, (_, files, _) in dirs.items():
+                self._index_dir(directory, files, add=True)
+            self._loaded = True
+
+    # --- Refresh ---
+    @staticmethod
+    def _list(directory):
+        files, subdirs = [], []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS:
+                            subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        files.append(entry.name)
+                except OSError:
+                    continue
+        return files, subdirs
+
+    def refresh(self):
+        """Walks the roots, re-listing only directories whose mtime changed. Returns
+        (directories listed, directories unchanged)."""
+        self._load()
+        dirs = self.store.get()
+        seen = set()
+        listed = unchanged = 0
+        with metrics.timer("files.refresh"):
+            stack = [r for r in self.roots if os.path.isdir(r)]
+            while stack:
+                directory = stack.pop()
+                if directory in seen:
+                    continue
+                seen.add(directory)
+                try:
+                    mtime = os.stat(directory).st_mtime_ns
+                except OSError:
+                    continue
+                entry = dirs.get(directory)
+                if entry is not None and entry[0] == mtime:
+                    unchanged += 1
+                    subdirs = entry[2]
+                else:
+                    try:
+                        files, subdirs = self._list(directory)
+                    except OSError as e:
+                        log.debug("Cannot list %s: %s", directory, e)
+                        continue
+                    listed += 1
+                    with self._lock:
+                        if entry is not None:
+                            self._index_dir(directory, entry[1], add=False)
+                        self._index_dir(directory, files, add=True)
+                        dirs[directory] = [mtime, files, subdirs]
+                    self.store.mark_dirty()
+                stack.extend(os.path.join(directory, s) for s in subdirs)
+            # Directories that were deleted, or are no longer under a root
+            with self._lock:
+                for directory in [d for d in dirs if d not in seen]:
+                    self._index_dir(directory, dirs.pop(directory)[1], add=False)
+                    self.store.mark_dirty()
+        self.store.flush()
+        metrics.incr("files.dirs_listed", listed)
+        metrics.incr("files.dirs_unchanged", unchanged)
+        metrics.set_gauge("files.indexed", self._files)
+        return listed, unchanged
+
+    def forget(self, path):
+        """Drops one file from the index right away (after the assistant deleted it)."""
+        path = os.path.abspath(path)
+        directory, name = os.path.split(path)
+        with self._lock:
+            entry = self.store.get().get(directory)
+            if entry is not None and name in entry[1]:
+                entry[1].remove(name)
+                self._index_dir(directory, [name], add=False)
+                self.store.mark_dirty()
+
+    def _run(self):
+        while True:
+            try:
+                listed, unchanged = self.refresh()
+                log.debug("File index refreshed", extra={"listed": listed, "unchanged": unchanged})
+            except Exception as e:
+                log.warning("File index refresh failed: %s", e)
+            self.ready.set()
+            time.sleep(REFRESH_INTERVAL)
+
+    def start(self):
+        """Starts the background build and periodic refresh (once)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="maximus-file-index")
+                self._thread.start()
+
+    def __len__(self):
+        return self._files
+
+    # --- Search ---
+    def _tokens_with_prefix(self, prefix, limit=PREFIX_LIMIT):
+        if self._tokens_changed:
+            self._sorted_tokens = sorted(self._by_token)
+            self._tokens_changed = False
+        tokens = self._sorted_tokens
+        i = bisect.bisect_left(tokens, prefix)
+        j = bisect.bisect_left(tokens, prefix + "\x7f", i, len(tokens) if limit is None else min(i + limit, len(tokens)))
+        return tokens[i:j]
+
+    def _near_tokens(self, token):
+        """Indexed tokens within a small edit distance; scans only tokens with the same first letter."""
+        bound = _fuzzy_bound(token)
+        if not bound:
+            return []
+        return [t for t in self._tokens_with_prefix(token[0], limit=None)
+                if t != token and bounded_levenshtein(token, t, bound) <= bound]
+
+    def _matching(self, token, fuzzy):
+        paths = set(self._by_token.get(token, _EMPTY))
+        for t in self._tokens_with_prefix(token):
+            paths |= self._by_token[t]
+        if fuzzy:
+            for t in self._near_tokens(token):
+                paths |= self._by_token[t]
+        return paths
+
+    @staticmethod
+    def _pair_cost(q, t):
+        if t == q:
+            return TOKEN_COST["exact"]
+        if t.startswith(q):
+            return TOKEN_COST["prefix"]
+        bound = _fuzzy_bound(q)
+        distance = bounded_levenshtein(q, t, bound)
+        return TOKEN_COST["fuzzy"] + distance if distance <= bound else None
+
+    def _cost(self, path, query_tokens, query_text, memo):
+        """Match cost of `path`, or None. `memo` caches token pair costs for one search."""
+        name = os.path.basename(path)
+        tokens = tokenize(name)
+        stem_tokens = tokenize(os.path.splitext(name)[0])
+        if " ".join(stem_tokens) == query_text or " ".join(tokens) == query_text:
+            return EXACT_NAME_COST
+        total, used = 0.0, set()  # indices of the file's tokens matched by a query token
+        for q in query_tokens:
+            best = None
+            for index, t in enumerate(tokens):
+                key = (q, t)
+                cost = memo[key] if key in memo else memo.setdefault(key, self._pair_cost(q, t))
+                if cost is None:
+                    continue
+                if best is None or cost < best[0]:
+                    best = (cost, index)
+            if best is None:
+                return None
+            total += best[0]
+            used.add(best[1])
+        unmatched = sum(1 for i in range(len(stem_tokens)) if i not in used)
+        return total + EXTRA_TOKEN_COST * unmatched
+
+    def search(self, query, limit=5):
+        """Files whose names best match `query`, best first."""
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+        self._load()
+        query_text = " ".join(query_tokens)
+        with self._lock, metrics.timer("files.search"):
+            candidates = None
+            for fuzzy in (False, True):
+                candidates = None
+                for token in query_tokens:
+                    paths = self._matching(token, fuzzy)
+                    candidates = paths if candidates is None else candidates & paths
+                    if not candidates:
+                        break
+                if len(candidates) >= limit:
+                    break
+            if len(candidates) > MAX_RANKED:
+                # Exact name matches always make it; the rest are pre-selected cheaply
+                exact = self._by_name.get(query_text, _EMPTY)
+                candidates = set(exact) | set(heapq.nsmallest(MAX_RANKED, candidates, key=len))
+            found, memo = [], {}
+            for path in candidates:
+                cost = self._cost(path, query_tokens, query_text, memo)
+                if cost is not None:
+                    found.append(Found(path, cost))
+        found.sort(key=lambda f: (f.cost, f.path.count(os.sep), len(os.path.basename(f.path)), f.path))
+        return found[:limit]
+
+    def resolve(self, name):
+        """The one file `name` refers to: an existing path as given, or the only file whose
+        name matches exactly. None if there is no such file or several are equally likely."""
+        if os.path.isfile(name):
+            return os.path.abspath(name)
+        found = [f for f in self.search(name, limit=2) if f.cost == EXACT_NAME_COST]
+        return found[0].path if len(found) == 1 else None
@@ -0,0 +1,232 @@
+# maximus_history.py - Complete conversation history with a full-text index
+"""
+memory.json only keeps the last 20 conversation lines (the prompt context).
+Every line is also appended here, to an append-only JSONL archive that is
+never truncated:
+
+    {"time": "2026-10-12T09:14:03", "ts": 1791796443.0, "role": "user", "text": "..."}
+
+and indexed in RAM with an inverted index: token -> posting list of
+(turn number, term frequency), kept in compact arrays. Turn numbers are line
+positions in the archive, so posting lists are sorted by time and the text
+itself stays on disk (only each line's byte offset is kept).
+
+    history = ConversationHistory("conversation_history.jsonl")
+    history.append("user", "remind me to call the dentist on friday")
+    history.search("dentist", limit=5, since=time.time() - 7 * 86400)
+
+The index is built on first use (or in the background after warm()) and then
+maintained incrementally: append() indexes the new line, and every search first indexes whatever other processes
+(another web worker, the desktop app) appended since. Ranking is tf-idf,
+boosted for turns that contain every query term and decayed by age, so recent
+mentions come first. Only the newest MAX_CANDIDATES postings per term are
+scored, which keeps a search within milliseconds however long the history is.
+"""
+
+import os
+import re
+import json
+import math
+import time
+import heapq
+import bisect
+import datetime
+import threading
+from array import array
+
+from maximus_metrics import metrics
+from maximus_log import get_logger
+
+log = get_logger("history")
+
+MAX_CANDIDATES = 5000        # newest postings scored per query term
+RECENCY_HALF_LIFE_DAYS = 30  # a match this old scores half as much as one from today
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an the is are was were be been am of to in on at for and or me my you your i it "
+    "this that with what did do does say said about please can could would will".split()
+)
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall(str(text).lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class _Postings:
+    __slots__ = ("turns", "counts")
+
+    def __init__(self):
+        self.turns = array("I")
+        self.counts = array("H")
+
+
+class ConversationHistory:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._index = {}
+        self._times = array("d")
+        self._offsets = array("Q")
+        self._indexed_bytes = 0
+        self._loaded = False
+
+    def __len__(self):
+        with self._lock:
+            self._catch_up()
+            return len(self._offsets)
+
+    # --- Indexing ---
+    def _index_line(self, offset, record):
+        turn = len(self._offsets)
+        self._offsets.append(offset)
+        self._times.append(float(record.get("ts", 0.0)))
+        if not record.get("searchable", True):
+            return
+        counts = {}
+        for token in tokenize(record.get("text", "")):
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            postings = self._index.get(token)
+            if postings is None:
+                postings = self._index[token] = _Postings()
+            postings.turns.append(turn)
+            postings.counts.append(min(count, 65535))
+
+    def _catch_up(self):
+        """Indexes lines appended to the archive since the last call (by any process)."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            self._loaded = True
+            return
+        if size <= self._indexed_bytes:
+            self._loaded = True
+            return
+        with metrics.timer("history.index"):
+            with open(self.path, "rb") as f:
+                f.seek(self._indexed_bytes)
+                offset = self._indexed_bytes
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # a write in progress; pick it up next time
+                    try:
+                        self._index_line(offset, json.loads(line))
+                    except ValueError:
+                        log.warning("Skipping corrupt history line at byte %d", offset)
+                    offset += len(line)
+                self._indexed_bytes = offset
+        self._loaded = True
+
+    def append(self, role, text, searchable=True):
+        """Archives one conversation line. Unsearchable lines (history searches and their
+        answers, which would otherwise match every later search) are kept but not indexed."""
+        now = datetime.datetime.now()
+        record = {"time": now.isoformat(timespec="seconds"), "ts": now.timestamp(), "role": role, "text": text}
+        if not searchable:
+            record["searchable"] = False
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            # O_APPEND keeps concurrent writers from interleaving within a line
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            log.error("Failed to archive conversation: %s", e)
+            return
+        # Until the index has been built, the initial load will pick this line up
+        if self._loaded:
+            with self._lock:
+                self._catch_up()
+
+    def warm(self):
+        """Builds the index in a background thread so the first search does not pay for it."""
+        threading.Thread(target=len, args=(self,), daemon=True, name="maximus-history-index").start()
+
+    # --- Search ---
+    def _read(self, turn):
+        with open(self.path, "rb") as f:
+            f.seek(self._offsets[turn])
+            return json.loads(f.readline())
+
+    def search(self, query, limit=5, since=None, until=None):
+        """Best matching turns for `query`, best first, as dicts with time/role/text/score.
+        `since`/`until` are Unix timestamps bounding the turns considered."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with metrics.timer("history.search"), self._lock:
+            self._catch_up()
+            total = len(self._offsets)
+            low = bisect.bisect_left(self._times, since) if since is not None else 0
+            high = bisect.bisect_right(self._times, until) if until is not None else total
+            now = time.time()
+
+            scores = {}
+            matched = {}
+            for term in terms:
+                postings = self._index.get(term)
+                if postings is None:
+                    continue
+                idf = math.log(1 + total / len(postings.turns))
+                end = bisect.bisect_left(postings.turns, high)
+                start = max(bisect.bisect_left(postings.turns, low), end - MAX_CANDIDATES)
+                for turn, count in zip(postings.turns[start:end], postings.counts[start:end]):
+                    weight = idf if count == 1 else (1 + math.log(count)) * idf
+                    scores[turn] = scores.get(turn, 0.0) + weight
+                    matched[turn] = matched.get(turn, 0) + 1
+
+            def ranked(turn):
+                age_days = max(0.0, now - self._times[turn]) / 86400
+                coverage = matched[turn] / len(terms)
+                return scores[turn] * coverage * coverage * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+            best = heapq.nlargest(limit, scores, key=ranked)
+            results = []
+            for turn in best:
+                record = self._read(turn)
+                record["score"] = round(ranked(turn), 4)
+                results.append(record)
+            return results
+
+
+def parse_time_phrase(query):
+    """Strips a trailing 'today' / 'yesterday' / 'last week' / 'last month' from a query.
+    Returns (query, since_timestamp or None)."""
+    phrases = {
+        "today": 0, "yesterday": 1, "this week": 7, "last week": 7,
+        "this month": 30, "last month": 30, "this year": 365, "last year": 365,
+    }
+    query = query.strip().rstrip("?.! ")
+    for phrase, days in phrases.items():
+        if query.endswith(" " + phrase) or query == phrase:
+            midnight = datetime.datetime.combine(datetime.date.today(), datetime.time())
+            since = midnight - datetime.timedelta(days=days)
+            return query[:-len(phrase)].strip(), since.timestamp()
+    return query, None
+
+
+# Spoken/typed forms of a history search; the query is whatever follows
+SEARCH_TRIGGERS = ("search my history for ", "search history for ", "what did i say about ", "when did i mention ")
+
+
+def history_query(cmd):
+    """The search query if `cmd` (lowercased) asks to search the history, else None."""
+    for trigger in SEARCH_TRIGGERS:
+        if cmd.startswith(trigger):
+            return cmd[len(trigger):].strip()
+    return None
+
+
+def describe_results(query, results):
+    """One-paragraph summary of search results, for speaking or the chat window."""
+    if not results:
+        return f"I couldn't find anything about {query} in our conversations."
+    lines = []
+    for r in results:
+        when = datetime.datetime.fromisoformat(r["time"]).strftime("%A %d %B at %H:%M")
+        who = "you said" if r["role"] == "user" else "I said"
+        lines.append(f"On {when} {who}: {r['text']}")
+    return ". ".join(lines)
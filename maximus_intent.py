@@ -0,0 +1,280 @@
+# maximus_intent.py - Local intent classifier for commands that miss every trigger phrase
+"""
+The dispatchers match fixed trigger phrases ("weather", "add task", ...).
+Everything else used to go to Gemini, including commands a local handler
+could answer, such as "how's it looking outside in delhi" or "put milk on my
+list". Before that fallback, the dispatchers now ask this classifier:
+
+    prediction = intent_classifier.classify("put milk on my list")
+    # -> Prediction(intent='add_task', confidence=0.93, slots={'task': 'milk'})
+
+The model is TF-IDF over character 2-4-grams (words padded with spaces), with
+a linear softmax layer trained with NumPy. It is trained on the bundled
+intent_phrases.jsonl ({"text": ..., "intent": ...} per line) the first time
+it is used, in about a quarter of a second; warm() does this ahead of time. The
+"none" intent holds phrasings that belong to the AI (chit-chat, open
+questions, writing), so those stay with Gemini.
+
+classify() returns None, meaning "let Gemini answer", unless:
+  - at least MIN_COVERAGE of the text's n-grams were seen in training (the
+    model has nothing to say about words it has never seen),
+  - the best intent is not "none",
+  - its probability reaches MAXIMUS_INTENT_THRESHOLD (default 0.6), and
+  - the slots the handler needs (location, task, expression, ...) can be
+    extracted from the text. Weather can do without a location, but then the
+    text must name the weather ("is it raining"), not just be short ("is it").
+A command is classified in well under a millisecond. Set MAXIMUS_INTENT=0 to
+turn the classifier off. Metrics: the intent.classify timer and the
+intent.<name>.routed / intent.rejected counters.
+"""
+
+import os
+import re
+import json
+import math
+import threading
+from collections import Counter, namedtuple
+
+from maximus_metrics import metrics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PHRASES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_phrases.jsonl")
+NGRAM_SIZES = (2, 3, 4)
+EPOCHS = 150
+LEARNING_RATE = 8.0
+L2 = 1e-4
+MIN_COVERAGE = 0.6  # share of a text's n-grams that must be in the vocabulary
+
+Prediction = namedtuple("Prediction", "intent confidence slots")
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?|[+\-*/^%().]")
+
+
+def ngrams(text):
+    """Character n-gram counts of `text`, each word padded with spaces."""
+    counts = Counter()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                counts[padded[i:i + n]] += 1
+    return counts
+
+
+# ---------------- Slot extraction ----------------
+_FILLER = r"(?:please|can you|could you|would you|hey|maximus|for me|now|right now|today|tonight|tomorrow|this (?:morning|evening|weekend))"
+
+_NUMBER_WORDS = [
+    (r"\bmultiplied by\b|\btimes\b|\bx\b", "*"), (r"\bdivided by\b|\bover\b", "/"),
+    (r"\bplus\b|\band\b", "+"), (r"\bminus\b", "-"), (r"\bto the power of\b|\bpower\b", "**"),
+    (r"\bsquared\b", "**2"), (r"\bcubed\b", "**3"),
+]
+
+
+# Places that only point at where the user is; the weather handler uses the default city instead
+_HERE = {"here", "there", "outside", "out", "over here", "out there", "area", "my area", "my location",
+         "my city", "where i am"}
+
+
+def _location(text):
+    match = re.search(r"\b(?:in|at|for|over|near|around)\s+([a-z][a-z .'-]*)$", _strip_filler(text))
+    location = match.group(1) if match else ""
+    location = re.sub(r"\b(?:the|this|next|weekend|week|morning|evening|afternoon)\b", " ", location)
+    location = " ".join(location.split())
+    return "" if location in _HERE else location
+
+
+def _strip_filler(text):
+    text = text.lower().strip(" ?.!")
+    return re.sub(rf"\s*\b{_FILLER}\b\s*", " ", text).strip()
+
+
+def _task(text):
+    text = _strip_filler(text)
+    patterns = [
+        r"^(?:i need to\s+)?(.+?),?\s+(?:add|put) it (?:to|on) (?:my |the )?(?:to-?do |task |shopping )?(?:list|todos?|tasks?)$",
+        r"^(?:put|add|stick|write|jot down|note down|note|log|remember to)\s+(?:a task to\s+)?(.+?)\s+(?:on|to|in|onto)\s+(?:my |the )?(?:to-?do |task |shopping )?(?:list|todos?|to do list|tasks?)$",
+        r"^(?:new task|create a task|add a task to|add a task|schedule a todo to|make a note to|jot down|note down|write down|log a task to)\s+(.+)$",
+        r"^remind me on (?:my|the) list to\s+(.+)$",
+    ]
+    for pattern in patterns:
+        match = re.match(pattern, text)
+        if match:
+            task = match.group(1).strip(" ,")
+            return re.sub(r"^(?:to|a|the task)\s+", "", task) if len(task.split()) > 1 else task
+    return ""
+
+
+def _expression(text):
+    text = text.lower()
+    if "%" in text or "percent" in text:
+        match = re.search(r"([\d.]+)\s*(?:%|percent)\s+of\s+([\d.]+)", text)
+        return f"{match.group(1)} / 100 * {match.group(2)}" if match else ""
+    match = re.search(r"half of\s+([\d.]+)", text)
+    if match:
+        return f"{match.group(1)} / 2"
+    match = re.search(r"square root of\s+([\d.]+)", text)
+    if match:
+        return f"sqrt({match.group(1)})"
+    match = re.search(r"subtract\s+([\d.]+)\s+from\s+([\d.]+)", text)
+    if match:
+        return f"{match.group(2)} - {match.group(1)}"
+    match = re.search(r"(?:divide)\s+([\d.]+)\s+by\s+([\d.]+)", text)
+    if match:
+        return f"{match.group(1)} / {match.group(2)}"
+    match = re.search(r"(?:multiply)\s+([\d.]+)\s+(?:by|and|with)\s+([\d.]+)", text)
+    if match:
+        return f"{match.group(1)} * {match.group(2)}"
+    for pattern, symbol in _NUMBER_WORDS:
+        text = re.sub(pattern, f" {symbol} ", text)
+    spans = re.findall(r"[\d.+\-*/^()\s]*\d[\d.+\-*/^()\s]*", text)
+    expression = " ".join(max(spans, key=len, default="").split())
+    return expression if re.search(r"\d\s*[+\-*/^]", expression) else ""
+
+
+def _topic(text):
+    text = _strip_filler(text)
+    text = re.sub(r"\s+(?:on|in|from) (?:wiki|wikipedia|the encyclopedia)$", "", text)
+    match = re.search(r"\b(?:about|on|up|into|for|regarding|of|say about|summary of|the article on|the life of)\s+(.+)$", text)
+    topic = match.group(1) if match else ""
+    return re.sub(r"^(?:the )?(?:history|life) of\s+", "", topic).strip()
+
+
+def _query(text):
+    text = _strip_filler(text)
+    text = re.sub(r"^(?:play|put on|stream|queue up|start|show me|let me hear|i want to (?:watch|listen to|hear))\s+", "", text)
+    text = re.sub(r"\s+(?:on|from) youtube$", "", text)
+    text = re.sub(r"^(?:some|a|an|the)\s+", "", text)
+    return text.strip()
+
+
+# Intent -> (slot name, extractor); a slot that comes back empty means "not confident enough"
+SLOTS = {
+    "weather": ("location", _location),
+    "add_task": ("task", _task),
+    "math": ("expression", _expression),
+    "wikipedia": ("topic", _topic),
+    "youtube": ("query", _query),
+}
+_WEATHER_WORD_RE = re.compile(
+    r"\b(?:weather|forecast|rain\w*|umbrella|raincoat|temperature|degrees|hot|cold|chilly|warm|sunny|"
+    r"snow\w*|humid\w*|wind\w*|storm\w*|fog\w*|heatwave|sunscreen|jacket|sweater|climate|sky|outside|nice out)\b")
+# Slot -> what the text must contain instead when the slot is empty.
+# No location -> the handler reports the local weather, if the weather was asked about at all.
+OPTIONAL_SLOTS = {"location": _WEATHER_WORD_RE}
+
+
+class IntentClassifier:
+    def __init__(self, phrases_file=PHRASES_FILE, threshold=0.6, enabled=True):
+        self.phrases_file = phrases_file
+        self.threshold = threshold
+        self.enabled = enabled and np is not None
+        self._lock = threading.Lock()
+        self._trained = False
+
+    # --- Training ---
+    def _load(self):
+        texts, labels = [], []
+        with open(self.phrases_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    texts.append(record["text"])
+                    labels.append(record["intent"])
+        return texts, labels
+
+    def coverage(self, counts):
+        """Share of the n-grams in `counts` that are in the vocabulary."""
+        total = sum(counts.values())
+        return sum(c for g, c in counts.items() if g in self.vocabulary) / total if total else 0.0
+
+    def _vectorize(self, counts):
+        """(feature indices, TF-IDF weights) of known n-grams, L2-normalised."""
+        index, weights = [], []
+        for gram, count in counts.items():
+            i = self.vocabulary.get(gram)
+            if i is not None:
+                index.append(i)
+                weights.append((1.0 + math.log(count)) * self.idf[i])
+        weights = np.asarray(weights, dtype=np.float32)
+        norm = np.linalg.norm(weights)
+        return np.asarray(index, dtype=np.intp), (weights / norm if norm else weights)
+
+    def train(self):
+        texts, labels = self._load()
+        docs = [ngrams(t) for t in texts]
+        document_frequency = Counter(g for d in docs for g in d)
+        self.vocabulary = {g: i for i, g in enumerate(sorted(document_frequency))}
+        self.idf = np.array([math.log((1 + len(docs)) / (1 + document_frequency[g])) + 1.0
+                             for g in sorted(document_frequency)], dtype=np.float32)
+        self.intents = sorted(set(labels))
+
+        X = np.zeros((len(docs), len(self.vocabulary)), dtype=np.float32)
+        for row, counts in enumerate(docs):
+            index, weights = self._vectorize(counts)
+            X[row, index] = weights
+        Y = np.zeros((len(docs), len(self.intents)), dtype=np.float32)
+        Y[np.arange(len(docs)), [self.intents.index(label) for label in labels]] = 1.0
+
+        # Multinomial logistic regression, full-batch gradient descent
+        W = np.zeros((X.shape[1], Y.shape[1]), dtype=np.float32)
+        b = np.zeros(Y.shape[1], dtype=np.float32)
+        for _ in range(EPOCHS):
+            scores = X @ W + b
+            scores -= scores.max(axis=1, keepdims=True)
+            P = np.exp(scores)
+            P /= P.sum(axis=1, keepdims=True)
+            error = (P - Y) / len(docs)
+            W -= LEARNING_RATE * (X.T @ error + L2 * W)
+            b -= LEARNING_RATE * error.sum(axis=0)
+        self.W, self.b = W, b
+        self._trained = True
+
+    def warm(self):
+        """Trains the model now instead of on the first command."""
+        if self.enabled and not self._trained:
+            with self._lock:
+                if not self._trained:
+                    with metrics.timer("intent.train"):
+                        self.train()
+
+    # --- Inference ---
+    def predict(self, text):
+        """(intent, probability, coverage) of the most likely intent for `text`."""
+        self.warm()
+        counts = ngrams(text)
+        index, weights = self._vectorize(counts)
+        scores = weights @ self.W[index] + self.b
+        scores = np.exp(scores - scores.max())
+        best = int(scores.argmax())
+        return self.intents[best], float(scores[best] / scores.sum()), self.coverage(counts)
+
+    def classify(self, text):
+        """A Prediction to route `text` to a local handler, or None to leave it to the AI."""
+        if not self.enabled or not text.strip():
+            return None
+        with metrics.timer("intent.classify"):
+            intent, confidence, coverage = self.predict(text)
+            slots = {}
+            if intent in SLOTS:
+                name, extract = SLOTS[intent]
+                slots[name] = extract(text)
+            usable = intent != "none" and confidence >= self.threshold and coverage >= MIN_COVERAGE and \
+                all(value or (name in OPTIONAL_SLOTS and OPTIONAL_SLOTS[name].search(text.lower()))
+                    for name, value in slots.items())
+        if not usable:
+            metrics.incr("intent.rejected")
+            return None
+        metrics.incr(f"intent.{intent}.routed")
+        return Prediction(intent, confidence, slots)
+
+
+intent_classifier = IntentClassifier(
+    threshold=float(os.getenv("MAXIMUS_INTENT_THRESHOLD", "0.6")),
+    enabled=os.getenv("MAXIMUS_INTENT", "1") != "0",
+)
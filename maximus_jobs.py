@@ -0,0 +1,231 @@
+# maximus_jobs.py - Persistent background job queue (SQLite) with a worker pool
+"""
+Slow commands (Wikipedia lookups, open questions, Gemini answers) do not have
+to hold an HTTP request open. chat_api can enqueue them and answer right away
+with a job id. The client then polls, or long-polls, /jobs/<id> for the result.
+
+    jobs = JobQueue("jobs.sqlite3", workers=4)
+    jobs.register("command", lambda payload: {"response": assistant.process_command(payload["message"])})
+    job_id = jobs.submit("command", {"message": "who is alan turing"})
+    jobs.wait(job_id, timeout=25)   # -> {"id": ..., "status": "done", "result": {...}, ...}
+
+Jobs live in an SQLite table, so they survive a restart. Queued jobs are
+picked up by the next process that uses the queue. Several processes (web
+workers) can share one database: a job is claimed in a single UPDATE, so each
+job runs once.
+
+A running job holds a lease: the claiming process's owner token (a fresh uuid
+per process, so a restarted container that gets the same PID is still a new
+owner) and a lease_until time that a heartbeat thread pushes forward every
+HEARTBEAT_INTERVAL. Jobs whose lease has run out, because the process that
+claimed them died, are queued again by the next heartbeat of any process.
+
+Worker threads start on first use (or an explicit start()), so a process that
+imports the queue only to fork web workers never runs jobs itself; a forked
+child drops the parent's connections and threads and starts its own.
+
+Waiting is event-driven within a process. Across processes it falls back to
+re-reading the row every POLL_INTERVAL. Finished jobs are deleted after
+RETENTION_SECONDS.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+from maximus_metrics import metrics
+from maximus_log import get_logger
+
+log = get_logger("jobs")
+
+POLL_INTERVAL = 0.25
+LEASE_SECONDS = 30.0       # a running job whose lease is this old is taken to be orphaned
+HEARTBEAT_INTERVAL = 10.0  # how often a process renews its leases and looks for orphaned jobs
+RETENTION_SECONDS = 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,          -- queued | running | done | error
+    result TEXT,
+    error TEXT,
+    owner TEXT,                    -- token of the process running it
+    lease_until REAL,              -- the job is orphaned once this passes
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created);
+"""
+
+
+class JobQueue:
+    def __init__(self, path, workers=4):
+        self.path = path
+        self.workers = workers
+        self._handlers = {}
+        self._version = 0  # bumped on every change, so a wait never misses a notification
+        self._reset()
+        db = self._connect()
+        db.executescript(_SCHEMA)
+        columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+        if "lease_until" not in columns:  # databases written by older versions
+            db.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+        db.close()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # SQLite connections, locks and threads must not be shared with a forked child
+        self._local = threading.local()
+        self._changed = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._threads = []
+        self._started = False
+        self._token = uuid.uuid4().hex
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    @property
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = self._connect()
+        return db
+
+    def register(self, kind, handler):
+        """handler(payload) -> JSON-serialisable result; exceptions mark the job as failed."""
+        self._handlers[kind] = handler
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        self._recover()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, daemon=True, name=f"maximus-job-{i}")
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat, daemon=True, name="maximus-job-heartbeat")
+        t.start()
+        self._threads.append(t)
+
+    def _recover(self):
+        """Re-queues running jobs whose lease has run out and drops old finished jobs."""
+        db = self._db
+        now = time.time()
+        recovered = db.execute(
+            "UPDATE jobs SET status = 'queued', owner = NULL, lease_until = NULL "
+            "WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)", (now,)).rowcount
+        if recovered > 0:
+            metrics.incr("jobs.recovered", recovered)
+            self._notify()
+        db.execute("DELETE FROM jobs WHERE status IN ('done', 'error') AND finished < ?", (now - RETENTION_SECONDS,))
+
+    def _heartbeat(self):
+        """Keeps this process's leases alive and re-queues jobs orphaned by other processes."""
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            try:
+                self._db.execute("UPDATE jobs SET lease_until = ? WHERE status = 'running' AND owner = ?",
+                                 (time.time() + LEASE_SECONDS, self._token))
+                self._recover()
+            except sqlite3.Error as e:
+                log.error("Job queue error: %s", e)
+
+    def _notify(self):
+        with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    def _wait_for_change(self, seen, timeout):
+        with self._changed:
+            if self._version == seen:
+                self._changed.wait(timeout)
+
+    # --- Producer side ---
+    def submit(self, kind, payload):
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        self.start()
+        job_id = uuid.uuid4().hex
+        self._db.execute(
+            "INSERT INTO jobs (id, kind, payload, status, created) VALUES (?, ?, ?, 'queued', ?)",
+            (job_id, kind, json.dumps(payload), time.time()),
+        )
+        metrics.incr(f"jobs.{kind}.submitted")
+        self._notify()
+        return job_id
+
+    def get(self, job_id):
+        self.start()
+        row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {"id": row["id"], "kind": row["kind"], "status": row["status"],
+               "created": row["created"], "started": row["started"], "finished": row["finished"]}
+        if row["result"] is not None:
+            job["result"] = json.loads(row["result"])
+        if row["error"] is not None:
+            job["error"] = row["error"]
+        return job
+
+    def wait(self, job_id, timeout):
+        """Returns the job once it has finished or `timeout` seconds have passed (long-poll)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            seen = self._version
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in ("done", "error") or remaining <= 0:
+                return job
+            self._wait_for_change(seen, min(POLL_INTERVAL, remaining))
+
+    # --- Worker side ---
+    def _claim(self):
+        row = self._db.execute(
+            "UPDATE jobs SET status = 'running', owner = ?, started = ?, lease_until = ? "
+            "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1) AND status = 'queued' "
+            "RETURNING id, kind, payload, created",
+            (self._token, time.time(), time.time() + LEASE_SECONDS),
+        ).fetchone()
+        return row
+
+    def _worker(self):
+        while True:
+            seen = self._version
+            try:
+                row = self._claim()
+            except sqlite3.Error as e:
+                log.error("Job queue error: %s", e)
+                row = None
+            if row is None:
+                self._wait_for_change(seen, POLL_INTERVAL * 4)
+                continue
+            self._run(row)
+
+    def _run(self, row):
+        kind = row["kind"]
+        metrics.observe(f"jobs.{kind}.queued_seconds", time.time() - row["created"])
+        try:
+            with metrics.timer(f"jobs.{kind}.run"):
+                result = self._handlers[kind](json.loads(row["payload"]))
+            self._db.execute("UPDATE jobs SET status = 'done', result = ?, finished = ? WHERE id = ?",
+                             (json.dumps(result), time.time(), row["id"]))
+        except Exception as e:
+            metrics.incr(f"jobs.{kind}.failed")
+            self._db.execute("UPDATE jobs SET status = 'error', error = ?, finished = ? WHERE id = ?",
+                             (str(e), time.time(), row["id"]))
+        self._notify()
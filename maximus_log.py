@@ -0,0 +1,253 @@
+# maximus_log.py - Structured, non-blocking logging for the assistant
+"""
+Handlers used to report errors with print(), synchronously, without levels,
+timestamps or any way to tell which command a line belongs to. They now log
+through here:
+
+    from maximus_log import get_logger, command_context
+    log = get_logger("desktop")
+
+    with command_context():                      # process_command: one id per command
+        log.warning("Weather lookup failed: %s", e)
+        log.debug("cache miss", extra={"key": k})   # sampled, see below
+
+A logging call on the request thread only builds the record and puts it on an
+in-memory queue (logging.handlers.QueueHandler). A background writer thread
+turns records into JSON lines and writes them to stderr or MAXIMUS_LOG_FILE:
+
+    {"ts": "2026-10-18T14:25:01.123", "level": "WARNING", "logger": "maximus.desktop",
+     "msg": "Weather lookup failed: timed out", "command_id": "3f9c2a1b7d04", "thread": "MainThread"}
+
+Each command gets a correlation id (command_id), and every record logged while
+handling it carries that id, including records from the thread pools (they
+copy the caller's context, see maximus_deadline.submit). The web view uses
+the request's X-Request-ID header as the id when present and returns it.
+
+DEBUG records are high-volume, so only a fraction of them is kept
+(MAXIMUS_LOG_DEBUG_SAMPLE, default 0.1, at level DEBUG only). Kept records
+carry "sample_rate" so counts can be scaled back up.
+
+Environment:
+    MAXIMUS_LOG=0              start with logging off
+    MAXIMUS_LOG_LEVEL          INFO by default
+    MAXIMUS_LOG_FORMAT=text    human-readable lines instead of JSON
+    MAXIMUS_LOG_FILE           write here instead of stderr
+set_enabled(False) turns logging off at runtime; a disabled logger call costs
+one level check. The desktop assistant understands "logging off" and
+"logging on".
+"""
+
+import os
+import sys
+import atexit
+import json
+import uuid
+import queue
+import random
+import logging
+import datetime
+import threading
+import contextlib
+import contextvars
+import logging.handlers
+
+ROOT_LOGGER = "maximus"
+WRITER_THREAD = "maximus-log-writer"
+_OFF = logging.CRITICAL + 1
+
+_command_id = contextvars.ContextVar("maximus_command_id", default=None)
+
+
+def new_command_id():
+    return uuid.uuid4().hex[:12]
+
+
+def current_command_id():
+    return _command_id.get()
+
+
+@contextlib.contextmanager
+def command_context(command_id=None):
+    """Tags every record logged inside with a correlation id. Nested contexts keep the
+    outer id unless a new one is given explicitly. Yields the id in effect."""
+    if command_id is None and _command_id.get() is not None:
+        yield _command_id.get()
+        return
+    command_id = command_id or new_command_id()
+    token = _command_id.set(command_id)
+    try:
+        yield command_id
+    finally:
+        _command_id.reset(token)
+
+
+# ---------------- Formatting (writer thread) ----------------
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "command_id", "sample_rate"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "command_id": getattr(record, "command_id", None),
+            "thread": record.threadName,
+        }
+        if getattr(record, "sample_rate", None):
+            entry["sample_rate"] = record.sample_rate
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(command_id)s] %(message)s")
+
+    def format(self, record):
+        if not hasattr(record, "command_id"):
+            record.command_id = None
+        return super().format(record)
+
+
+# ---------------- Enqueueing (caller thread) ----------------
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records with as little work as possible on the calling thread."""
+
+    def __init__(self, q, debug_sample):
+        super().__init__(q)
+        self.debug_sample = debug_sample
+
+    def emit(self, record):
+        if record.levelno == logging.DEBUG and self.debug_sample < 1.0:
+            if random.random() >= self.debug_sample:
+                return
+            record.sample_rate = self.debug_sample
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def prepare(self, record):
+        record.command_id = _command_id.get()
+        # Merge args now: they may be mutated after the call returns
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _Writer:
+    """Background thread that drains the queue into the real handler."""
+
+    def __init__(self, q, handler):
+        self.queue = q
+        self.handler = handler
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name=WRITER_THREAD)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            try:
+                self.handler.handle(record)
+            except Exception:
+                pass
+
+    def stop(self):
+        """Writes out everything queued so far and stops the thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join()
+        self._thread = None
+        try:
+            self.handler.flush()
+        except (ValueError, OSError):
+            pass  # the stream was already closed (e.g. stderr at interpreter exit)
+
+
+_writer = None
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def _build_handler():
+    path = os.getenv("MAXIMUS_LOG_FILE")
+    handler = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(TextFormatter() if os.getenv("MAXIMUS_LOG_FORMAT") == "text" else JsonFormatter())
+    return handler
+
+
+def configure():
+    """Installs the queue handler and starts the writer (once)."""
+    global _writer, _configured
+    with _configure_lock:
+        if _configured:
+            return
+        q = queue.SimpleQueue()
+        root = logging.getLogger(ROOT_LOGGER)
+        root.propagate = False
+        root.addHandler(_QueueHandler(q, float(os.getenv("MAXIMUS_LOG_DEBUG_SAMPLE", "0.1"))))
+        _writer = _Writer(q, _build_handler())
+        _writer.start()
+        _configured = True
+        set_enabled(os.getenv("MAXIMUS_LOG", "1") != "0")
+
+
+def get_logger(name):
+    configure()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def set_enabled(enabled):
+    """Turns all assistant logging on or off at runtime."""
+    level = os.getenv("MAXIMUS_LOG_LEVEL", "INFO").upper() if enabled else _OFF
+    logging.getLogger(ROOT_LOGGER).setLevel(level)
+
+
+def is_enabled():
+    return logging.getLogger(ROOT_LOGGER).level != _OFF
+
+
+def flush():
+    """Blocks until every record logged so far has been written."""
+    if _writer is not None:
+        _writer.stop()
+        _writer.start()
+
+
+def _shutdown():
+    """Writes out queued records at exit; the writer is a daemon thread and would be cut off."""
+    if _writer is not None:
+        _writer.stop()
+
+
+atexit.register(_shutdown)
+
+
+# ---------------- Fork safety ----------------
+# The writer thread is stopped before fork() and restarted on both sides, so no
+# child inherits a queue lock held by a writer that does not exist there.
+def _before_fork():
+    if _writer is not None:
+        _writer.stop()
+
+
+def _after_fork():
+    if _writer is not None:
+        _writer.start()
+
+
+os.register_at_fork(before=_before_fork, after_in_parent=_after_fork, after_in_child=_after_fork)
@@ -12,6 +12,19 @@ import requests
 import subprocess
 import re
 from django.conf import settings
+from maximus_metrics import metrics
+import maximus_upstream as upstream
+from maximus_semantic_cache import gemini_cache
+from maximus_admission import gemini_admission, Overloaded
+from maximus_speculative import Candidate, resolve
+from maximus_store import JsonStore
+from maximus_history import ConversationHistory, history_query, parse_time_phrase, describe_results
+from maximus_tasks import TaskStore
+from maximus_profile import profiler, PROFILE_NEXT_COMMANDS
+from maximus_deadline import budget, DeadlineExceeded, COMMAND_BUDGET
+from maximus_intent import intent_classifier
+from maximus_compound import CompoundPlanner, execute, merge
+from maximus_log import get_logger, command_context
 
 # --- Optional Imports ---
 try:
@@ -46,23 +59,46 @@ load_dotenv()
 
 API_KEY = os.getenv("GEMINI_API_KEY")
 if API_KEY:
-    genai.configure(api_key=API_KEY)
+    upstream.configure_gemini(API_KEY)
 
 # --- Configuration ---
 DEVICE_NAME = "Maximus"
 # Use Django's base dir for storage to avoid path issues
 
 # Google App Engine allows writing only to /tmp
-if os.getenv('GAE_ENV', '').startswith('standard'):
+if os.getenv('MAXIMUS_STORAGE_DIR'):
+    STORAGE_DIR = os.getenv('MAXIMUS_STORAGE_DIR')
+elif os.getenv('GAE_ENV', '').startswith('standard'):
     STORAGE_DIR = "/tmp"
 else:
     STORAGE_DIR = settings.BASE_DIR
 
 CONTACTS_FILE = os.path.join(STORAGE_DIR, "contacts.json")
 TASKS_FILE = os.path.join(STORAGE_DIR, "tasks.json")
+TASKS_ARCHIVE_FILE = os.path.join(STORAGE_DIR, "tasks_archive.json")
 MEMORY_FILE = os.path.join(STORAGE_DIR, "memory.json")
+HISTORY_FILE = os.path.join(STORAGE_DIR, "conversation_history.jsonl")
+JOBS_DB = os.path.join(STORAGE_DIR, "jobs.sqlite3")
+
+# Per-source deadlines (seconds) for "what is / who is / tell me about" questions
+QUESTION_DEADLINES = {"wikipedia": 2.5, "gemini": 8.0}
+MATH_OPERATORS = ['+', '-', '*', '/', 'mod', 'plus', 'minus', 'times']
+# Intents that wait on Wikipedia/Gemini; the web UI runs these as background jobs
+SLOW_INTENTS = {"wikipedia", "question", "ai"}
+# Intents that only wait on the network; the parts of a compound command with these run concurrently
+IO_BOUND_INTENTS = {"weather", "wikipedia", "question"}
+# Phrases that begin a sub-command of a compound command ("weather in pune and add task buy milk")
+COMMAND_TRIGGERS = (
+    "calculate", "solve", "weather", "what's the weather", "wikipedia", "search for", "play ", "youtube",
+    "add todo", "add task", "list tasks", "show todo", "tell me a joke", "what is ", "who is ", "tell me about ",
+)
+HELP_TEXT = ("I can help with math, weather, wikipedia, tasks, and general questions. "
+             "Ask for several things at once with 'and', like 'weather in pune and mumbai and add task buy milk'.")
+
+log = get_logger("web")
 
 # --- Storage Helpers ---
+@metrics.timed("storage.load")
 def safe_load_json(path, default):
     try:
         if not os.path.exists(path):
@@ -70,111 +106,260 @@ def safe_load_json(path, default):
         with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except Exception as e:
-        print(f"Failed to load {path}:", e)
+        log.warning("Failed to load %s: %s", path, e)
         return default
 
+@metrics.timed("storage.save")
 def safe_save_json(path, data):
     try:
         with open(path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
     except Exception as e:
-        print(f"Failed to save {path}:", e)
+        log.error("Failed to save %s: %s", path, e)
 
 # --- Core Logic Class ---
 class MaximusAssistant:
     def __init__(self):
-        self.memory = safe_load_json(MEMORY_FILE, {"facts": {}, "conversations": []})
+        # Cached in RAM, reloaded when another worker changes the file, written once per command
+        self.memory_store = JsonStore(MEMORY_FILE, lambda: {"facts": {}, "conversations": []})
+        self.tasks = TaskStore(TASKS_FILE, TASKS_ARCHIVE_FILE)
+        self.history = ConversationHistory(HISTORY_FILE)
+        self.history.warm()
+        self.compound = CompoundPlanner(self.is_command_part, self.is_io_bound)
+
+    @property
+    def memory(self):
+        return self.memory_store.get()
 
     def save_memory(self):
-        safe_save_json(MEMORY_FILE, self.memory)
+        self.memory_store.flush()
+
+    def flush(self):
+        self.memory_store.flush()
+        self.tasks.flush()
 
-    def append_conversation(self, role, text):
-        self.memory["conversations"].append({
+    def append_conversation(self, role, text, searchable=True):
+        memory = self.memory
+        memory["conversations"].append({
             "time": datetime.datetime.now().isoformat(),
             "role": role,
             "text": text
         })
-        self.memory["conversations"] = self.memory["conversations"][-20:]
-        self.save_memory()
+        memory["conversations"] = memory["conversations"][-20:]
+        self.memory_store.mark_dirty()
+        self.history.append(role, text, searchable)
 
-    def get_gemini_response(self, prompt):
-        if not API_KEY:
-            return "AI core offline (Gemini API Key missing)."
-        
+    def build_prompt(self, prompt):
         # Construct a history-aware prompt
         history_text = ""
         for conv in self.memory["conversations"][-5:]:
             role = "User" if conv['role'] == "user" else "Model"
             history_text += f"{role}: {conv['text']}\n"
         
-        full_prompt = f"System: You are {DEVICE_NAME}, a helpful web assistant. Keep responses concise.\n{history_text}User: {prompt}\nModel:"
+        return f"System: You are {DEVICE_NAME}, a helpful web assistant. Keep responses concise.\n{history_text}User: {prompt}\nModel:"
+
+    @metrics.timed("handler.gemini")
+    def get_gemini_response(self, prompt):
+        if not API_KEY:
+            return "AI core offline (Gemini API Key missing)."
+        
+        cached = gemini_cache.lookup(prompt)
+        if cached is not None:
+            return cached
+
+        full_prompt = self.build_prompt(prompt)
 
         try:
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            response = model.generate_content(full_prompt)
-            return response.text.strip()
+            # Bounded concurrency; raises Overloaded (-> HTTP 429) when the wait would be too long
+            with gemini_admission.slot():
+                text = upstream.gemini_generate(full_prompt).strip()
+            gemini_cache.store(prompt, text)
+            return text
+        except Overloaded:
+            raise
+        except DeadlineExceeded:
+            log.warning("Gemini call abandoned: command budget spent")
+            return "I couldn't get an answer in time. Please try again."
         except Exception as e:
+            log.error("Gemini API error: %s", e)
             return f"AI Error: {str(e)}"
 
+    @metrics.timed("command.total")
     def process_command(self, cmd):
         """
         Processes a text command and returns the response string.
+        Changed memory/tasks are written back once, after the command.
+        Every upstream call shares one COMMAND_BUDGET (see maximus_deadline), and
+        everything logged meanwhile carries one command_id (see maximus_log).
         """
+        try:
+            with command_context(), budget(COMMAND_BUDGET):
+                if profiler.wanted():
+                    return profiler.run(cmd, self.handle_command, cmd)[0]
+                return self.handle_command(cmd)
+        finally:
+            self.flush()
+
+    def handle_command(self, cmd):
+        """Runs `cmd`; a compound command runs part by part and gets one merged answer."""
+        parts = self.compound.plan(cmd)
+        if len(parts) == 1:
+            return self.dispatch_command(cmd)
         self.append_conversation("user", cmd)
+        response = merge(execute(parts, lambda text: self.dispatch_command(text, part=True)))
+        response = response or self.get_gemini_response(cmd)
+        self.append_conversation("assistant", response)
+        return response
+
+    def route(self, cmd):
+        """Name of the intent that handles `cmd` (lowercased); "ai" if nothing else matches."""
+        if cmd in ("help", "commands"):
+            return "help"
+        if cmd in PROFILE_NEXT_COMMANDS:
+            return "profile"
+        if history_query(cmd) is not None:
+            return "history"
+        if "calculate" in cmd or "solve" in cmd:
+            return "math"
+        if "weather" in cmd:
+            return "weather"
+        if "wikipedia" in cmd or "search for" in cmd:
+            return "wikipedia"
+        if "youtube" in cmd:
+            return "youtube"
+        if "add todo" in cmd or "add task" in cmd:
+            return "add_task"
+        if "list tasks" in cmd or "show todo" in cmd:
+            return "list_tasks"
+        if "joke" in cmd:
+            return "joke"
+        if cmd.startswith(("what is ", "who is ", "tell me about ")) and not any(op in cmd for op in MATH_OPERATORS):
+            return "question"
+        return "ai"
+
+    def is_command_part(self, cmd):
+        """True if `cmd` can stand on its own as part of a compound command."""
+        return cmd.lower().strip().startswith(COMMAND_TRIGGERS)
+
+    def is_io_bound(self, cmd):
+        cmd = cmd.lower().strip()
+        intent = self.route(cmd)
+        if intent == "ai":
+            prediction = intent_classifier.classify(cmd)
+            intent = prediction.intent if prediction else "ai"
+        return intent in IO_BOUND_INTENTS
+
+    def is_slow(self, cmd):
+        """True if `cmd` (or any part of a compound command) needs a slow upstream (Wikipedia,
+        Gemini) and is worth running as a background job."""
+        return any(self._is_slow_part(part) for part in self.compound.split(cmd.lower().strip()))
+
+    def _is_slow_part(self, cmd):
+        intent = self.route(cmd)
+        if intent == "ai":
+            return bool(API_KEY) and intent_classifier.classify(cmd) is None
+        return intent in SLOW_INTENTS
+
+    def dispatch_command(self, cmd, part=False):
+        """Parses and executes a single command string. part=True is for one part of a compound
+        command, which is not recorded as a turn of its own (the whole utterance is)."""
+        metrics.incr("commands.total")
+        searchable = history_query(cmd.lower().strip()) is None
+        if not part:
+            self.append_conversation("user", cmd, searchable)
         original_cmd = cmd
         cmd = cmd.lower().strip()
         response = None
+        intent = self.route(cmd)
+        log.debug("Routed command", extra={"intent": intent})
 
         # --- Basic Commands ---
-        if cmd in ("help", "commands"):
-            response = "I can help with math, weather, wikipedia, tasks, and general questions."
+        if intent == "help":
+            response = HELP_TEXT
+
+        elif intent == "profile":
+            profiler.arm()
+            response = f"Okay, I'll profile the next command and save the results in {profiler.directory}."
+
+        # --- Conversation history ---
+        elif intent == "history":
+            response = self.search_history(history_query(cmd))
 
         # --- Math ---
-        elif "calculate" in cmd or "solve" in cmd:
+        elif intent == "math":
             response = self.handle_math(cmd)
 
         # --- Weather ---
-        elif "weather" in cmd:
+        elif intent == "weather":
             loc = cmd.replace("weather", "").replace("in", "").strip()
             response = self.get_weather(loc)
 
         # --- Wikipedia ---
-        elif "wikipedia" in cmd or "search for" in cmd:
+        elif intent == "wikipedia":
             topic = cmd.replace("wikipedia", "").replace("search for", "").strip()
             response = self.wiki_summary(topic)
 
         # --- YouTube ---
-        elif "youtube" in cmd:
+        elif intent == "youtube":
             query = cmd.replace("youtube", "").replace("play", "").strip()
-            # In a web context, we return the link or open it on server (if local)
-            # For web app, returning a link is better, but we'll stick to logic
-            url = f"https://www.youtube.com/results?search_query={urllib.parse.quote(query)}"
-            try:
-                webbrowser.open_new_tab(url)
-            except:
-                pass # Browser operations fail on server
-            response = f"Opened YouTube search for {query}."
+            response = self.open_youtube(query)
 
         # --- Tasks ---
-        elif "add todo" in cmd or "add task" in cmd:
+        elif intent == "add_task":
             task = cmd.replace("add todo", "").replace("add task", "").strip()
             response = self.add_task(task)
-        elif "list tasks" in cmd or "show todo" in cmd:
+        elif intent == "list_tasks":
             response = self.list_tasks()
         
         # --- Jokes ---
-        elif "joke" in cmd:
+        elif intent == "joke":
             response = self.get_joke()
 
+        # --- Questions (Wikipedia and Gemini raced in parallel) ---
+        elif intent == "question":
+            topic = cmd.split("tell me about", 1)[-1] if cmd.startswith("tell me about ") else cmd.split(" ", 2)[-1]
+            response = self.answer_question(topic.strip(), original_cmd) or "I couldn't find an answer to that in time."
+
+        # --- Local intent classifier (phrasings that miss every trigger above) ---
+        elif intent == "ai":
+            response = self.handle_predicted(cmd)
+
         # --- Fallback to AI ---
         if not response:
+            metrics.incr("commands.ai_fallback")
             response = self.get_gemini_response(original_cmd)
 
-        self.append_conversation("assistant", response)
+        if not part:
+            self.append_conversation("assistant", response, searchable)
         return response
 
     # --- Handlers ---
 
+    def handle_predicted(self, cmd):
+        """Answers `cmd` with a local handler when the intent classifier is confident, else None."""
+        prediction = intent_classifier.classify(cmd)
+        if prediction is None:
+            return None
+        slots = prediction.slots
+        if prediction.intent == "weather":
+            return self.get_weather(slots["location"])
+        if prediction.intent == "add_task":
+            return self.add_task(slots["task"])
+        if prediction.intent == "list_tasks":
+            return self.list_tasks()
+        if prediction.intent == "joke":
+            return self.get_joke()
+        if prediction.intent == "math":
+            return self.handle_math(slots["expression"])
+        if prediction.intent == "wikipedia":
+            return self.wiki_summary(slots["topic"])
+        if prediction.intent == "youtube":
+            return self.open_youtube(slots["query"])
+        if prediction.intent == "help":
+            return HELP_TEXT
+        return None
+
+    @metrics.timed("handler.math")
     def handle_math(self, cmd):
         if not sp: return "SymPy not installed."
         try:
@@ -190,35 +375,75 @@ class MaximusAssistant:
             res = sp.sympify(expr).evalf()
             return f"The result is {res}"
         except Exception as e:
+            log.warning("Math error: %s", e)
             return f"Math error: {e}"
 
+    @metrics.timed("handler.history")
+    def search_history(self, query, limit=3):
+        query, since = parse_time_phrase(query)
+        if not query:
+            return "What should I search your history for?"
+        return describe_results(query, self.history.search(query, limit=limit, since=since))
+
+    @metrics.timed("handler.weather")
     def get_weather(self, location):
         try:
+            location = " ".join(location.lower().split())
             url = f"https://wttr.in/{urllib.parse.quote(location)}?format=3" if location else "https://wttr.in/?format=3"
-            r = requests.get(url, timeout=5)
+            r = upstream.http_get(url, timeout=5, service="weather")
             return r.text.strip()
-        except:
+        except Exception as e:
+            log.warning("Weather error: %s", e)
             return "Could not retrieve weather."
 
+    @metrics.timed("handler.wikipedia")
     def wiki_summary(self, topic):
-        if not wikipedia: return "Wikipedia module missing."
+        if not upstream.wiki_available(): return "Wikipedia module missing."
         try:
-            return wikipedia.summary(topic, sentences=2)
-        except:
+            return upstream.wiki_summary(topic, sentences=2)
+        except Exception as e:
+            log.warning("Wikipedia error: %s", e)
             return "Wikipedia search failed."
 
+    @metrics.timed("handler.question")
+    def answer_question(self, topic, prompt):
+        """Starts the Wikipedia summary and Gemini together; Wikipedia wins if it answers in time."""
+        candidates = []
+        if upstream.wiki_available() and topic:
+            candidates.append(Candidate("wikipedia", lambda cancel: upstream.wiki_summary(topic, sentences=2),
+                                        QUESTION_DEADLINES["wikipedia"]))
+        if API_KEY:
+            full_prompt = self.build_prompt(prompt)
+
+            def ask_gemini(cancel):
+                with gemini_admission.slot(max_wait=QUESTION_DEADLINES["gemini"]):
+                    return None if cancel.is_set() else upstream.gemini_generate(full_prompt).strip()
+            candidates.append(Candidate("gemini", ask_gemini, QUESTION_DEADLINES["gemini"]))
+        source, answer = resolve(candidates)
+        return answer
+
+    def open_youtube(self, query):
+        # In a web context, we return the link or open it on server (if local)
+        # For web app, returning a link is better, but we'll stick to logic
+        url = f"https://www.youtube.com/results?search_query={urllib.parse.quote(query)}"
+        try:
+            webbrowser.open_new_tab(url)
+        except:
+            pass # Browser operations fail on server
+        return f"Opened YouTube search for {query}."
+
+    @metrics.timed("handler.tasks.add")
     def add_task(self, text):
-        tasks = safe_load_json(TASKS_FILE, [])
-        tasks.append({"id": int(time.time()), "text": text, "done": False})
-        safe_save_json(TASKS_FILE, tasks)
+        self.tasks.add(text)
         return f"Added task: {text}"
 
+    @metrics.timed("handler.tasks.list")
     def list_tasks(self):
-        tasks = safe_load_json(TASKS_FILE, [])
-        undone = [t for t in tasks if not t['done']]
+        undone = self.tasks.pending()
         if not undone: return "No pending tasks."
         return ". ".join([f"{t['text']}" for t in undone])
 
+    @metrics.timed("handler.joke")
     def get_joke(self):
         if pyjokes: return pyjokes.get_joke()
         return "No jokes available."
\ No newline at end of file
@@ -0,0 +1,232 @@
+# maximus_metrics.py - Lightweight per-stage latency instrumentation
+"""
+Timers, counters and latency histograms shared by the desktop assistant
+(maximus.py) and the web assistant (maximus_logic.py).
+
+Usage:
+    from maximus_metrics import metrics
+
+    with metrics.timer("handler.weather"):
+        ...
+
+    @metrics.timed("tts.speak")
+    def speak(text): ...
+
+    metrics.incr("commands.total")
+
+Set MAXIMUS_METRICS=0 to disable collection. When disabled, timer() hands back
+a shared no-op context manager and incr()/observe() return immediately, so the
+instrumented code pays one attribute check per call.
+"""
+
+import os
+import time
+import threading
+import functools
+
+# Number of most recent samples kept per histogram for percentile estimates
+RESERVOIR_SIZE = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _NullTimer:
+    """Context manager used when metrics are disabled."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("registry", "name", "start")
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+        if exc_type is not None:
+            self.registry.incr(self.name + ".errors")
+        return False
+
+
+class Histogram:
+    """Latency histogram: total count/sum plus a ring buffer of recent samples."""
+
+    def __init__(self, size=RESERVOIR_SIZE):
+        self.size = size
+        self.samples = []
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+        else:
+            self.samples[self.pos] = value
+            self.pos = (self.pos + 1) % self.size
+
+    def percentile(self, q):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def snapshot(self):
+        ordered = sorted(self.samples)
+        n = len(ordered)
+        quantiles = {}
+        for q in QUANTILES:
+            quantiles[q] = ordered[min(n - 1, int(round(q * (n - 1))))] if n else 0.0
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            "quantiles": quantiles,
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+
+    # --- Recording ---
+    def timer(self, name):
+        """Context manager that records the elapsed time of its block under `name`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name):
+        """Decorator form of timer()."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(self, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = Histogram()
+            hist.add(seconds)
+
+    def incr(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = value
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    # --- Reading ---
+    def snapshot(self):
+        with self._lock:
+            return {
+                "histograms": {k: h.snapshot() for k, h in self._histograms.items()},
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+            }
+
+    def percentile(self, name, q):
+        """Returns the q-quantile (0..1) of a histogram in seconds, or None if it has no samples."""
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None or not hist.samples:
+                return None
+            return hist.percentile(q)
+
+    def render_prometheus(self, prefix="maximus"):
+        """Formats all metrics in the Prometheus text exposition format (version 0.0.4)."""
+        snap = self.snapshot()
+        lines = []
+
+        if snap["histograms"]:
+            name = f"{prefix}_stage_latency_seconds"
+            lines.append(f"# HELP {name} Latency of instrumented pipeline stages.")
+            lines.append(f"# TYPE {name} summary")
+            for stage in sorted(snap["histograms"]):
+                h = snap["histograms"][stage]
+                label = _escape_label(stage)
+                for q, v in h["quantiles"].items():
+                    lines.append(f'{name}{{stage="{label}",quantile="{q}"}} {v:.6f}')
+                lines.append(f'{name}_sum{{stage="{label}"}} {h["sum"]:.6f}')
+                lines.append(f'{name}_count{{stage="{label}"}} {h["count"]}')
+
+        if snap["counters"]:
+            name = f"{prefix}_events_total"
+            lines.append(f"# HELP {name} Counted pipeline events.")
+            lines.append(f"# TYPE {name} counter")
+            for event in sorted(snap["counters"]):
+                lines.append(f'{name}{{event="{_escape_label(event)}"}} {snap["counters"][event]}')
+
+        if snap["gauges"]:
+            name = f"{prefix}_state"
+            lines.append(f"# HELP {name} Current value of instrumented state.")
+            lines.append(f"# TYPE {name} gauge")
+            for key in sorted(snap["gauges"]):
+                lines.append(f'{name}{{key="{_escape_label(key)}"}} {snap["gauges"][key]}')
+
+        return "\n".join(lines) + "\n"
+
+    def summary_text(self, limit=8):
+        """Short human-readable summary (slowest stages by p95) for the 'show stats' command."""
+        snap = self.snapshot()
+        if not self.enabled:
+            return "Metrics are disabled. Set MAXIMUS_METRICS=1 to enable them."
+        if not snap["histograms"]:
+            return "No timing data has been collected yet."
+        stages = sorted(snap["histograms"].items(), key=lambda kv: kv[1]["quantiles"][0.95], reverse=True)
+        out = [f"Timing for {len(stages)} stages, slowest first"]
+        for stage, h in stages[:limit]:
+            q = h["quantiles"]
+            out.append(
+                f"{stage}: {h['count']} calls, p50 {q[0.5] * 1000:.0f} ms, "
+                f"p95 {q[0.95] * 1000:.0f} ms, p99 {q[0.99] * 1000:.0f} ms"
+            )
+        return ". ".join(out)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = MetricsRegistry(enabled=os.getenv("MAXIMUS_METRICS", "1") != "0")
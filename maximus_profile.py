@@ -0,0 +1,137 @@
+# maximus_profile.py - On-demand per-command profiling
+"""
+Profiles the handling of individual commands and writes two files per command
+to the profile directory (MAXIMUS_PROFILE_DIR, default ./profiles):
+
+    20261018-142501-123456-who-made-python.pstats     deterministic (cProfile)
+    20261018-142501-123456-who-made-python.collapsed  sampled stacks, one
+                                                      "a;b;c <count>" per line
+
+Inspect the .pstats with `python -m pstats <file>` or snakeviz, and feed the
+.collapsed file to flamegraph.pl or speedscope for a flame graph. Both only
+cover the thread that handles the command; work handed to thread pools shows
+up as the time spent waiting for it.
+
+Profiling is triggered by:
+    python maximus.py --profile [DIR]        every command (desktop)
+    MAXIMUS_PROFILE=1                        every command (desktop and web)
+    "profile next command"                   the next command only (desktop and web)
+    POST /chat/?profile=1 or the header X-Maximus-Profile: 1
+                                             that request (web; only when
+                                             DEBUG is on or MAXIMUS_PROFILE_ALLOWED=1)
+
+When none of these is active the only cost is one attribute check per command.
+"""
+
+import os
+import re
+import sys
+import time
+import cProfile
+import datetime
+import threading
+from collections import Counter
+
+from maximus_log import get_logger
+
+log = get_logger("profile")
+
+SAMPLE_INTERVAL = 0.001  # seconds between stack samples
+
+
+class _StackSampler(threading.Thread):
+    """Samples the stack of one thread at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True, name="maximus-profile-sampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class Profiler:
+    def __init__(self, directory="profiles", always=False):
+        self.directory = directory
+        self.always = always
+        self._armed = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self, directory=None):
+        """Profile every command from now on."""
+        if directory:
+            self.directory = directory
+        self.always = True
+
+    def arm(self):
+        """Profile the next command only."""
+        self._armed = True
+
+    def wanted(self):
+        """True if the current command should be profiled (consumes a pending arm())."""
+        if self.always:
+            return True
+        if not self._armed:
+            return False
+        with self._lock:
+            armed, self._armed = self._armed, False
+        return armed
+
+    def run(self, label, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) under the profilers. Returns (result, path prefix of the files).
+        Nested calls (already profiling on this thread) just run fn and return a None prefix."""
+        if getattr(self._local, "active", False):
+            return fn(*args, **kwargs), None
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        slug = re.sub(r"[^a-z0-9]+", "-", str(label).lower()).strip("-")[:40] or "command"
+        prefix = os.path.join(self.directory, f"{stamp}-{slug}")
+
+        sampler = _StackSampler(threading.get_ident())
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Python 3.12+ refuses a second profiler on a thread (a debugger or coverage tool)
+            log.warning("Not profiling '%s': %s", label, e)
+            return fn(*args, **kwargs), None
+        start = time.perf_counter()
+        try:
+            self._local.active = True
+            sampler.start()
+            return fn(*args, **kwargs), prefix
+        finally:
+            profile.disable()
+            if sampler.ident is not None:
+                sampler.stop()
+            self._local.active = False
+            elapsed = time.perf_counter() - start
+            try:
+                profile.dump_stats(prefix + ".pstats")
+                with open(prefix + ".collapsed", "w", encoding="utf-8") as f:
+                    for stack, count in sampler.counts.most_common():
+                        f.write(f"{stack} {count}\n")
+                log.info("Profiled '%s' (%.0f ms): %s.pstats / .collapsed", label, elapsed * 1000, prefix)
+            except OSError as e:
+                log.error("Failed to write profile: %s", e)
+
+
+profiler = Profiler(directory=os.getenv("MAXIMUS_PROFILE_DIR", "profiles"), always=os.getenv("MAXIMUS_PROFILE") == "1")
+
+PROFILE_NEXT_COMMANDS = ("profile next command", "profile the next command")
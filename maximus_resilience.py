@@ -0,0 +1,217 @@
+# maximus_resilience.py - Circuit breakers and hedged requests for upstream services
+"""
+CircuitBreaker
+    Tracks the outcome of the last `window` calls to a service. Once at least
+    `min_calls` have been seen and the error rate reaches `error_rate`, the
+    breaker opens and calls fail immediately with CircuitOpenError instead of
+    waiting out a timeout. After `open_seconds` it goes half-open and lets
+    `half_open_trials` probe calls through; if they succeed it closes again,
+    otherwise it re-opens. Only errors that `is_error(exc)` blames on the
+    service count as failures; any other exception (an unknown Wikipedia page,
+    a blocked prompt) means the service answered, and counts as a success.
+
+hedged(service, fn)
+    Runs fn() and, if it has not finished after the service's observed p95
+    latency, starts one duplicate. Whichever finishes first successfully wins.
+    Only use this for idempotent calls.
+
+Breaker state is published as the gauge breaker.<service>.state
+(0 = closed, 1 = half-open, 2 = open); hedges as hedge.<service>.sent/.won.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from maximus_metrics import metrics
+from maximus_deadline import DeadlineExceeded, submit
+from maximus_log import get_logger
+
+log = get_logger("resilience")
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+HEDGING_ENABLED = os.getenv("MAXIMUS_HEDGING", "1") != "0"
+HEDGE_MIN_DELAY = 0.05      # never hedge sooner than this (seconds)
+HEDGE_DEFAULT_DELAY = 1.0   # used until the service has latency samples
+HEDGE_MAX_DELAY = 5.0
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a service whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, name, error_rate=0.5, min_calls=5, window=20, open_seconds=30.0, half_open_trials=1):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_trials = half_open_trials
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+        metrics.set_gauge(f"breaker.{name}.state", 0)
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _set_state(self, state):
+        if state != self._state:
+            log.warning("Circuit breaker '%s': %s -> %s", self.name, self._state, state)
+            self._state = state
+            metrics.set_gauge(f"breaker.{self.name}.state", _STATE_GAUGE[state])
+            metrics.incr(f"breaker.{self.name}.{state}")
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._set_state(HALF_OPEN)
+            self._trials = 0
+
+    def _admit(self):
+        """CLOSED or HALF_OPEN (a probe call) if a call may go ahead now, else None."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return CLOSED
+            if self._state == HALF_OPEN and self._trials < self.half_open_trials:
+                self._trials += 1
+                return HALF_OPEN
+            return None
+
+    def allow(self):
+        """Returns True if a call may go ahead now."""
+        return self._admit() is not None
+
+    def release_trial(self):
+        """Gives back a half-open probe that ended without telling us anything about the service."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._outcomes.clear()
+                self._set_state(CLOSED)
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trip()
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.error_rate:
+                self._trip()
+
+    def _trip(self):
+        self._opened_at = time.monotonic()
+        self._set_state(OPEN)
+
+    def call(self, fn, is_failure=None, is_error=None):
+        """Runs fn() under the breaker. `is_failure(result)` can flag bad results (e.g. HTTP 503);
+        `is_error(exc)` says whether an exception is the service's fault (default: every one is)."""
+        admitted = self._admit()
+        if admitted is None:
+            metrics.incr(f"breaker.{self.name}.rejected")
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open); failing fast.")
+        try:
+            result = fn()
+        except DeadlineExceeded:
+            # The caller ran out of time; says nothing about the service. A probe is
+            # handed back so the next call can try again instead of being rejected for good.
+            if admitted == HALF_OPEN:
+                self.release_trial()
+            raise
+        except Exception as e:
+            if is_error is None or is_error(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        if is_failure is not None and is_failure(result):
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(service):
+    """The shared circuit breaker for `service`."""
+    with _breakers_lock:
+        b = _breakers.get(service)
+        if b is None:
+            b = _breakers[service] = CircuitBreaker(service)
+        return b
+
+
+def breaker_states():
+    with _breakers_lock:
+        items = list(_breakers.items())
+    return {name: b.state for name, b in items}
+
+
+# ---------------- Hedging ----------------
+_hedge_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="maximus-hedge")
+
+
+def hedge_delay(service):
+    """How long to wait before sending a duplicate: the service's recent p95 latency."""
+    p95 = metrics.percentile(f"upstream.{service}", 0.95)
+    if p95 is None:
+        return HEDGE_DEFAULT_DELAY
+    return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, p95))
+
+
+def hedged(service, fn, delay=None):
+    """Runs fn(), sending one duplicate if the first attempt is slower than `delay`
+    (default: hedge_delay(service)). Returns the first successful result; if every
+    attempt fails, raises the last error."""
+    if not HEDGING_ENABLED:
+        return fn()
+    if delay is None:
+        delay = hedge_delay(service)
+
+    primary = submit(_hedge_pool, fn)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    metrics.incr(f"hedge.{service}.sent")
+    backup = submit(_hedge_pool, fn)
+    pending = {primary, backup}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            if fut.exception() is None:
+                if fut is backup:
+                    metrics.incr(f"hedge.{service}.won")
+                return fut.result()
+            error = fut.exception()
+    raise error
+
+
+# ---------------- Fork safety ----------------
+def _after_fork():
+    """Pool threads do not survive fork(); a forked worker gets a fresh pool and lock."""
+    global _hedge_pool, _breakers_lock
+    _hedge_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="maximus-hedge")
+    _breakers_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
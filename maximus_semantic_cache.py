@@ -0,0 +1,236 @@
+# maximus_semantic_cache.py - Near-duplicate cache for Gemini fallback answers
+"""
+Many fallback prompts are paraphrases of each other ("who made python",
+"who created python?"), which an exact-match cache never catches. This cache
+compares prompts by meaning-ish similarity, entirely locally:
+
+    1. canonicalize: lowercase, drop filler words, map common synonyms
+       ("made", "invented", "developed" -> "create")
+    2. embed: hashed character 2-4-grams plus whole words, signed, into a
+       fixed-size float32 vector, L2-normalised
+    3. look up: one matrix-vector product against every cached vector gives
+       all cosine similarities at once; the best one above `threshold` is a hit
+
+Similarity alone cannot tell "convert 5 miles to km" from "convert 6 miles to
+km", "ww1" from "ww2", "should i buy" from "should i not buy" or "population of
+india" from "population of indiana", so an entry is only a candidate if its
+numbers and negation words, in order, and its canonical content words (other
+than question words) are exactly the prompt's (guard_key). Similarity then
+decides among paraphrases that differ in filler, synonyms and word order.
+
+    answer = gemini_cache.lookup(prompt)
+    if answer is None:
+        answer = ask_gemini(prompt)
+        gemini_cache.store(prompt, answer)
+
+Entries are evicted least-recently-used once `capacity` is reached and expire
+after `ttl` seconds. Prompts that lean on the conversation ("tell me more about
+it") are never cached, since the same words mean different things in different
+conversations.
+
+Hits, misses and lookup time are reported in maximus_metrics as
+semantic_cache.<name>.hit/.miss, the semantic_cache.<name>.hit_rate gauge and
+the semantic_cache.<name>.lookup timer; benchmarks/bench_semantic_cache.py
+measures both on a paraphrase set.
+
+Needs numpy; without it the cache is disabled and every lookup misses.
+Tuning: MAXIMUS_SEMANTIC_CACHE=0 (off), MAXIMUS_SEMANTIC_THRESHOLD (default
+0.88), MAXIMUS_SEMANTIC_CACHE_SIZE (default 2048), MAXIMUS_SEMANTIC_CACHE_TTL
+(seconds, default 3600).
+"""
+
+import os
+import re
+import time
+import zlib
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from maximus_metrics import metrics
+
+DIMENSIONS = 512
+NGRAM_SIZES = (2, 3, 4)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an the is are was were be been am of to in on at for and or me my you your i "
+    "please can could would will do does did tell give show let us some any just".split()
+)
+
+SYNONYMS = {
+    "made": "create", "make": "create", "makes": "create", "created": "create", "creates": "create",
+    "invented": "create", "invent": "create", "developed": "create", "develop": "create",
+    "designed": "create", "wrote": "create", "written": "create", "built": "create", "founded": "create",
+    "explain": "describe", "describes": "describe", "define": "describe", "meaning": "describe",
+    "whats": "what", "whos": "who", "hows": "how",
+    "big": "large", "huge": "large", "small": "little", "tiny": "little",
+    "usa": "america", "uk": "britain",
+}
+
+# Words that flip a prompt's meaning; prompts only match if they have the same ones
+NEGATIONS = frozenset(
+    "not no never nor none nothing nobody without dont doesnt didnt isnt arent wasnt werent "
+    "cant cannot couldnt wont wouldnt shouldnt havent hasnt hadnt".split()
+)
+
+# Left out of the content words guard_key compares ("capital of france?" = "what is the capital of france")
+QUESTION_WORDS = frozenset("what who whom whose which where when why how".split())
+
+# Words that refer back to the conversation; prompts containing them are not cached
+CONTEXT_WORDS = frozenset("it its that this these those he she him her his they them their more again else previous last above".split())
+
+
+def canonicalize(text):
+    words = _WORD_RE.findall(str(text).lower().replace("'", ""))
+    words = [SYNONYMS.get(w, w) for w in words]
+    content = [w for w in words if w not in STOPWORDS]
+    return content or words
+
+
+def guard_key(text):
+    """crc32 of the number-bearing words and negations of `text`, in order, and of its
+    canonical content words; prompts with different keys never match however similar they are."""
+    words = _WORD_RE.findall(str(text).lower().replace("'", ""))
+    guarded = [w for w in words if w in NEGATIONS or any(c.isdigit() for c in w)]
+    content = sorted(set(canonicalize(text)) - QUESTION_WORDS)
+    return zlib.crc32((" ".join(guarded) + "|" + " ".join(content)).encode("utf-8"))
+
+
+def is_cacheable(text):
+    words = _WORD_RE.findall(str(text).lower())
+    return bool(words) and not any(w in CONTEXT_WORDS for w in words)
+
+
+def _hash_into(vector, feature):
+    h = zlib.crc32(feature.encode("utf-8"))
+    vector[h % DIMENSIONS] += -1.0 if h & 0x80000000 else 1.0
+
+
+def embed(text):
+    """Signed hashed word + character n-gram vector of `text`, L2-normalised (float32)."""
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for word in canonicalize(text):
+        _hash_into(vector, "w:" + word)
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                _hash_into(vector, padded[i:i + n])
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    def __init__(self, name, capacity=2048, threshold=0.88, ttl=3600.0, enabled=True):
+        self.name = name
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self.enabled = enabled and np is not None and capacity > 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.lookup_seconds = 0.0
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+            self._clock = 0
+            if self.enabled:
+                self._vectors = np.zeros((self.capacity, DIMENSIONS), dtype=np.float32)
+                self._last_used = np.zeros(self.capacity, dtype=np.int64)
+                self._stored_at = np.zeros(self.capacity, dtype=np.float64)
+                self._keys = np.zeros(self.capacity, dtype=np.int64)
+            self._prompts = [None] * self.capacity
+            self._answers = [None] * self.capacity
+
+    def __len__(self):
+        return self._size
+
+    def _best_match(self, vector, key):
+        """(slot, similarity) of the closest live entry with guard key `key`, or (None, 0.0)."""
+        if self._size == 0:
+            return None, 0.0
+        similarities = self._vectors[:self._size] @ vector
+        similarities[self._keys[:self._size] != key] = -1.0
+        if self.ttl:
+            similarities[self._stored_at[:self._size] < time.time() - self.ttl] = -1.0
+        slot = int(np.argmax(similarities))
+        return slot, float(similarities[slot])
+
+    def lookup(self, prompt):
+        """Cached answer for a prompt similar enough to `prompt`, or None."""
+        if not self.enabled or not is_cacheable(prompt):
+            return None
+        start = time.perf_counter()
+        with metrics.timer(f"semantic_cache.{self.name}.lookup"):
+            vector = embed(prompt)
+            key = guard_key(prompt)
+            with self._lock:
+                slot, similarity = self._best_match(vector, key)
+                hit = slot is not None and similarity >= self.threshold
+                if hit:
+                    self._clock += 1
+                    self._last_used[slot] = self._clock
+                    answer = self._answers[slot]
+                    self.hits += 1
+                else:
+                    answer = None
+                    self.misses += 1
+                self.lookup_seconds += time.perf_counter() - start
+                hit_rate = self.hits / (self.hits + self.misses)
+        metrics.incr(f"semantic_cache.{self.name}.{'hit' if hit else 'miss'}")
+        metrics.set_gauge(f"semantic_cache.{self.name}.hit_rate", hit_rate)
+        return answer
+
+    def store(self, prompt, answer):
+        if not self.enabled or not answer or not is_cacheable(prompt):
+            return
+        vector = embed(prompt)
+        key = guard_key(prompt)
+        with self._lock:
+            slot, similarity = self._best_match(vector, key)
+            if slot is None or similarity < 0.999:
+                if self._size < self.capacity:
+                    slot = self._size
+                    self._size += 1
+                else:
+                    # Evict the least recently used entry
+                    slot = int(np.argmin(self._last_used[:self._size]))
+                    metrics.incr(f"semantic_cache.{self.name}.evicted")
+            self._clock += 1
+            self._vectors[slot] = vector
+            self._last_used[slot] = self._clock
+            self._stored_at[slot] = time.time()
+            self._keys[slot] = key
+            self._prompts[slot] = prompt
+            self._answers[slot] = answer
+            metrics.set_gauge(f"semantic_cache.{self.name}.size", self._size)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": self._size,
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "avg_lookup_ms": self.lookup_seconds / lookups * 1000 if lookups else 0.0,
+            }
+
+
+gemini_cache = SemanticCache(
+    "gemini",
+    capacity=int(os.getenv("MAXIMUS_SEMANTIC_CACHE_SIZE", "2048")),
+    threshold=float(os.getenv("MAXIMUS_SEMANTIC_THRESHOLD", "0.88")),
+    ttl=float(os.getenv("MAXIMUS_SEMANTIC_CACHE_TTL", "3600")),
+    enabled=os.getenv("MAXIMUS_SEMANTIC_CACHE", "1") != "0",
+)
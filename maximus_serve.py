@@ -0,0 +1,170 @@
+# maximus_serve.py - Preforking production server for maximus_web
+"""
+Loads the Django app and warms it up once, in the parent process, and only
+then forks the worker processes:
+
+    python maximus_serve.py --bind 0.0.0.0:8000 --workers 4
+
+Forked workers share the parent's memory pages copy-on-write, so the
+imports (Django, sympy, google.generativeai, numpy), compiled URL patterns,
+templates and the history index are built once and not once per worker. A
+fresh worker can take traffic the moment it is forked. Before forking, the
+parent waits for its helper threads and calls gc.freeze(), so the garbage
+collector does not touch (and copy) the shared objects later.
+
+State that must not cross a fork is rebuilt in each child by
+os.register_at_fork hooks in the modules that own it: thread pools
+(maximus_resilience, maximus_speculative), HTTP clients and the Gemini client
+(maximus_upstream), SQLite connections and job threads (maximus_jobs). The
+same hooks make `MAXIMUS_WARMUP=sync gunicorn --preload maximus_web.wsgi` safe.
+
+Each worker serves requests with a thread per connection on the shared
+listening socket. The parent restarts workers that die, and on SIGTERM or
+Ctrl+C it stops them all. --no-preload forks first and lets every worker
+import the app itself, as a stock server does; benchmarks/bench_startup.py
+compares the two. GET /ready/ reports each worker's warm-up status.
+"""
+
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+import threading
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler
+
+RESPAWN_BACKOFF = 1.0  # seconds to wait before replacing a worker that died right after starting
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _RequestHandler(WSGIRequestHandler):
+    access_log = False
+
+    def log_message(self, format, *args):
+        if self.access_log:
+            super().log_message(format, *args)
+
+
+def load_app():
+    """Imports the WSGI app. MAXIMUS_WARMUP decides whether it is warmed up here."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "maximus_web.settings")
+    from maximus_web.wsgi import application
+    return application
+
+
+def _quiesce(timeout=5.0):
+    """Waits for helper threads (e.g. the history indexer) so no lock is held at fork time.
+    The log writer never exits; maximus_log stops and restarts it around fork() itself."""
+    from maximus_log import WRITER_THREAD
+    deadline = time.monotonic() + timeout
+    helpers = [t for t in threading.enumerate() if t is not threading.main_thread() and t.name != WRITER_THREAD]
+    for t in helpers:
+        t.join(max(0.0, deadline - time.monotonic()))
+    busy = [t.name for t in helpers if t.is_alive()]
+    if busy:
+        print(f"Warning: threads still running at fork, workers may inherit held locks: {', '.join(busy)}")
+
+
+def _serve_worker(number, sock, app):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles Ctrl+C and stops us
+    from maximus_metrics import metrics
+    metrics.reset()  # counters from the parent's warm-up belong to the parent
+    if app is None:
+        app = load_app()
+    host, port = sock.getsockname()[:2]
+    server = _ThreadingWSGIServer((host, port), _RequestHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    server.server_name, server.server_port = socket.getfqdn(host), port
+    server.setup_environ()
+    server.set_app(app)
+    print(f"Worker {number} (pid {os.getpid()}) serving on http://{host}:{port}/", flush=True)
+    server.serve_forever()
+
+
+def serve(host, port, workers, preload=True, access_log=False):
+    if not hasattr(os, "fork"):
+        print("maximus_serve.py needs fork() (Linux/macOS). On Windows use `python manage.py runserver` or waitress.")
+        return 1
+    _RequestHandler.access_log = access_log
+    sock = socket.create_server((host, port), backlog=128)
+    sock.setblocking(False)  # workers race for connections; losers just go back to select()
+
+    app = None
+    if preload:
+        os.environ["MAXIMUS_WARMUP"] = "sync"
+        t0 = time.perf_counter()
+        app = load_app()
+        _quiesce()
+        gc.collect()
+        gc.freeze()
+        print(f"App loaded and warmed in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    children = {}
+    stopping = False
+
+    def spawn(number):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _serve_worker(number, sock, app)
+            except BaseException as e:
+                print(f"Worker {number} crashed:", e, flush=True)
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = (number, time.monotonic())
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for number in range(workers):
+        spawn(number)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        number, started = children.pop(pid, (None, None))
+        if number is None or stopping:
+            continue
+        print(f"Worker {number} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+        if time.monotonic() - started < RESPAWN_BACKOFF:
+            time.sleep(RESPAWN_BACKOFF)
+        spawn(number)
+    sock.close()
+    print("Server stopped.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Preforking production server for the Maximus web app.")
+    parser.add_argument("--bind", default=os.getenv("MAXIMUS_BIND", "127.0.0.1:8000"), help="host:port to listen on.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("MAXIMUS_WORKERS", os.cpu_count() or 2)))
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="Fork first and load the app in every worker (no copy-on-write sharing).")
+    parser.add_argument("--access-log", action="store_true", help="Log every request to stderr.")
+    args = parser.parse_args(argv)
+    host, _, port = args.bind.rpartition(":")
+    return serve(host or "127.0.0.1", int(port), max(1, args.workers), preload=args.preload, access_log=args.access_log)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
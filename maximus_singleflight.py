@@ -0,0 +1,84 @@
+# maximus_singleflight.py - Coalesces identical concurrent upstream requests
+"""
+When several callers ask for the same thing at the same time (e.g. many web
+users asking for "weather in mumbai"), only the first caller - the leader -
+performs the upstream request. Everyone else who arrives while it is in
+flight waits for it and receives the same result, or the same exception.
+
+    weather_flight = SingleFlight("weather")
+    text = weather_flight.do(normalized_key, lambda: fetch(url))
+
+Nothing is cached: once the leader finishes, the next caller with the same key
+starts a fresh request. Deduplicated calls are counted in maximus_metrics as
+singleflight.<name>.deduplicated.
+"""
+
+import threading
+
+from maximus_metrics import metrics
+from maximus_deadline import DeadlineExceeded, timeout
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.deduplicated = 0
+
+    def do(self, key, fn):
+        """Runs fn() once per key among concurrent callers and returns its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.deduplicated += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            metrics.incr(f"singleflight.{self.name}.deduplicated")
+            # A follower waits no longer than its own command budget allows
+            if not call.event.wait(timeout(None, self.name)):
+                raise DeadlineExceeded(f"{self.name} request did not finish in time")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        with self._lock:
+            return {"leaders": self.leaders, "deduplicated": self.deduplicated, "in_flight": len(self._calls)}
+
+
+def normalize(text):
+    """Case- and whitespace-insensitive form of a free-text request parameter."""
+    return " ".join(str(text).lower().split())
@@ -0,0 +1,91 @@
+# maximus_speculative.py - Speculative parallel resolution of open questions
+"""
+"what is X" / "who is X" / "tell me about X" can be answered by several
+sources of decreasing preference: a remembered fact, a Wikipedia summary, or
+Gemini. Instead of trying them one after another, resolve() starts all of
+them at once and returns the most preferred source that answers within its
+deadline.
+
+    name, answer = resolve([
+        Candidate("memory", lambda cancel: recall_fact(key), deadline=0.05),
+        Candidate("wikipedia", lambda cancel: upstream.wiki_summary(topic), deadline=2.5),
+        Candidate("gemini", lambda cancel: upstream.gemini_generate(prompt), deadline=8.0),
+    ])
+
+Candidates are listed in priority order. A lower-priority answer is only used
+once every higher-priority candidate has failed, returned nothing, or missed
+its deadline. Deadlines are measured from the start of resolve() and never
+extend past the command's budget (maximus_deadline).
+
+Losing candidates are cancelled: those still queued never start, and running
+ones see their `cancel` event set so they can skip the upstream call. A call
+that is already on the wire finishes in the background and its result is
+discarded.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from maximus_metrics import metrics
+import maximus_deadline as deadline
+from maximus_log import get_logger
+
+log = get_logger("speculative")
+
+_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="maximus-speculative")
+
+
+class Candidate:
+    def __init__(self, name, fn, deadline, accept=None):
+        """fn(cancel_event) -> answer or None; accept(answer) -> bool decides if it counts."""
+        self.name = name
+        self.fn = fn
+        self.deadline = deadline
+        self.accept = accept or bool
+
+
+def _run(candidate, cancel):
+    if cancel.is_set():
+        return None
+    with metrics.timer(f"speculative.{candidate.name}"):
+        return candidate.fn(cancel)
+
+
+def resolve(candidates):
+    """Returns (name, answer) of the winning candidate, or (None, None) if none answered."""
+    cancel = threading.Event()
+    start = time.monotonic()
+    futures = [deadline.submit(_pool, _run, c, cancel) for c in candidates]
+    try:
+        for candidate, future in zip(candidates, futures):
+            remaining = candidate.deadline - (time.monotonic() - start)
+            budget_left = deadline.remaining()
+            if budget_left is not None:
+                remaining = min(remaining, budget_left)
+            try:
+                answer = future.result(timeout=max(0.0, remaining))
+            except FutureTimeout:
+                metrics.incr(f"speculative.{candidate.name}.timeout")
+                continue
+            except Exception as e:
+                log.debug("Speculative %s failed: %s", candidate.name, e)
+                continue
+            if answer is not None and candidate.accept(answer):
+                metrics.incr(f"speculative.{candidate.name}.won")
+                return candidate.name, answer
+        return None, None
+    finally:
+        cancel.set()
+        for future in futures:
+            future.cancel()
+
+
+def _after_fork():
+    """Pool threads do not survive fork(); a forked worker gets a fresh pool."""
+    global _pool
+    _pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="maximus-speculative")
+
+
+os.register_at_fork(after_in_child=_after_fork)
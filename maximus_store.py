@@ -0,0 +1,102 @@
+# maximus_store.py - Cached JSON files with mtime-based invalidation
+"""
+JsonStore keeps the parsed contents of a JSON file (memory.json, tasks.json,
+contacts.json) in RAM so a command does not re-read and re-parse the same file
+several times.
+
+    store = JsonStore("memory.json", lambda: {"facts": {}, "conversations": []})
+    mem = store.get()          # parsed once, then served from RAM
+    mem["facts"]["k"] = "v"
+    store.mark_dirty()
+    store.flush()              # one write, only if something changed
+
+get() stats the file and reloads it only when its mtime or size differs from
+what was last read or written, i.e. when another process (a second web
+worker, the desktop app) changed it. Changes are written back by flush(),
+atomically via a temporary file. If the file changed on disk while there were
+unflushed local changes, the local changes win.
+"""
+
+import os
+import json
+import threading
+
+from maximus_metrics import metrics
+from maximus_log import get_logger
+
+log = get_logger("store")
+
+
+class JsonStore:
+    def __init__(self, path, default_factory):
+        self.path = path
+        self.default_factory = default_factory
+        self._lock = threading.RLock()
+        self._data = None
+        self._signature = None
+        self._dirty = False
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _load(self, signature):
+        if signature is None:
+            return self.default_factory()
+        try:
+            with metrics.timer("storage.load"):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            log.warning("Failed to load %s: %s", self.path, e)
+            return self.default_factory()
+
+    def get(self):
+        """Returns the live parsed object. Mutate it in place and call mark_dirty()."""
+        with self._lock:
+            if self._dirty and self._data is not None:
+                return self._data
+            signature = self._stat()
+            if self._data is None or signature != self._signature:
+                self._data = self._load(signature)
+                self._signature = signature
+                metrics.incr("storage.reload")
+            return self._data
+
+    def set(self, data):
+        with self._lock:
+            self._data = data
+            self._dirty = True
+
+    def mark_dirty(self):
+        with self._lock:
+            self._dirty = True
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+    def file_signature(self):
+        """(mtime_ns, size) of the file on disk, or None if it does not exist."""
+        return self._stat()
+
+    def flush(self):
+        """Writes the cached data back if it changed. Returns True if a write happened."""
+        with self._lock:
+            if not self._dirty:
+                return False
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with metrics.timer("storage.save"):
+                    with open(tmp, 'w', encoding='utf-8') as f:
+                        json.dump(self._data, f, indent=2, ensure_ascii=False)
+                    os.replace(tmp, self.path)
+            except Exception as e:
+                log.error("Failed to save %s: %s", self.path, e)
+                return False
+            self._dirty = False
+            self._signature = self._stat()
+            return True
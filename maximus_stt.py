@@ -0,0 +1,188 @@
+# maximus_stt.py - Pluggable speech-to-text backends, selectable per stage
+"""
+The assistant turns audio into text in two places ("stages"):
+
+    wake      the standby loop listening for the wake word
+    command   listen_once(), capturing the actual command
+
+Each stage has its own ordered list of backends, set by an environment
+variable (comma-separated, first available one wins, later ones are fallbacks
+when a backend errors out):
+
+    MAXIMUS_STT_WAKE=vosk            # local, no network round trip per utterance
+    MAXIMUS_STT_COMMAND=google,vosk  # cloud accuracy, local when offline
+
+Backends:
+    google   SpeechRecognition's free Google Web Speech API (needs network)
+    sphinx   CMU PocketSphinx, fully local (pip install pocketsphinx)
+    vosk     Vosk/Kaldi, fully local (pip install vosk, and a model directory
+             from https://alphacephei.com/vosk/models in MAXIMUS_VOSK_MODEL,
+             default ./model)
+
+On the wake stage the local backends are restricted to the wake word (Sphinx
+keyword spotting, a Vosk grammar), which is both faster and more reliable
+than open transcription.
+
+    text, backend = stt.recognize("command", audio)
+
+Latency is recorded in maximus_metrics as stt.<stage>.<backend>.
+benchmarks/stt_bench.py measures latency and word error rate per backend.
+"""
+
+import os
+import json
+import threading
+
+import speech_recognition as sr
+
+from maximus_metrics import metrics
+from maximus_log import get_logger
+
+log = get_logger("stt")
+
+try:
+    import vosk
+except ImportError:
+    vosk = None
+
+try:
+    import pocketsphinx
+except ImportError:
+    pocketsphinx = None
+
+STAGES = ("wake", "command")
+DEFAULT_BACKENDS = {"wake": "google", "command": "google"}
+VOSK_MODEL_PATH = os.getenv("MAXIMUS_VOSK_MODEL", "model")
+
+
+class STTError(RuntimeError):
+    """The backend could not be used (offline, missing model, ...), as opposed to hearing nothing."""
+
+
+class Backend:
+    name = None
+    local = False
+
+    def __init__(self, recognizer=None, keywords=None):
+        """`keywords`: restrict recognition to these words (wake-word spotting), if supported."""
+        self.recognizer = recognizer or sr.Recognizer()
+        self.keywords = keywords
+
+    def available(self):
+        return True
+
+    def transcribe(self, audio):
+        """Text heard in `audio` (lowercased), or "" if nothing intelligible. Raises STTError."""
+        raise NotImplementedError
+
+
+class GoogleBackend(Backend):
+    name = "google"
+
+    def transcribe(self, audio):
+        try:
+            return self.recognizer.recognize_google(audio).lower()
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as e:
+            raise STTError(f"Google speech API unavailable: {e}")
+
+
+class SphinxBackend(Backend):
+    name = "sphinx"
+    local = True
+
+    def available(self):
+        return pocketsphinx is not None
+
+    def transcribe(self, audio):
+        keyword_entries = [(word, 1e-20) for word in self.keywords] if self.keywords else None
+        try:
+            return self.recognizer.recognize_sphinx(audio, keyword_entries=keyword_entries).lower().strip()
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as e:
+            raise STTError(f"PocketSphinx unavailable: {e}")
+
+
+class VoskBackend(Backend):
+    name = "vosk"
+    local = True
+    SAMPLE_RATE = 16000
+
+    _models = {}
+    _models_lock = threading.Lock()
+
+    def available(self):
+        return vosk is not None and os.path.isdir(VOSK_MODEL_PATH)
+
+    @classmethod
+    def model(cls, path=VOSK_MODEL_PATH):
+        # Loading a model takes seconds and hundreds of MB; do it once per process
+        with cls._models_lock:
+            if path not in cls._models:
+                if vosk is None:
+                    raise STTError("Vosk is not installed (pip install vosk).")
+                if not os.path.isdir(path):
+                    raise STTError(f"Vosk model not found at '{path}' (set MAXIMUS_VOSK_MODEL).")
+                vosk.SetLogLevel(-1)
+                cls._models[path] = vosk.Model(path)
+            return cls._models[path]
+
+    def transcribe(self, audio):
+        model = self.model()
+        if self.keywords:
+            grammar = json.dumps(list(self.keywords) + ["[unk]"])
+            rec = vosk.KaldiRecognizer(model, self.SAMPLE_RATE, grammar)
+        else:
+            rec = vosk.KaldiRecognizer(model, self.SAMPLE_RATE)
+        rec.AcceptWaveform(audio.get_raw_data(convert_rate=self.SAMPLE_RATE, convert_width=2))
+        text = json.loads(rec.FinalResult()).get("text", "")
+        return " ".join(w for w in text.split() if w != "[unk]").lower()
+
+
+BACKENDS = {cls.name: cls for cls in (GoogleBackend, SphinxBackend, VoskBackend)}
+
+
+def backend_names(stage):
+    """Configured backend names for a stage, in preference order."""
+    if stage not in STAGES:
+        raise ValueError(f"Unknown STT stage '{stage}'")
+    value = os.getenv(f"MAXIMUS_STT_{stage.upper()}", DEFAULT_BACKENDS[stage])
+    names = [n.strip().lower() for n in value.split(",") if n.strip()]
+    for n in names:
+        if n not in BACKENDS:
+            raise ValueError(f"Unknown STT backend '{n}' for stage '{stage}' (choose from {', '.join(BACKENDS)})")
+    return names
+
+
+class STT:
+    def __init__(self, recognizer=None, wake_words=()):
+        self.recognizer = recognizer or sr.Recognizer()
+        self.wake_words = tuple(wake_words)
+        self._pipelines = {}
+
+    def pipeline(self, stage):
+        """The available backends for `stage`, in preference order."""
+        if stage not in self._pipelines:
+            keywords = self.wake_words if stage == "wake" and self.wake_words else None
+            backends = [BACKENDS[n](self.recognizer, keywords) for n in backend_names(stage)]
+            usable = [b for b in backends if b.available()]
+            for b in backends:
+                if b not in usable:
+                    log.warning("STT backend '%s' is not available; skipping it for the %s stage.", b.name, stage)
+            self._pipelines[stage] = usable or [GoogleBackend(self.recognizer)]
+        return self._pipelines[stage]
+
+    def recognize(self, stage, audio):
+        """Returns (text, backend name). Falls through to the next backend on STTError."""
+        error = None
+        for backend in self.pipeline(stage):
+            try:
+                with metrics.timer(f"stt.{stage}.{backend.name}"):
+                    return backend.transcribe(audio), backend.name
+            except STTError as e:
+                metrics.incr(f"stt.{stage}.{backend.name}.error")
+                log.warning("Speech recognition (%s) failed: %s", backend.name, e)
+                error = e
+        raise error
@@ -0,0 +1,150 @@
+# maximus_tasks.py - To-do storage with an archive segment for completed tasks
+"""
+Tasks live in two JSON files:
+
+    tasks.json          pending tasks only (the working set)
+    tasks_archive.json  completed tasks, append-only, in completion order
+
+Marking a task done moves it to the archive, and any completed tasks found in
+tasks.json (files written by older versions) are moved there on load, so
+listing and marking tasks only ever scans pending work.
+
+page() serves cursor-paginated listings for the REST API. Cursors are opaque
+strings: for pending tasks they encode the last task id seen (pages are in id
+order, which is creation order except for tasks from older versions), for completed tasks the position in the append-only archive,
+so a cursor stays valid while tasks are added or completed.
+"""
+
+import json
+import time
+import bisect
+import hashlib
+import datetime
+import threading
+
+from maximus_store import JsonStore
+
+STATUSES = ("pending", "done", "all")
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class TaskStore:
+    def __init__(self, path, archive_path):
+        self.active = JsonStore(path, list)
+        self.archive = JsonStore(archive_path, list)
+        self._lock = threading.RLock()
+        self._last_id = 0
+
+    # --- Working set ---
+    def _pending(self):
+        """Pending tasks, after moving any completed ones to the archive."""
+        tasks = self.active.get()
+        if any(t.get("done") for t in tasks):
+            archive = self.archive.get()
+            archive.extend(t for t in tasks if t.get("done"))
+            tasks[:] = [t for t in tasks if not t.get("done")]
+            self.active.mark_dirty()
+            self.archive.mark_dirty()
+        return tasks
+
+    def _new_id(self, tasks):
+        # Millisecond timestamps, bumped if two tasks are created in the same millisecond
+        newest = tasks[-1]["id"] if tasks else 0
+        self._last_id = max(int(time.time() * 1000), newest + 1, self._last_id + 1)
+        return self._last_id
+
+    def add(self, text):
+        with self._lock:
+            tasks = self._pending()
+            task = {"id": self._new_id(tasks), "text": text, "done": False}
+            tasks.append(task)
+            self.active.mark_dirty()
+            return task
+
+    def pending(self):
+        with self._lock:
+            return list(self._pending())
+
+    def mark_done(self, task_id_part, exact=False):
+        """Completes the first pending task whose id ends with `task_id_part` and archives it.
+        exact=True (the REST API) only matches the whole id. Returns the task, or None if
+        nothing matched."""
+        suffix = str(task_id_part)
+        with self._lock:
+            tasks = self._pending()
+            for i, t in enumerate(tasks):
+                # Match against the full ID or the last digits (easier for voice)
+                if (str(t['id']) == suffix) if exact else str(t['id']).endswith(suffix):
+                    task = tasks.pop(i)
+                    task["done"] = True
+                    task["done_at"] = datetime.datetime.now().isoformat()
+                    self.archive.get().append(task)
+                    self.active.mark_dirty()
+                    self.archive.mark_dirty()
+                    return task
+            return None
+
+    def flush(self):
+        with self._lock:
+            self.active.flush()
+            self.archive.flush()
+
+    # --- Pagination ---
+    def page(self, status="pending", cursor=None, limit=20):
+        """Returns (tasks, next_cursor). next_cursor is None on the last page."""
+        if status not in STATUSES:
+            raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        segment, position = self._parse_cursor(cursor, status)
+
+        with self._lock:
+            items = []
+            if segment == "p":
+                pending = self._pending()
+                ids = [t["id"] for t in pending]
+                if any(a >= b for a, b in zip(ids, ids[1:])):
+                    # Tasks from older versions can be out of id order; cursors need ascending ids
+                    pending = sorted(pending, key=lambda t: t["id"])
+                    ids = [t["id"] for t in pending]
+                start = bisect.bisect_right(ids, position) if position is not None else 0
+                items = pending[start:start + limit]
+                if start + limit < len(pending):
+                    return list(items), f"p{items[-1]['id']}"
+                if status == "pending":
+                    return list(items), None
+                # status == "all": continue into the archive
+                segment, position = "d", 0
+                limit -= len(items)
+                if limit == 0:
+                    return list(items), "d0" if self.archive.get() else None
+
+            archive = self.archive.get()
+            start = position or 0
+            done = archive[start:start + limit]
+            items = list(items) + list(done)
+            next_cursor = f"d{start + limit}" if start + limit < len(archive) else None
+            return items, next_cursor
+
+    def _parse_cursor(self, cursor, status):
+        if not cursor:
+            return ("d", 0) if status == "done" else ("p", None)
+        segment, value = cursor[:1], cursor[1:]
+        if segment not in ("p", "d") or not value.isdigit():
+            raise InvalidCursor(f"Invalid cursor {cursor!r}")
+        if (segment == "p" and status == "done") or (segment == "d" and status == "pending"):
+            raise InvalidCursor(f"Cursor {cursor!r} does not belong to a '{status}' listing")
+        return segment, int(value)
+
+    def etag(self, *parts):
+        """Entity tag for a listing: changes whenever the tasks change. Computed from the data
+        in memory, which get() reloads when another worker process changed a file, so it is
+        consistent across processes without writing anything. The archive is append-only, so
+        its length and last entry stand for all of it."""
+        with self._lock:
+            archive = self.archive.get()
+            signature = json.dumps([self._pending(), len(archive), archive[-1:], parts], sort_keys=True, default=str)
+        return '"' + hashlib.sha1(signature.encode("utf-8")).hexdigest()[:20] + '"'
@@ -0,0 +1,239 @@
+# maximus_tts_cache.py - Pre-rendered audio for phrases the assistant says often
+"""
+speak() normally synthesizes every string from scratch. For phrases that come
+up again and again ("Yes? I'm listening.", the stand-by message, task and
+alarm confirmations) this cache renders the audio to a WAV file once, with
+engine.save_to_file, and afterwards plays the file directly.
+
+    tts_cache = TTSCache(engine, engine_lock)
+    tts_cache.prefetch(FIXED_PHRASES)       # at startup, rendered in the background
+    if not tts_cache.play(text):            # cached: plays the WAV and returns True
+        engine.say(text); engine.runAndWait()
+        tts_cache.note_spoken(text)         # renders it once it has been said twice
+
+Files are keyed by text, voice and rate, so changing the voice never plays
+stale audio. They are evicted least-recently-used once the directory exceeds
+its disk budget. Playback goes through the fastest path available:
+simpleaudio (WAV kept decoded in memory), winsound on Windows, or
+aplay/paplay/afplay. Without any of them the cache stays off.
+
+Environment: MAXIMUS_TTS_CACHE=0 turns it off, MAXIMUS_TTS_CACHE_MB sets the
+disk budget (default 50), MAXIMUS_TTS_CACHE_DIR the directory (default
+tts_cache).
+"""
+
+import os
+import queue
+import shutil
+import hashlib
+import threading
+import subprocess
+from collections import OrderedDict
+
+from maximus_metrics import metrics
+from maximus_log import get_logger
+
+log = get_logger("tts_cache")
+
+try:
+    import simpleaudio
+except ImportError:
+    simpleaudio = None
+
+try:
+    import winsound
+except ImportError:
+    winsound = None
+
+MAX_CACHED_LENGTH = 300   # longer texts are rarely repeated word for word
+MIN_REPEATS = 2           # render a phrase once it has been spoken this many times
+MAX_PRELOADED = 64        # decoded WAVs kept in memory for simpleaudio
+
+
+class _Player:
+    """Plays a WAV file synchronously through the lowest-latency backend available."""
+
+    def __init__(self):
+        self._preloaded = OrderedDict()
+        self.command = None
+        if simpleaudio is not None:
+            self.kind = "simpleaudio"
+        elif winsound is not None:
+            self.kind = "winsound"
+        else:
+            for candidate in (["aplay", "-q"], ["paplay"], ["afplay"]):
+                if shutil.which(candidate[0]):
+                    self.kind, self.command = candidate[0], candidate
+                    break
+            else:
+                self.kind = None
+
+    def play(self, path):
+        if self.kind == "simpleaudio":
+            wave_obj = self._preloaded.pop(path, None) or simpleaudio.WaveObject.from_wave_file(path)
+            self._preloaded[path] = wave_obj
+            while len(self._preloaded) > MAX_PRELOADED:
+                self._preloaded.popitem(last=False)
+            wave_obj.play().wait_done()
+        elif self.kind == "winsound":
+            winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_NODEFAULT)
+        else:
+            subprocess.run(self.command + [path], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def forget(self, path):
+        self._preloaded.pop(path, None)
+
+
+class TTSCache:
+    def __init__(self, engine, engine_lock, directory="tts_cache", budget_bytes=50 * 1024 * 1024, enabled=True):
+        """`engine_lock` must be held by anyone else using `engine` (speak())."""
+        self.engine = engine
+        self.engine_lock = engine_lock
+        self.directory = directory
+        self.budget_bytes = budget_bytes
+        self.player = _Player()
+        self.enabled = enabled and self.player.kind is not None
+        self._lock = threading.Lock()
+        self._files = OrderedDict()   # key -> size, least recently used first
+        self._seen = {}
+        self._queue = None
+        self._voice = self._rate = None
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+            self._scan()
+            self.refresh_voice()
+        elif enabled:
+            log.info("TTS cache disabled: no audio playback backend (install simpleaudio).")
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".wav") and ".tmp" not in name:
+                st = os.stat(os.path.join(self.directory, name))
+                entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._files[key] = size
+
+    def refresh_voice(self):
+        """Re-reads the engine's voice and rate, which are part of every cache key. Call it
+        after changing either; keys are computed without touching the engine, which may be
+        busy rendering on another thread."""
+        with self.engine_lock:
+            self._voice = self.engine.getProperty('voice')
+            self._rate = self.engine.getProperty('rate')
+
+    def _key(self, text):
+        return hashlib.sha1(f"{self._voice}\0{self._rate}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".wav")
+
+    # --- Playback ---
+    def play(self, text):
+        """Plays `text` from the cache. Returns False (and plays nothing) on a miss."""
+        if not self.enabled:
+            return False
+        key = self._key(text)
+        with self._lock:
+            hit = key in self._files
+            if hit:
+                self._files.move_to_end(key)
+        if not hit:
+            metrics.incr("tts.cache.miss")
+            return False
+        path = self._path(key)
+        try:
+            with metrics.timer("tts.cache.play"):
+                self.player.play(path)
+            os.utime(path)
+        except Exception as e:
+            log.warning("Cached TTS playback failed: %s", e)
+            self._drop(key)
+            return False
+        metrics.incr("tts.cache.hit")
+        return True
+
+    # --- Rendering ---
+    def note_spoken(self, text):
+        """Records that `text` was synthesized live; queues it for rendering once it repeats."""
+        if not self.enabled or len(text) > MAX_CACHED_LENGTH:
+            return
+        with self._lock:
+            count = self._seen[text] = self._seen.get(text, 0) + 1
+            if len(self._seen) > 10000:
+                self._seen.clear()
+        if count >= MIN_REPEATS:
+            self.prefetch([text])
+
+    def prefetch(self, texts):
+        """Renders `texts` in a background thread (skipping ones already cached)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._queue is None:
+                self._queue = queue.Queue()
+                threading.Thread(target=self._render_worker, daemon=True, name="maximus-tts-cache").start()
+        for text in texts:
+            self._queue.put(text)
+
+    def _render_worker(self):
+        while True:
+            text = self._queue.get()
+            try:
+                self.render(text)
+            except Exception as e:
+                log.warning("TTS cache render failed: %s", e)
+
+    def render(self, text):
+        """Synthesizes `text` to the cache (if not already there) and returns its path."""
+        key = self._key(text)
+        path = self._path(key)
+        with self._lock:
+            if key in self._files:
+                return path
+        tmp = os.path.join(self.directory, f"{key}.{os.getpid()}.tmp.wav")
+        with metrics.timer("tts.cache.render"), self.engine_lock:
+            self.engine.save_to_file(text, tmp)
+            self.engine.runAndWait()
+        if not os.path.exists(tmp) or os.path.getsize(tmp) == 0:
+            raise RuntimeError(f"engine produced no audio for {text!r}")
+        os.replace(tmp, path)
+        with self._lock:
+            self._files[key] = os.path.getsize(path)
+            self._evict()
+        return path
+
+    def _evict(self):
+        total = sum(self._files.values())
+        while total > self.budget_bytes and len(self._files) > 1:
+            key, size = self._files.popitem(last=False)
+            total -= size
+            self._remove_file(key)
+            metrics.incr("tts.cache.evicted")
+
+    def _drop(self, key):
+        with self._lock:
+            self._files.pop(key, None)
+        self._remove_file(key)
+
+    def _remove_file(self, key):
+        path = self._path(key)
+        self.player.forget(path)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {"files": len(self._files), "bytes": sum(self._files.values()), "player": self.player.kind}
+
+
+def from_env(engine, engine_lock):
+    return TTSCache(
+        engine,
+        engine_lock,
+        directory=os.getenv("MAXIMUS_TTS_CACHE_DIR", "tts_cache"),
+        budget_bytes=int(float(os.getenv("MAXIMUS_TTS_CACHE_MB", "50")) * 1024 * 1024),
+        enabled=os.getenv("MAXIMUS_TTS_CACHE", "1") != "0",
+    )
@@ -0,0 +1,245 @@
+# maximus_upstream.py - Shared entry points for every network call
+"""
+All HTTP requests and SDK calls made by maximus.py and maximus_logic.py go
+through the helpers in this module, so cross-cutting behaviour (timing,
+record/replay, coalescing of identical concurrent requests, circuit breakers
+and hedging) lives in one place instead of being repeated in each handler.
+
+    http_get(url, timeout, service)        -> response (status_code, text, json())
+    http_post(url, json, timeout, service) -> response
+    wiki_summary(topic, sentences)         -> str   (raises like wikipedia.summary)
+                                              offline store first, see maximus_wiki_offline
+    translate(text, dest)                  -> str   (raises like Translator.translate)
+    gemini_generate(prompt, model)         -> str   (raises like generate_content)
+
+Every timeout is cut down to the time left in the current command's budget
+(maximus_deadline); with none left, DeadlineExceeded is raised instead of
+sending the request.
+
+Set GEMINI_API_ENDPOINT (e.g. http://127.0.0.1:8765) to send Gemini calls to a
+different host, such as the stand-in server in benchmarks/fake_gemini.py.
+"""
+
+import os
+import json as _json
+import threading
+import requests
+
+from maximus_metrics import metrics
+from maximus_cassette import through_cassette
+from maximus_singleflight import SingleFlight, normalize
+from maximus_resilience import breaker, hedged
+from maximus_wiki_offline import WikiStore, first_sentences
+import maximus_deadline as deadline
+
+try:
+    import wikipedia
+except:
+    wikipedia = None
+
+try:
+    from googletrans import Translator
+except ImportError:
+    Translator = None
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+GEMINI_MODEL = 'gemini-2.0-flash'
+GEMINI_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+GEMINI_TIMEOUT = float(os.getenv("MAXIMUS_GEMINI_TIMEOUT", "20"))
+
+translator = Translator() if Translator else None
+offline_wiki = WikiStore.from_env()
+_gemini_key = None
+
+
+class UpstreamResponse:
+    """Minimal response object shared by live, recorded and replayed HTTP calls."""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return _json.loads(self.text)
+
+
+def _encode_response(resp):
+    return {"status_code": resp.status_code, "text": resp.text}
+
+
+def _decode_response(data):
+    return UpstreamResponse(data["status_code"], data["text"])
+
+
+# ---------------- Single-flight ----------------
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def flight(service):
+    """The SingleFlight group that coalesces concurrent requests to `service`."""
+    with _flights_lock:
+        group = _flights.get(service)
+        if group is None:
+            group = _flights[service] = SingleFlight(service)
+        return group
+
+
+def flight_stats():
+    with _flights_lock:
+        groups = dict(_flights)
+    return {name: group.stats() for name, group in groups.items()}
+
+
+# ---------------- Request pipeline ----------------
+def _is_http_failure(resp):
+    return resp.status_code >= 500 or resp.status_code == 429
+
+
+# Errors that mean the service could not be reached or did not answer in time
+_TRANSPORT_ERRORS = (requests.RequestException, ConnectionError, TimeoutError)
+if httpx:
+    _TRANSPORT_ERRORS += (httpx.NetworkError, httpx.ConnectTimeout, httpx.ReadTimeout, httpx.WriteTimeout,
+                          httpx.PoolTimeout)
+if wikipedia:
+    _TRANSPORT_ERRORS += (wikipedia.exceptions.HTTPTimeoutError,)
+
+
+def _is_service_error(e):
+    """True if `e` says the service is unhealthy: transport errors, timeouts, HTTP 5xx/429.
+    Content misses (unknown page, disambiguation, bad input, blocked prompt) are answers."""
+    if isinstance(e, _TRANSPORT_ERRORS):
+        return True
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(e, "code", None)  # google.api_core errors carry the HTTP status here
+    return isinstance(status, int) and (status >= 500 or status == 429)
+
+
+def _run(service, key, request, fetch, coalesce=True, hedge=False, is_failure=None, is_error=None,
+         encode=None, decode=None):
+    """Runs one upstream request through the shared layers, outermost first:
+    timing -> single-flight -> circuit breaker -> hedging -> cassette -> fetch().
+    is_failure(result) and is_error(exc) decide what the breaker counts as a failure."""
+    def attempt():
+        return through_cassette(service, request, fetch, encode=encode, decode=decode)
+
+    def guarded():
+        call = (lambda: hedged(service, attempt)) if hedge else attempt
+        return breaker(service).call(call, is_failure=is_failure, is_error=is_error)
+
+    with metrics.timer(f"upstream.{service}"):
+        if coalesce:
+            return flight(service).do(key, guarded)
+        return guarded()
+
+
+# ---------------- HTTP ----------------
+def http_get(url, timeout=6, service="http", coalesce=True, hedge=True):
+    """GET `url`. Concurrent identical GETs share one request unless coalesce=False;
+    slow ones are hedged unless hedge=False."""
+    def fetch():
+        r = requests.get(url, timeout=deadline.timeout(timeout, service))
+        return UpstreamResponse(r.status_code, r.text)
+
+    return _run(service, ("GET", url), {"method": "GET", "target": url}, fetch,
+                coalesce=coalesce, hedge=hedge, is_failure=_is_http_failure,
+                encode=_encode_response, decode=_decode_response)
+
+
+def http_post(url, json=None, timeout=6, service="http", coalesce=True, hedge=False):
+    """POST `json` to `url`. Only pass hedge=True when the endpoint is idempotent."""
+    def fetch():
+        r = requests.post(url, json=json, timeout=deadline.timeout(timeout, service))
+        return UpstreamResponse(r.status_code, r.text)
+
+    key = ("POST", url, _json.dumps(json, sort_keys=True))
+    return _run(service, key, {"method": "POST", "target": url, "body": json}, fetch,
+                coalesce=coalesce, hedge=hedge, is_failure=_is_http_failure,
+                encode=_encode_response, decode=_decode_response)
+
+
+# ---------------- SDKs ----------------
+def configure_gemini(api_key):
+    """Configures the Gemini SDK, honouring GEMINI_API_ENDPOINT when it is set."""
+    global _gemini_key
+    if not genai:
+        return
+    _gemini_key = api_key
+    if GEMINI_ENDPOINT:
+        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": GEMINI_ENDPOINT})
+    else:
+        genai.configure(api_key=api_key)
+
+
+def wiki_available():
+    """True when wiki_summary can answer at all: the offline store or the wikipedia module."""
+    return bool(offline_wiki or wikipedia)
+
+
+def wiki_summary(topic, sentences=2):
+    """Answered from the offline store when one is configured; the live wikipedia
+    module is asked on a miss, and instead of a fuzzy (distance > 0) match."""
+    if offline_wiki is not None:
+        match = offline_wiki.lookup(topic)
+        if match and (match.distance == 0 or not wikipedia):
+            metrics.incr("wiki.offline.hit")
+            return first_sentences(match.abstract, sentences)
+        metrics.incr("wiki.offline.miss")
+
+    def fetch():
+        if not wikipedia:
+            raise RuntimeError("Wikipedia module not installed.")
+        # The wikipedia package takes no timeout, so stop waiting when the budget runs out
+        return deadline.bounded(wikipedia.summary, topic, sentences=sentences, stage="wikipedia")
+
+    return _run("wikipedia", (normalize(topic), sentences),
+                {"method": "SUMMARY", "target": topic, "body": {"sentences": sentences}}, fetch, hedge=True,
+                is_error=_is_service_error)
+
+
+def translate(text, dest='en'):
+    def fetch():
+        if not translator:
+            raise RuntimeError("googletrans not installed.")
+        return deadline.bounded(translator.translate, text, dest=dest, stage="translate").text
+
+    return _run("translate", (" ".join(text.split()), dest),
+                {"method": "TRANSLATE", "target": dest, "body": text}, fetch, hedge=True,
+                is_error=_is_service_error)
+
+
+def gemini_generate(prompt, model=GEMINI_MODEL):
+    """Not hedged: generation is billed per call and is the slowest upstream by far."""
+    def fetch():
+        if not genai:
+            raise RuntimeError("google-generativeai not installed.")
+        timeout = deadline.timeout(GEMINI_TIMEOUT, "gemini")
+        response = genai.GenerativeModel(model).generate_content(prompt, request_options={"timeout": timeout})
+        return response.text
+
+    return _run("gemini", (model, prompt), {"method": "GENERATE", "target": model, "body": prompt}, fetch,
+                is_error=_is_service_error)
+
+
+# ---------------- Fork safety ----------------
+def _after_fork():
+    """Gives a forked worker its own locks, HTTP pools and Gemini client instead of the parent's."""
+    global _flights_lock, _flights, translator
+    _flights_lock = threading.Lock()
+    _flights = {}
+    translator = Translator() if Translator else None
+    if _gemini_key:
+        configure_gemini(_gemini_key)
+
+
+os.register_at_fork(after_in_child=_after_fork)
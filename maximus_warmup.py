@@ -0,0 +1,150 @@
+# maximus_warmup.py - Warms the web app before it takes traffic, and reports readiness
+"""
+The first request to a fresh worker used to pay for everything that is built
+lazily: the URL resolver, the index.html template, the memory/task JSON files,
+the conversation history index, sympy's parser, numpy's first embedding and
+the intent classifier.
+warm_up() does all of that up front, one named step at a time:
+
+    from maximus_warmup import warm_up, status
+    warm_up()            # in the process that will fork the workers (maximus_serve.py)
+    status()             # -> {"state": "ready", "steps": {"urls": 3.1, ...}, ...}
+
+GET /ready/ returns status() with 200 once the worker can take traffic, and
+503 while warm-up is still running. A step that fails is recorded under
+"errors" and does not block readiness: a missing optional module should not
+take the site down.
+
+maximus_web/wsgi.py runs warm-up according to MAXIMUS_WARMUP:
+    background (default)  in a thread; the server accepts connections at once
+                          and /ready/ reports 503 until it finishes
+    sync                  before the WSGI app is returned (use this with
+                          `gunicorn --preload`, so workers fork warm)
+    0                     off; /ready/ reports "off" and 200 straight away
+"""
+
+import os
+import time
+import threading
+
+from maximus_log import get_logger
+
+log = get_logger("warmup")
+
+_lock = threading.Lock()
+_state = {"state": "pending", "steps": {}, "errors": {}, "pid": None, "finished": None}
+_started = time.time()
+
+
+def _urls():
+    from django.urls import get_resolver, resolve
+    resolver = get_resolver()
+    resolver.reverse_dict  # compiles every pattern and the reverse lookup table
+    resolve("/chat/")
+
+
+def _templates():
+    from django.template.loader import get_template
+    get_template("index.html")
+
+
+def _views():
+    import views  # builds the MaximusAssistant and the job queue
+
+
+def _storage():
+    import views
+    views.assistant.memory
+    views.assistant.tasks.pending()
+    len(views.assistant.history)  # waits for, or does, the history index build
+
+
+def _sympy():
+    import maximus_logic
+    if maximus_logic.sp:
+        maximus_logic.sp.sympify("2*x + 3/4").evalf()
+
+
+def _intent():
+    from maximus_intent import intent_classifier
+    intent_classifier.warm()
+
+
+def _semantic_cache():
+    from maximus_semantic_cache import embed
+    embed("what is the weather like today")
+
+
+STEPS = [
+    ("views", _views),
+    ("urls", _urls),
+    ("templates", _templates),
+    ("storage", _storage),
+    ("sympy", _sympy),
+    ("semantic_cache", _semantic_cache),
+    ("intent", _intent),
+]
+
+
+def warm_up():
+    """Runs every step in this thread. Returns status()."""
+    with _lock:
+        busy = _state["state"] in ("warming", "ready")
+        if not busy:
+            _state["state"] = "warming"
+    if busy:
+        return status()
+    for name, step in STEPS:
+        t0 = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            log.warning("Warm-up step '%s' failed: %s", name, e)
+            with _lock:
+                _state["errors"][name] = str(e)
+        with _lock:
+            _state["steps"][name] = round((time.perf_counter() - t0) * 1000, 1)
+    with _lock:
+        _state.update(state="ready", pid=os.getpid(), finished=time.time())
+    return status()
+
+
+def warm_up_in_background():
+    with _lock:
+        if _state["state"] != "pending":
+            return
+    threading.Thread(target=warm_up, daemon=True, name="maximus-warmup").start()
+
+
+def disable():
+    """Marks warm-up as deliberately skipped; the worker is ready, just cold."""
+    with _lock:
+        if _state["state"] == "pending":
+            _state["state"] = "off"
+
+
+def status():
+    with _lock:
+        result = {
+            "state": _state["state"],
+            "ready": _state["state"] in ("ready", "off"),
+            "pid": os.getpid(),
+            # Warmed by the process that forked this one (maximus_serve.py, gunicorn --preload)
+            "preloaded": _state["pid"] is not None and _state["pid"] != os.getpid(),
+            "steps": dict(_state["steps"]),
+            "uptime": round(time.time() - _started, 1),
+        }
+        if _state["errors"]:
+            result["errors"] = dict(_state["errors"])
+        if _state["finished"]:
+            result["warm_ms"] = round(sum(_state["steps"].values()), 1)
+    return result
+
+
+def _after_fork():
+    global _lock, _started
+    _lock = threading.Lock()
+    _started = time.time()
+
+
+os.register_at_fork(after_in_child=_after_fork)
@@ -5,3 +5,14 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'maximus_web.settings')
 
 application = get_wsgi_application()
+
+# Build caches, indexes and parsers before the first request (see maximus_warmup.py)
+import maximus_warmup
+
+_warmup = os.getenv('MAXIMUS_WARMUP', 'background')
+if _warmup == 'sync':
+    maximus_warmup.warm_up()
+elif _warmup == '0':
+    maximus_warmup.disable()
+else:
+    maximus_warmup.warm_up_in_background()
@@ -0,0 +1,349 @@
+# maximus_wiki_offline.py - Offline Wikipedia summaries from a local abstracts dump
+"""
+wiki_summary used to need the network for every topic, and the wikipedia
+package took several seconds to answer. This module builds a compact on-disk
+store from a Wikipedia abstracts dump (or any title/abstract corpus) once, and
+then answers summaries locally. maximus_upstream asks this store first and
+uses the live wikipedia module only on a miss.
+
+Build the store once:
+
+    python -m maximus_wiki_offline build enwiki-latest-abstract.xml.gz wiki_offline/
+    export MAXIMUS_WIKI_OFFLINE=wiki_offline
+
+Accepted dumps (.gz and .bz2 are read as they are):
+    *.xml       the Wikipedia abstract dump: <doc><title>Wikipedia: X</title><abstract>...
+    *.jsonl     one {"title": ..., "abstract": ...} object per line
+    anything    else is read as tab-separated "title<TAB>abstract" lines
+
+Files in the store directory:
+    titles.dat     "key<TAB>title" lines, sorted by key (the normalized title)
+    titles.idx     one fixed-size record per title: title offset, offset and length
+                   of the compressed block holding its abstract, slot in that block
+    abstracts.bin  zlib-compressed blocks of BLOCK_SIZE abstracts, in key order
+    meta.json      entry count and format version, written last
+
+Both title files are memory-mapped. A lookup is a binary search over
+titles.idx (O(log n) records, no parsing of the whole index at start-up),
+then one block read and decompression, cached for recently used blocks.
+
+When no title matches exactly, the match is fuzzy but bounded:
+    1. the shortest title that starts with the topic as whole words
+       ("mercury" -> "Mercury (planet)"), checked among PREFIX_WINDOW titles
+    2. the closest title within a small edit distance, among the FUZZY_WINDOW
+       titles on each side of where the topic would sort ("albert einstien")
+A typo in the first few characters is therefore not corrected; the live module
+handles that on the miss. Numbers are never fuzzed: "windows 11" does not match
+"Windows 10", nor "iphone 15" "iPhone 5". A fuzzy match is still only a guess
+("paris" -> "Parish"), so Match.distance says how far off it is, and
+maximus_upstream only answers from the store on distance 0 when the live module
+is available.
+
+Environment:
+    MAXIMUS_WIKI_OFFLINE   store directory; unset disables the offline store
+Metrics: the wiki.offline.lookup timer and wiki.offline.hit / wiki.offline.miss
+counters (maximus_upstream).
+"""
+
+import os
+import re
+import bz2
+import sys
+import gzip
+import json
+import mmap
+import zlib
+import bisect
+import struct
+import argparse
+import tempfile
+import functools
+import unicodedata
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+from maximus_metrics import metrics
+from maximus_contacts import bounded_levenshtein
+from maximus_log import get_logger
+
+log = get_logger("wiki_offline")
+
+FORMAT_VERSION = 1
+TITLES_FILE = "titles.dat"
+INDEX_FILE = "titles.idx"
+ABSTRACTS_FILE = "abstracts.bin"
+META_FILE = "meta.json"
+BLOCK_SIZE = 64        # abstracts per compressed block
+BLOCK_CACHE = 256      # decompressed blocks kept in memory
+PREFIX_WINDOW = 64     # titles checked for a whole-word prefix match
+FUZZY_WINDOW = 32      # titles checked on each side of the insertion point for a fuzzy match
+ARTICLES = ("the ", "a ", "an ")  # dropped from a topic that has no match as spoken
+
+_RECORD = struct.Struct("<QQII")  # title offset, block offset, block length, slot in block
+_WORD_RE = re.compile(r"[^\W_]+")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])(?<!\b[A-Z]\.)\s+(?=[\"'(\[]?[A-Z0-9])")  # not after initials
+
+Match = namedtuple("Match", "title abstract distance")
+
+
+def normalize(title):
+    """'Mercury (planet)' -> 'mercury planet'; accents are dropped, so 'Gödel' -> 'godel'."""
+    text = unicodedata.normalize("NFKD", title.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(_WORD_RE.findall(text))
+
+
+def first_sentences(text, sentences):
+    parts = _SENTENCE_END_RE.split(text.strip())
+    return " ".join(parts[:max(1, sentences)])
+
+
+def _numbers(key):
+    """The words of `key` that contain a digit; a fuzzy match must have exactly these."""
+    return [word for word in key.split() if any(c.isdigit() for c in word)]
+
+
+def _fuzzy_bound(key):
+    return 0 if len(key) <= 4 else 1 if len(key) <= 8 else 2 if len(key) <= 16 else 3
+
+
+# ---------------- Building ----------------
+def _open_dump(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def _dump_format(path):
+    name = re.sub(r"\.(gz|bz2)$", "", path)
+    return "xml" if name.endswith(".xml") else "jsonl" if name.endswith((".jsonl", ".json")) else "tsv"
+
+
+def read_dump(path):
+    """Yields (title, abstract) pairs from a dump in any of the accepted formats."""
+    kind = _dump_format(path)
+    with _open_dump(path) as f:
+        if kind == "xml":
+            root, title, abstract = None, None, ""
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                if root is None:
+                    root = elem
+                if event == "start":
+                    continue
+                if elem.tag == "title":
+                    title = (elem.text or "").strip()
+                    if title.startswith("Wikipedia:"):
+                        title = title[len("Wikipedia:"):].strip()
+                elif elem.tag == "abstract":
+                    abstract = (elem.text or "").strip()
+                elif elem.tag == "doc":
+                    if title:
+                        yield title, abstract
+                    title, abstract = None, ""
+                    root.clear()  # drop finished documents; the dump has millions
+        elif kind == "jsonl":
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    yield entry.get("title", ""), entry.get("abstract") or entry.get("summary") or ""
+        else:
+            for line in f:
+                title, _, abstract = line.decode("utf-8").rstrip("\r\n").partition("\t")
+                yield title, abstract
+
+
+def build(dump, out_dir, block_size=BLOCK_SIZE):
+    """Builds the store in `out_dir` from `dump`. Abstracts are spooled to a temporary
+    file so only the titles are held in memory while sorting. Returns the entry count."""
+    os.makedirs(out_dir, exist_ok=True)
+    entries, seen = [], set()  # (key bytes, title, spool offset, length)
+    with tempfile.TemporaryFile(dir=out_dir) as spool, metrics.timer("wiki.offline.build"):
+        for title, abstract in read_dump(dump):
+            title, abstract = " ".join(title.split()), " ".join(abstract.replace("\0", "").split())
+            key = normalize(title)
+            if not key or not abstract or key in seen or abstract.endswith("may refer to:"):
+                continue  # the first entry for a title wins; disambiguation pages are left to the live module
+            seen.add(key)
+            data = abstract.encode("utf-8")
+            entries.append((key.encode("utf-8"), title, spool.tell(), len(data)))
+            spool.write(data)
+        seen = None
+        entries.sort(key=lambda e: e[0])
+
+        paths = {name: os.path.join(out_dir, name) for name in (TITLES_FILE, INDEX_FILE, ABSTRACTS_FILE, META_FILE)}
+        with open(paths[TITLES_FILE] + ".tmp", "wb") as titles, \
+                open(paths[INDEX_FILE] + ".tmp", "wb") as index, \
+                open(paths[ABSTRACTS_FILE] + ".tmp", "wb") as abstracts:
+            for start in range(0, len(entries), block_size):
+                block = entries[start:start + block_size]
+                chunk = []
+                for _, _, offset, length in block:
+                    spool.seek(offset)
+                    chunk.append(spool.read(length))
+                compressed = zlib.compress(b"\0".join(chunk), 9)
+                block_offset = abstracts.tell()
+                abstracts.write(compressed)
+                for slot, (key, title, _, _) in enumerate(block):
+                    index.write(_RECORD.pack(titles.tell(), block_offset, len(compressed), slot))
+                    titles.write(key + b"\t" + title.encode("utf-8") + b"\n")
+        for name in (TITLES_FILE, INDEX_FILE, ABSTRACTS_FILE):
+            os.replace(paths[name] + ".tmp", paths[name])
+        with open(paths[META_FILE], "w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "count": len(entries), "block_size": block_size,
+                       "source": os.path.basename(dump)}, f)
+    log.info("Built offline Wikipedia store", extra={"entries": len(entries), "dir": out_dir})
+    return len(entries)
+
+
+# ---------------- Reading ----------------
+class _Keys:
+    """Sequence view of the sorted keys, so bisect can search the mapped files directly."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, i):
+        return self.store._key(i)
+
+
+class WikiStore:
+    def __init__(self, directory):
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported offline Wikipedia store version {self.meta.get('version')}")
+        self.directory = directory
+        self._files = [open(os.path.join(directory, name), "rb") for name in (TITLES_FILE, INDEX_FILE, ABSTRACTS_FILE)]
+        self._titles, self._index, self._abstracts = (
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) for f in self._files)
+        self._count = len(self._index) // _RECORD.size
+        self._keys = _Keys(self)
+        self._block = functools.lru_cache(maxsize=BLOCK_CACHE)(self._read_block)
+
+    @classmethod
+    def from_env(cls):
+        """The store named by MAXIMUS_WIKI_OFFLINE, or None if it is unset or unusable."""
+        directory = os.getenv("MAXIMUS_WIKI_OFFLINE")
+        if not directory:
+            return None
+        try:
+            return cls(directory)
+        except (OSError, ValueError) as e:
+            log.warning("Offline Wikipedia store unavailable: %s", e)
+            return None
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        for m in (self._titles, self._index, self._abstracts):
+            m.close()
+        for f in self._files:
+            f.close()
+
+    # --- Records ---
+    def _record(self, i):
+        return _RECORD.unpack_from(self._index, i * _RECORD.size)
+
+    def _line(self, i):
+        start = self._record(i)[0]
+        return self._titles[start:self._titles.find(b"\n", start)]
+
+    def _key(self, i):
+        return self._line(i).split(b"\t", 1)[0]
+
+    def _title(self, i):
+        return self._line(i).split(b"\t", 1)[1].decode("utf-8")
+
+    def _read_block(self, offset, length):
+        return zlib.decompress(self._abstracts[offset:offset + length]).split(b"\0")
+
+    def _abstract(self, i):
+        _, offset, length, slot = self._record(i)
+        return self._block(offset, length)[slot].decode("utf-8")
+
+    def _match(self, i, distance):
+        return Match(self._title(i), self._abstract(i), distance)
+
+    # --- Lookup ---
+    def _find(self, key):
+        """Index of the best title for `key` and its edit distance, or (None, None)."""
+        target = key.encode("utf-8")
+        i = bisect.bisect_left(self._keys, target)
+        if i < self._count and self._key(i) == target:
+            return i, 0
+        # 1. Whole-word prefix: a space sorts before any other key character, so the
+        #    keys starting with "key " come right after the insertion point
+        prefix = target + b" "
+        best = None
+        for j in range(i, min(i + PREFIX_WINDOW, self._count)):
+            candidate = self._key(j)
+            if not candidate.startswith(prefix):
+                break
+            if best is None or len(candidate) < len(self._key(best)):
+                best = j
+        if best is not None:
+            return best, 0
+        # 2. Bounded edit distance among the neighbours of the insertion point
+        bound = _fuzzy_bound(key)
+        if not bound:
+            return None, None
+        best, best_distance = None, bound + 1
+        numbers = _numbers(key)
+        for j in range(max(0, i - FUZZY_WINDOW), min(i + FUZZY_WINDOW, self._count)):
+            candidate = self._key(j).decode("utf-8")
+            if _numbers(candidate) != numbers:
+                continue
+            distance = bounded_levenshtein(key, candidate, best_distance - 1)
+            if distance < best_distance:
+                best, best_distance = j, distance
+        return (best, best_distance) if best is not None else (None, None)
+
+    def lookup(self, topic):
+        """The entry for `topic` as a Match, or None."""
+        key = normalize(topic)
+        if not key or not self._count:
+            return None
+        with metrics.timer("wiki.offline.lookup"):
+            i, distance = self._find(key)
+            if i is None and key.startswith(ARTICLES):
+                i, distance = self._find(key.split(" ", 1)[1])  # "the taj mahal" -> "Taj Mahal"
+            return self._match(i, distance) if i is not None else None
+
+    def summary(self, topic, sentences=2):
+        """The first `sentences` sentences of the abstract for `topic`, or None."""
+        match = self.lookup(topic)
+        return first_sentences(match.abstract, sentences) if match else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline Wikipedia summary store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="Build a store from an abstracts dump.")
+    build_parser.add_argument("dump", help="Wikipedia abstract XML, JSONL or TSV dump (.gz/.bz2 allowed).")
+    build_parser.add_argument("out_dir", help="Directory to write the store to.")
+    lookup_parser = commands.add_parser("lookup", help="Look a topic up in a built store.")
+    lookup_parser.add_argument("store_dir")
+    lookup_parser.add_argument("topic", nargs="+")
+    lookup_parser.add_argument("--sentences", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        print(f"{build(args.dump, args.out_dir)} entries written to {args.out_dir}")
+        return 0
+    store = WikiStore(args.store_dir)
+    match = store.lookup(" ".join(args.topic))
+    if match is None:
+        print("No match.")
+        return 1
+    print(f"{match.title} (distance {match.distance}): {first_sentences(match.abstract, args.sentences)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+import unittest
+
+from maximus_admission import AdmissionController
+
+
+class WouldShedTest(unittest.TestCase):
+    def test_free_slot_admits(self):
+        self.assertIsNone(AdmissionController("test", limit=1).would_shed())
+
+    def test_full_queue_sheds_without_queueing(self):
+        controller = AdmissionController("test", limit=1, max_queue=0)
+        controller.acquire()
+        self.assertGreaterEqual(controller.would_shed(), 1.0)
+        self.assertEqual(controller.stats()["queued"], 0)
+        controller.release(0.1)
+        self.assertIsNone(controller.would_shed())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from maximus_compound import CompoundPlanner
+
+TRIGGERS = ("weather", "what is ", "solve", "play ", "add task", "remember ", "tell me a joke")
+
+
+class CompoundSplitTest(unittest.TestCase):
+    def setUp(self):
+        self.planner = CompoundPlanner(lambda text: text.lower().strip().startswith(TRIGGERS), lambda text: False)
+
+    def test_independent_commands_are_split(self):
+        self.assertEqual(
+            self.planner.split("weather in pune and mumbai and add task buy milk"),
+            ["weather in pune", "weather in mumbai", "add task buy milk"],
+        )
+
+    def test_places_named_with_and_are_one_lookup(self):
+        self.assertEqual(self.planner.split("weather in trinidad and tobago"), ["weather in trinidad and tobago"])
+        self.assertEqual(
+            self.planner.split("weather in pune and trinidad and tobago"),
+            ["weather in pune", "weather in trinidad and tobago"],
+        )
+
+    def test_free_text_arguments_are_never_cut(self):
+        for cmd in (
+            "add task finish homework and solve problem set",
+            "add task call mom and ask about the joke",
+            "add task buy milk and play cricket with sam",
+            "remember wifi password is abc and then some",
+        ):
+            self.assertEqual(self.planner.split(cmd), [cmd])
+
+    def test_trigger_must_start_the_piece(self):
+        self.assertEqual(
+            self.planner.split("what is python and how do i solve it"),
+            ["what is python and how do i solve it"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import time
+import threading
+import unittest
+
+import maximus_deadline as deadline
+from maximus_deadline import DeadlineExceeded, PoolSaturated, budget, bounded
+
+
+class BoundedTest(unittest.TestCase):
+    def test_result_within_budget(self):
+        with budget(1.0):
+            self.assertEqual(bounded(lambda x: x * 2, 21, stage="test"), 42)
+
+    def test_abandoned_calls_make_new_calls_fail_fast(self):
+        release = threading.Event()
+        for _ in range(deadline.BOUNDED_WORKERS):
+            with budget(0.05 + deadline.MIN_TIMEOUT), self.assertRaises(DeadlineExceeded):
+                bounded(release.wait, stage="test")
+        self.assertEqual(deadline._abandoned, deadline.BOUNDED_WORKERS)
+        try:
+            with budget(5.0):
+                start = time.monotonic()
+                with self.assertRaises(PoolSaturated):
+                    bounded(lambda: "late", stage="test")
+                self.assertLess(time.monotonic() - start, 0.5)  # refused, not queued
+        finally:
+            release.set()
+        for _ in range(100):
+            if deadline._in_flight == 0:
+                break
+            time.sleep(0.01)
+        self.assertEqual((deadline._in_flight, deadline._abandoned), (0, 0))
+        with budget(1.0):
+            self.assertEqual(bounded(lambda: "ok", stage="test"), "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+from maximus_intent import IntentClassifier, np
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class IntentClassifierTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.classifier = IntentClassifier()
+        cls.classifier.warm()
+
+    def test_short_fragments_are_left_to_the_ai(self):
+        for text in ("is it", "it", "do it", "some", "and you", "and then some"):
+            self.assertIsNone(self.classifier.classify(text), text)
+
+    def test_unknown_words_are_left_to_the_ai(self):
+        self.assertIsNone(self.classifier.classify("xqzt plorf vrumb"))
+
+    def test_weather_without_location_needs_a_weather_word(self):
+        prediction = self.classifier.classify("is it raining")
+        self.assertEqual(prediction.intent, "weather")
+        self.assertEqual(prediction.slots["location"], "")
+
+    def test_here_is_no_location(self):
+        prediction = self.classifier.classify("is it hot in here")
+        self.assertEqual(prediction.intent, "weather")
+        self.assertEqual(prediction.slots["location"], "")
+
+    def test_routes_known_phrasings(self):
+        self.assertEqual(self.classifier.classify("how's it looking outside in delhi").slots, {"location": "delhi"})
+        self.assertEqual(self.classifier.classify("put milk on my list").intent, "add_task")
+
+
+if __name__ == "__main__":
+    unittest.main()
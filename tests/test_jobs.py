@@ -0,0 +1,49 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import maximus_jobs
+from maximus_jobs import JobQueue
+
+
+class JobRecoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "jobs.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def add_running(self, queue, job_id, lease_until):
+        """A job claimed by another process with the same PID as ours, as after a container restart."""
+        queue._db.execute(
+            "INSERT INTO jobs (id, kind, payload, status, owner, created, started, lease_until) "
+            "VALUES (?, 'echo', '{\"n\": 1}', 'running', ?, ?, ?, ?)",
+            (job_id, str(os.getpid()), time.time(), time.time(), lease_until))
+
+    def test_jobs_with_an_expired_lease_are_run_again(self):
+        with mock.patch.object(maximus_jobs, "HEARTBEAT_INTERVAL", 0.05):
+            queue = JobQueue(self.path, workers=1)
+            queue.register("echo", lambda payload: payload)
+            self.add_running(queue, "orphaned", time.time() - 1)
+            self.add_running(queue, "leased", time.time() + 60)
+            queue.start()
+            self.assertEqual(queue.wait("orphaned", 5)["status"], "done")
+            self.assertEqual(queue.get("leased")["status"], "running")
+
+    def test_running_jobs_keep_their_lease(self):
+        with mock.patch.object(maximus_jobs, "HEARTBEAT_INTERVAL", 0.05), \
+                mock.patch.object(maximus_jobs, "LEASE_SECONDS", 0.2):
+            queue = JobQueue(self.path, workers=1)
+            runs = []
+            queue.register("slow", lambda payload: runs.append(1) or time.sleep(0.6))
+            job_id = queue.submit("slow", {})
+            self.assertEqual(queue.wait(job_id, 5)["status"], "done")
+            self.assertEqual(len(runs), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
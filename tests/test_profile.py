@@ -0,0 +1,29 @@
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from maximus_profile import Profiler
+
+
+class ProfilerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.profiler = Profiler(directory=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_runs_unprofiled_when_another_profiler_is_active(self):
+        threads = threading.active_count()
+        with mock.patch("cProfile.Profile.enable", side_effect=ValueError("Another profiling tool is already active")):
+            self.assertEqual(self.profiler.run("busy", lambda: 42), (42, None))
+        self.assertEqual(threading.active_count(), threads)  # no sampler left running
+        result, prefix = self.profiler.run("next", lambda: 7)
+        self.assertEqual(result, 7)
+        self.assertIsNotNone(prefix)  # the thread is not stuck marked as profiling
+
+
+if __name__ == "__main__":
+    unittest.main()
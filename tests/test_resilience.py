@@ -0,0 +1,77 @@
+import unittest
+from unittest import mock
+
+import maximus_upstream as upstream
+from maximus_deadline import DeadlineExceeded
+from maximus_resilience import CircuitBreaker, CircuitOpenError, CLOSED, HALF_OPEN, OPEN
+
+
+def _fail():
+    raise ConnectionError("down")
+
+
+def _timeout():
+    raise DeadlineExceeded("no time left")
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def make_half_open(self):
+        b = CircuitBreaker("test", min_calls=2, open_seconds=0.0)
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                b.call(_fail)
+        self.assertEqual(b.state, HALF_OPEN)  # open_seconds=0: half-open on the next look
+        return b
+
+    def test_deadline_in_closed_state_is_not_a_failure(self):
+        b = CircuitBreaker("test", min_calls=1)
+        with self.assertRaises(DeadlineExceeded):
+            b.call(_timeout)
+        self.assertEqual(b.state, CLOSED)
+
+    def test_half_open_probe_that_times_out_is_released(self):
+        b = self.make_half_open()
+        with self.assertRaises(DeadlineExceeded):
+            b.call(_timeout)
+        self.assertEqual(b.state, HALF_OPEN)
+        self.assertEqual(b.call(lambda: "ok"), "ok")  # the next call may probe again
+        self.assertEqual(b.state, CLOSED)
+
+    def test_half_open_probe_failure_reopens(self):
+        b = self.make_half_open()
+        b.open_seconds = 60.0
+        with self.assertRaises(ConnectionError):
+            b.call(_fail)
+        self.assertEqual(b.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            b.call(lambda: "ok")
+
+    def test_errors_the_service_is_not_blamed_for_count_as_answers(self):
+        b = CircuitBreaker("test", min_calls=2)
+        for _ in range(5):
+            with self.assertRaises(KeyError):
+                b.call(lambda: {}["missing"], is_error=lambda e: not isinstance(e, KeyError))
+        self.assertEqual(b.state, CLOSED)
+
+
+@unittest.skipIf(upstream.wikipedia is None, "wikipedia is not installed")
+class UpstreamBreakerTest(unittest.TestCase):
+    def test_unknown_pages_leave_the_wikipedia_breaker_closed(self):
+        page_error = upstream.wikipedia.exceptions.PageError("no such topic")
+        with mock.patch.object(upstream, "offline_wiki", None), \
+                mock.patch.object(upstream.wikipedia, "summary", side_effect=page_error):
+            for i in range(10):
+                with self.assertRaises(upstream.wikipedia.exceptions.PageError):
+                    upstream.wiki_summary(f"no such topic {i}")
+        self.assertEqual(upstream.breaker("wikipedia").state, CLOSED)
+
+    def test_transport_errors_and_overload_are_service_errors(self):
+        self.assertTrue(upstream._is_service_error(upstream.requests.ConnectionError("down")))
+        overloaded = Exception("429")
+        overloaded.code = 429
+        self.assertTrue(upstream._is_service_error(overloaded))
+        self.assertFalse(upstream._is_service_error(ValueError("response blocked by safety filters")))
+
+
+if __name__ == "__main__":
+    unittest.main()
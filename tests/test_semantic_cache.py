@@ -0,0 +1,28 @@
+import unittest
+
+from maximus_semantic_cache import SemanticCache, np
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class SemanticCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = SemanticCache("test", capacity=16)
+
+    def test_paraphrase_hits(self):
+        self.cache.store("who made python", "Guido van Rossum.")
+        self.assertEqual(self.cache.lookup("who created python?"), "Guido van Rossum.")
+
+    def test_near_misses_with_different_numbers_or_negations_miss(self):
+        for stored, asked in (
+            ("convert 5 miles to km", "convert 6 miles to km"),
+            ("ww1", "ww2"),
+            ("should i buy", "should i not buy"),
+            ("what is the population of indiana", "what is the population of india"),
+        ):
+            self.cache.store(stored, f"answer to {stored}")
+            self.assertIsNone(self.cache.lookup(asked), asked)
+            self.assertEqual(self.cache.lookup(stored), f"answer to {stored}")
+
+
+if __name__ == "__main__":
+    unittest.main()
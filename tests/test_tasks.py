@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from maximus_tasks import TaskStore
+
+
+class MarkDoneTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = TaskStore(os.path.join(self.directory, "tasks.json"),
+                               os.path.join(self.directory, "tasks_archive.json"))
+        self.store.active.get().extend([
+            {"id": 5, "text": "five", "done": False},
+            {"id": 15, "text": "fifteen", "done": False},
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_exact_matches_the_whole_id(self):
+        self.assertEqual(self.store.mark_done(15, exact=True)["text"], "fifteen")
+        self.assertEqual(self.store.mark_done(5, exact=True)["text"], "five")
+
+    def test_exact_does_not_match_a_suffix(self):
+        self.store.mark_done(5, exact=True)
+        self.assertIsNone(self.store.mark_done(5, exact=True))
+        self.assertEqual([t["id"] for t in self.store.pending()], [15])
+
+    def test_voice_matches_the_last_digits(self):
+        self.assertEqual(self.store.mark_done("5")["id"], 5)
+        self.assertEqual(self.store.mark_done("5")["id"], 15)
+
+
+class PageTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "tasks.json")
+        self.store = TaskStore(self.path, os.path.join(self.directory, "tasks_archive.json"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_out_of_order_legacy_ids_are_paged_once_each(self):
+        # Seconds-based ids from an older version, after millisecond ones
+        ids = [1700000000001, 1700000000002, 1700000000, 1600000000, 1700000000003]
+        self.store.active.get().extend({"id": i, "text": str(i), "done": False} for i in ids)
+        seen, cursor = [], None
+        while True:
+            items, cursor = self.store.page(cursor=cursor, limit=2)
+            seen += [t["id"] for t in items]
+            if cursor is None:
+                break
+        self.assertEqual(seen, sorted(ids))
+
+    def test_etag_does_not_write(self):
+        self.store.add("buy milk")
+        etag = self.store.etag("pending")
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(self.store.etag("pending"), etag)
+        self.store.add("buy bread")
+        self.assertNotEqual(self.store.etag("pending"), etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import maximus_upstream as upstream
+from maximus_wiki_offline import WikiStore, build
+
+ENTRIES = {
+    "Windows 10": "Windows 10 is an operating system.",
+    "iPhone 5": "The iPhone 5 is a smartphone.",
+    "Parish": "A parish is a territorial entity.",
+    "Albert Einstein": "Albert Einstein was a physicist.",
+}
+
+
+class WikiStoreTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        dump = os.path.join(cls.directory, "dump.tsv")
+        with open(dump, "w", encoding="utf-8") as f:
+            for title, abstract in ENTRIES.items():
+                f.write(f"{title}\t{abstract}\n")
+        build(dump, os.path.join(cls.directory, "store"))
+        cls.store = WikiStore(os.path.join(cls.directory, "store"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.store.close()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def test_numbers_are_never_fuzzed(self):
+        self.assertIsNone(self.store.lookup("windows 11"))
+        self.assertIsNone(self.store.lookup("iphone 15"))
+        self.assertEqual(self.store.lookup("windows 10").distance, 0)
+
+    def test_typo_is_a_fuzzy_match(self):
+        match = self.store.lookup("albert einstien")
+        self.assertEqual((match.title, match.distance), ("Albert Einstein", 2))
+
+    @unittest.skipIf(upstream.wikipedia is None, "wikipedia is not installed")
+    def test_fuzzy_match_asks_the_live_module(self):
+        with mock.patch.object(upstream, "offline_wiki", self.store), \
+                mock.patch.object(upstream.wikipedia, "summary", return_value="Paris is the capital of France."):
+            self.assertEqual(upstream.wiki_summary("paris"), "Paris is the capital of France.")
+            self.assertEqual(upstream.wiki_summary("parish"), "A parish is a territorial entity.")
+
+
+if __name__ == "__main__":
+    unittest.main()
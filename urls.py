@@ -4,4 +4,10 @@ import views
 urlpatterns = [
     path('', views.index, name='index'),
     path('chat/', views.chat_api, name='chat_api'),
-]
\ No newline at end of file
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('ready/', views.ready, name='ready'),
+    path('tasks/', views.tasks_api, name='tasks_api'),
+    path('tasks/<int:task_id>/done/', views.task_done_api, name='task_done_api'),
+    path('history/search', views.history_search, name='history_search'),
+    path('jobs/<str:job_id>', views.job_status, name='job_status'),
+]
@@ -1,23 +1,196 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
 from django.views.decorators.csrf import csrf_exempt
-from maximus_logic import MaximusAssistant
+from maximus_logic import MaximusAssistant, JOBS_DB
+from maximus_metrics import metrics
+from maximus_tasks import InvalidCursor
+from maximus_profile import profiler
+from maximus_admission import Overloaded, gemini_admission
+from maximus_jobs import JobQueue
+from maximus_log import get_logger, command_context
+import maximus_warmup
+from django.conf import settings
+import os
+import re
 import json
+import math
+import time
+import datetime
 
 # Initialize once (or per request if statelessness is preferred)
 assistant = MaximusAssistant()
+log = get_logger('views')
+
+# Slow commands sent with {"async": true} run here; clients poll /jobs/<id>
+jobs = JobQueue(JOBS_DB, workers=int(os.getenv('MAXIMUS_JOB_WORKERS', '4')))
+
+def _run_command_job(payload):
+    # The job logs under the id of the request that queued it
+    with command_context(payload.get('command_id')):
+        try:
+            return {'response': assistant.process_command(payload['message'])}
+        except Overloaded as e:
+            # Kept as a result so the poll can answer 429 + Retry-After, like a synchronous request
+            return {'response': BUSY_MESSAGE, 'retry_after': e.retry_after}
+
+jobs.register('command', _run_command_job)
+
+# Caller-supplied X-Request-ID values are used as the command's correlation id if they look sane
+_REQUEST_ID_RE = re.compile(r'^[\w.:-]{1,64}$')
+
+BUSY_MESSAGE = "I'm handling a lot of questions right now. Please try again shortly."
+
+def _busy(retry_after, **fields):
+    """429 with Retry-After for a request (or job) turned away by admission control."""
+    response = JsonResponse({'response': BUSY_MESSAGE, 'status': 'busy', **fields}, status=429)
+    response['Retry-After'] = str(math.ceil(retry_after))
+    return response
 
 def index(request):
     return render(request, 'index.html')
 
+def _profiling_requested(request):
+    """?profile=1 or X-Maximus-Profile: 1, honoured only in DEBUG or with MAXIMUS_PROFILE_ALLOWED=1."""
+    if not (settings.DEBUG or os.getenv('MAXIMUS_PROFILE_ALLOWED') == '1'):
+        return False
+    return request.GET.get('profile') == '1' or request.headers.get('X-Maximus-Profile') == '1'
+
 @csrf_exempt
 def chat_api(request):
+    request_id = request.headers.get('X-Request-ID', '')
+    with command_context(request_id if _REQUEST_ID_RE.match(request_id) else None) as command_id:
+        response = _chat(request, command_id)
+    response['X-Request-ID'] = command_id
+    return response
+
+def _chat(request, command_id):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
             user_message = data.get('message', '')
+            if data.get('async') and assistant.is_slow(user_message):
+                # Turn the request away now rather than queue a job that can only fail
+                retry_after = gemini_admission.would_shed()
+                if retry_after is not None:
+                    return _busy(retry_after)
+                job_id = jobs.submit('command', {'message': user_message, 'command_id': command_id})
+                return JsonResponse({'response': 'Working on it...', 'status': 'queued', 'job_id': job_id}, status=202)
+            if _profiling_requested(request):
+                response_text, prefix = profiler.run(user_message, assistant.process_command, user_message)
+                return JsonResponse({'response': response_text, 'status': 'success',
+                                     'profile': os.path.basename(prefix) if prefix else None})
             response_text = assistant.process_command(user_message)
             return JsonResponse({'response': response_text, 'status': 'success'})
+        except Overloaded as e:
+            return _busy(e.retry_after)
         except Exception as e:
+            log.exception("Chat request failed: %s", e)
             return JsonResponse({'response': f"Error: {str(e)}", 'status': 'error'})
-    return JsonResponse({'response': 'Invalid request', 'status': 'error'}, status=400)
\ No newline at end of file
+    return JsonResponse({'response': 'Invalid request', 'status': 'error'}, status=400)
+
+def metrics_view(request):
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def ready(request):
+    """Readiness probe: 200 once this worker is warmed up (or warm-up is off), 503 while warming."""
+    status = maximus_warmup.status()
+    return JsonResponse(status, status=200 if status['ready'] else 503)
+
+# --- Tasks API ---
+def _etag_matches(request, etag):
+    header = request.headers.get('If-None-Match', '')
+    candidates = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return etag in candidates or '*' in candidates
+
+@csrf_exempt
+def tasks_api(request):
+    """GET: cursor-paginated task list (?status=pending|done|all&cursor=&limit=), with ETag support.
+    POST: {"text": ...} adds a task."""
+    if request.method == 'GET':
+        status = request.GET.get('status', 'pending')
+        cursor = request.GET.get('cursor') or None
+        try:
+            limit = int(request.GET.get('limit', 20))
+            etag = assistant.tasks.etag(status, cursor, limit)
+            if _etag_matches(request, etag):
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                return response
+            tasks, next_cursor = assistant.tasks.page(status, cursor, limit)
+        except (ValueError, InvalidCursor) as e:
+            return JsonResponse({'response': str(e), 'status': 'error'}, status=400)
+        response = JsonResponse({'tasks': tasks, 'next_cursor': next_cursor, 'status': 'success'})
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'response': 'Invalid JSON body', 'status': 'error'}, status=400)
+        text = str(data.get('text', '')).strip()
+        if not text:
+            return JsonResponse({'response': 'Task text is required', 'status': 'error'}, status=400)
+        task = assistant.tasks.add(text)
+        assistant.tasks.flush()
+        return JsonResponse({'task': task, 'status': 'success'}, status=201)
+
+    return JsonResponse({'response': 'Invalid request', 'status': 'error'}, status=405)
+
+@csrf_exempt
+def task_done_api(request, task_id):
+    if request.method != 'POST':
+        return JsonResponse({'response': 'Invalid request', 'status': 'error'}, status=405)
+    task = assistant.tasks.mark_done(task_id, exact=True)
+    if task is None:
+        return JsonResponse({'response': f'Task {task_id} not found', 'status': 'error'}, status=404)
+    assistant.tasks.flush()
+    return JsonResponse({'task': task, 'status': 'success'})
+
+# --- Conversation history search ---
+def _parse_time(value):
+    """Unix timestamp or ISO date/datetime -> timestamp; None if empty."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+def history_search(request):
+    """GET ?q=<words>&limit=10&since=<iso or unix>&until=<iso or unix>"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'response': 'Query parameter q is required', 'status': 'error'}, status=400)
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), 100))
+        since = _parse_time(request.GET.get('since'))
+        until = _parse_time(request.GET.get('until'))
+    except ValueError as e:
+        return JsonResponse({'response': str(e), 'status': 'error'}, status=400)
+    start = time.perf_counter()
+    results = assistant.history.search(query, limit=limit, since=since, until=until)
+    took_ms = (time.perf_counter() - start) * 1000
+    return JsonResponse({'results': results, 'took_ms': round(took_ms, 2), 'status': 'success'})
+
+# --- Background jobs ---
+JOB_MAX_WAIT = 30  # seconds a long-poll may hold the connection
+
+def job_status(request, job_id):
+    """GET /jobs/<id>?wait=<seconds> - job state; with wait, blocks until the job finishes (long-poll)."""
+    try:
+        wait = min(float(request.GET.get('wait', 0)), JOB_MAX_WAIT)
+    except ValueError:
+        return JsonResponse({'response': 'wait must be a number of seconds', 'status': 'error'}, status=400)
+    job = jobs.wait(job_id, wait) if wait > 0 else jobs.get(job_id)
+    if job is None:
+        return JsonResponse({'response': f'Job {job_id} not found', 'status': 'error'}, status=404)
+    body = {'job_id': job['id'], 'status': job['status']}
+    if job['status'] == 'done' and 'retry_after' in job['result']:
+        return _busy(job['result']['retry_after'], job_id=job['id'])
+    if job['status'] == 'done':
+        body['response'] = job['result']['response']
+    elif job['status'] == 'error':
+        body['response'] = f"Error: {job['error']}"
+    return JsonResponse(body)